@@ -0,0 +1,24 @@
+"""Add pinned column to messages
+
+Revision ID: 5d2f8a9c41e7
+Revises: cbe7ca97e713
+Create Date: 2026-10-17 09:12:41.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f8a9c41e7'
+down_revision = 'cbe7ca97e713'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('pinned', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'pinned')
@@ -0,0 +1,33 @@
+"""Add session_summaries table
+
+Revision ID: 8e4b1c7d2a90
+Revises: 5d2f8a9c41e7
+Create Date: 2026-10-17 11:03:27.914502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b1c7d2a90'
+down_revision = '5d2f8a9c41e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('session_summaries',
+    sa.Column('session_id', sa.String(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('summarized_through_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('summarized_through_id', sa.String(), nullable=False),
+    sa.Column('summarized_message_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('session_summaries')
@@ -0,0 +1,38 @@
+"""Add newsletter_sections table
+
+Revision ID: b7d2e4f6a813
+Revises: a3c9e5f17b62
+Create Date: 2026-10-17 14:02:51.630284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f6a813'
+down_revision = 'a3c9e5f17b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('newsletter_sections',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('session_id', sa.String(), nullable=False),
+    sa.Column('section_type', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('state', sa.String(), nullable=False),
+    sa.Column('section_metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_newsletter_sections_session_id_section_type', 'newsletter_sections', ['session_id', 'section_type', 'version'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_newsletter_sections_session_id_section_type', table_name='newsletter_sections')
+    op.drop_table('newsletter_sections')
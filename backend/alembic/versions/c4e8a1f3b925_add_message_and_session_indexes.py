@@ -0,0 +1,26 @@
+"""Add message and session indexes
+
+Revision ID: c4e8a1f3b925
+Revises: b7d2e4f6a813
+Create Date: 2026-10-17 14:48:12.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f3b925'
+down_revision = 'b7d2e4f6a813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_session_id_timestamp', 'messages', ['session_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_sessions_created_at', 'sessions', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_created_at', table_name='sessions')
+    op.drop_index('ix_messages_session_id_timestamp', table_name='messages')
@@ -0,0 +1,28 @@
+"""Add updated_at to messages
+
+Revision ID: d9a3f7e2b146
+Revises: c4e8a1f3b925
+Create Date: 2026-10-17 16:22:37.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a3f7e2b146'
+down_revision = 'c4e8a1f3b925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Existing messages were last modified when they were written (or pinned since; close enough)
+    op.execute("UPDATE messages SET updated_at = timestamp")
+    op.create_index('ix_messages_session_id_updated_at', 'messages', ['session_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_session_id_updated_at', table_name='messages')
+    op.drop_column('messages', 'updated_at')
@@ -0,0 +1,39 @@
+"""Add token_usage table
+
+Revision ID: e5b8c2d4f710
+Revises: d9a3f7e2b146
+Create Date: 2026-10-17 19:41:12.306518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c2d4f710'
+down_revision = 'd9a3f7e2b146'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('token_usage',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('session_id', sa.String(), nullable=False),
+    sa.Column('message_id', sa.String(), nullable=True),
+    sa.Column('section_id', sa.String(), nullable=True),
+    sa.Column('purpose', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_token_usage_session_id_created_at', 'token_usage', ['session_id', 'created_at'], unique=False)
+    op.create_index('ix_token_usage_created_at', 'token_usage', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_token_usage_created_at', table_name='token_usage')
+    op.drop_index('ix_token_usage_session_id_created_at', table_name='token_usage')
+    op.drop_table('token_usage')
@@ -0,0 +1,190 @@
+"""
+Response compression: Brotli when the client accepts it and the brotli
+package is installed, gzip otherwise. Bodies under `minimum_size` bytes,
+Server-Sent Event streams and already-compressed media are sent as-is.
+
+A plain ASGI middleware over the public Headers/MutableHeaders API, with zlib
+and brotli doing the encoding, so it works with any Starlette release.
+"""
+import os
+import zlib
+from typing import Dict, Optional, Set
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Streams the client reads as they arrive, and media that is compressed already;
+# "type/*" matches the whole type
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/pdf",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "video/*",
+)
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings from an Accept-Encoding header, leaving out those refused with q=0"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        quality = params.strip().removeprefix("q=")
+        try:
+            if coding and (not params or float(quality) > 0):
+                accepted.add(coding)
+        except ValueError:
+            continue
+    return accepted
+
+def is_excluded(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type in EXCLUDED_CONTENT_TYPES or f"{media_type.partition('/')[0]}/*" in EXCLUDED_CONTENT_TYPES
+
+# Both allocate their compression state on first use, as most responses are small
+class GzipCompressor:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+        self._zlib = None
+
+    def compress(self, body: bytes, final: bool) -> bytes:
+        if self._zlib is None:
+            # wbits 16 + MAX_WBITS: gzip header and trailer rather than a raw zlib stream
+            self._zlib = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return self._zlib.compress(body) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class BrotliCompressor:
+    content_encoding = "br"
+
+    def __init__(self, quality: int = 4):
+        self.quality = quality
+        self._brotli = None
+
+    def compress(self, body: bytes, final: bool) -> bytes:
+        if self._brotli is None:
+            self._brotli = brotli.Compressor(quality=self.quality)
+        return self._brotli.process(body) + (self._brotli.finish() if final else self._brotli.flush())
+
+class _Responder:
+    """
+    Compresses one response. The start message is held back until the first
+    body chunk shows whether the response is worth compressing; a streamed
+    body is compressed (and flushed) chunk by chunk.
+    """
+
+    def __init__(self, send: Send, compressor, minimum_size: int, thread_minimum_size: int):
+        self.send = send
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.thread_minimum_size = thread_minimum_size
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressing = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or is_excluded(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is None:
+            # Later chunks of a streamed body
+            if self.compressing:
+                message["body"] = await self._compress(body, final=not more_body)
+            await self.send(message)
+            return
+
+        start, self.start = self.start, None
+        if len(body) < self.minimum_size and not more_body:
+            await self.send(start)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if self.compressor is not None:
+            self.compressing = True
+            message["body"] = await self._compress(body, final=not more_body)
+            headers["Content-Encoding"] = self.compressor.content_encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+        await self.send(start)
+        await self.send(message)
+
+    async def _compress(self, body: bytes, final: bool) -> bytes:
+        if len(body) >= self.thread_minimum_size:
+            # Large bodies would block the event loop while compressing
+            return await anyio.to_thread.run_sync(self.compressor.compress, body, final)
+        return self.compressor.compress(body, final)
+
+class CompressionMiddleware:
+    """Compresses responses with Brotli or gzip, whichever the client prefers and we support"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        thread_minimum_size: int = 128 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_minimum_size = thread_minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("Accept-Encoding", ""))
+        if brotli is not None and "br" in encodings:
+            compressor = BrotliCompressor(self.brotli_quality)
+        elif "gzip" in encodings:
+            compressor = GzipCompressor(self.gzip_level)
+        else:
+            compressor = None
+        responder = _Responder(send, compressor, self.minimum_size, self.thread_minimum_size)
+        await self.app(scope, receive, responder)
+
+def compression_options() -> Dict[str, int]:
+    """CompressionMiddleware options from COMPRESSION_MINIMUM_SIZE, GZIP_LEVEL and BROTLI_QUALITY"""
+    return {
+        "minimum_size": int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")),
+        "gzip_level": int(os.getenv("GZIP_LEVEL", "6")),
+        "brotli_quality": int(os.getenv("BROTLI_QUALITY", "4")),
+    }
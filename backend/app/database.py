@@ -1,26 +1,242 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from dataclasses import dataclass
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from typing import Any, Dict, Optional
 import os
+import time
 import logging
+from .metrics import DB_QUERIES, DB_QUERY_DURATION
+from .tracing import current_span, tracer
 
-# Hard-code the connection for now to debug
-SQLALCHEMY_DATABASE_URL = "postgresql://spencerwork@localhost:5432/chat_db"
+logger = logging.getLogger(__name__)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async drivers used by the request handlers
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-Base = declarative_base()
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
 
-logger = logging.getLogger(__name__)
+@dataclass
+class DatabaseSettings:
+    """Engine and pool configuration; see from_env for the environment variables"""
+    url: str = "postgresql://spencerwork@localhost:5432/chat_db"
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    # Server-side statement timeout in milliseconds (Postgres only); 0 disables it
+    statement_timeout_ms: int = 0
+    # SQLite only: WAL journal with synchronous=NORMAL, so readers don't block the writer
+    sqlite_wal: bool = True
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        """
+        Read DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+        DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS and SQLITE_WAL.
+        """
+        defaults = cls()
+        return cls(
+            url=os.getenv("DATABASE_URL", defaults.url),
+            pool_size=int(os.getenv("DB_POOL_SIZE", str(defaults.pool_size))),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", str(defaults.max_overflow))),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", str(defaults.pool_timeout))),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", str(defaults.pool_recycle))),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", "true"),
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")),
+            sqlite_wal=_env_bool("SQLITE_WAL", "true"),
+        )
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a database URL so it uses the async driver for its backend."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Unsupported database backend: {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+class PoolMetrics:
+    """Connection checkout wait times and timeouts, plus a view of pool saturation"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.engine: Optional[AsyncEngine] = None
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self) -> None:
+        self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+        # engine.pool, not a saved reference: dispose() replaces the pool
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            capacity = pool.size() + pool._max_overflow
+            checked_out = pool.checkedout()
+            stats.update(
+                size=pool.size(),
+                max_overflow=pool._max_overflow,
+                checked_out=checked_out,
+                idle=pool.checkedin(),
+                saturation=checked_out / capacity if capacity > 0 else 0.0,
+            )
+        return stats
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long each checkout waited for a connection"""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+def engine_options(settings: DatabaseSettings, metrics: PoolMetrics) -> Dict[str, Any]:
+    """Keyword arguments for create_async_engine for the configured backend"""
+    if is_memory_sqlite(settings.url):
+        # One shared connection, or every checkout would see an empty database
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+
+    pool_class = type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"metrics": metrics})
+    options: Dict[str, Any] = {
+        "poolclass": pool_class,
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+    }
+    if make_url(settings.url).get_backend_name() == "postgresql" and settings.statement_timeout_ms > 0:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.statement_timeout_ms)}}
+    return options
+
+def enable_sqlite_wal(engine: AsyncEngine) -> None:
+    """Switch every new SQLite connection to WAL with synchronous=NORMAL"""
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+def statement_operation(statement: str) -> str:
+    """Leading SQL keyword (SELECT, INSERT, ...), used as the db_queries_total label"""
+    words = statement.split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+def observe_queries(engine: AsyncEngine) -> None:
+    """Count and time every statement run on the engine (db_queries_total, db_query_duration_seconds)"""
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement_operation(statement)
+        DB_QUERIES.labels(operation=operation).inc()
+        DB_QUERY_DURATION.labels(operation=operation).observe(elapsed)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def discard_query_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+# Statements are recorded in full, without their parameters, up to this length
+TRACED_STATEMENT_MAX_CHARS = 2000
+
+def trace_queries(engine: AsyncEngine) -> None:
+    """
+    Record each statement as a CLIENT span under the current span. Statements
+    run outside any trace (migrations, pool pings at startup) are not traced.
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_query_span(conn, cursor, statement, parameters, context, executemany):
+        span = None
+        if current_span() is not None:
+            span = tracer.start_span(statement_operation(statement), kind=SpanKind.CLIENT, attributes={
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:TRACED_STATEMENT_MAX_CHARS],
+            })
+        conn.info.setdefault("query_spans", []).append(span)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def end_query_span(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["query_spans"].pop()
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def fail_query_span(exception_context):
+        connection = exception_context.connection
+        if connection is None or not connection.info.get("query_spans"):
+            return
+        span = connection.info["query_spans"].pop()
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+
+def create_engine_from_settings(settings: DatabaseSettings, metrics: PoolMetrics) -> AsyncEngine:
+    async_engine = create_async_engine(get_async_database_url(settings.url), **engine_options(settings, metrics))
+    metrics.engine = async_engine
+    observe_queries(async_engine)
+    trace_queries(async_engine)
+    if settings.sqlite_wal and make_url(settings.url).get_backend_name() == "sqlite" and not is_memory_sqlite(settings.url):
+        enable_sqlite_wal(async_engine)
+    return async_engine
+
+settings = DatabaseSettings.from_env()
+
+# Sync-style URL (also used by Alembic)
+SQLALCHEMY_DATABASE_URL = settings.url
+ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+
+pool_metrics = PoolMetrics()
+engine = create_engine_from_settings(settings, pool_metrics)
+# expire_on_commit=False so handlers can read attributes after commit without
+# triggering an implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception as e:
-        logger.error(f"Database error: {str(e)}", exc_info=True)
-        raise
-    finally:
-        db.close() 
\ No newline at end of file
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error("Database error: %s", e, exc_info=True)
+            raise
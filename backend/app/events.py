@@ -0,0 +1,290 @@
+"""
+Pub/sub hub for pushing live session updates to WebSocket clients.
+
+Handlers publish events for a session; every WebSocket subscribed to that
+session on this process receives them through a bounded queue. The transport
+between processes is a pluggable backend: the in-process backend delivers
+locally only, while the Redis backend fans events out to every uvicorn
+worker subscribed to the same Redis server.
+
+The hub also carries internal broadcasts between workers (e.g. cache
+invalidations), which go to registered listeners rather than WebSockets.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Event types pushed to clients
+MESSAGE_CREATED = "message.created"
+SECTION_GENERATED = "section.generated"
+GENERATION_PROGRESS = "generation.progress"
+
+CHANNEL_PREFIX = "session:"
+# Worker-to-worker broadcasts, never forwarded to clients
+INTERNAL_CHANNEL_PREFIX = "internal:"
+
+Dispatch = Callable[[str, str], None]
+# Called with the broadcast data and the instance id of the hub that sent it
+Listener = Callable[[Dict, str], None]
+
+class EventBackend(ABC):
+    """Transport between hubs. Subclasses deliver published payloads to `dispatch`."""
+
+    async def start(self, dispatch: Dispatch) -> None:
+        self.dispatch = dispatch
+
+    @abstractmethod
+    async def publish(self, channel: str, payload: str) -> None:
+        ...
+
+    async def stop(self) -> None:
+        pass
+
+class InProcessEventBackend(EventBackend):
+    """Delivers events to subscribers in this process only (single worker)."""
+
+    async def publish(self, channel: str, payload: str) -> None:
+        self.dispatch(channel, payload)
+
+class RedisEventBackend(EventBackend):
+    """
+    Shares events between workers through Redis PUBLISH / PSUBSCRIBE. If the
+    subscription drops, it is re-established with exponential backoff; events
+    published in the meantime are not delivered to this worker.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, base_delay: float = 0.5, max_delay: float = 30.0):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("The redis package is required for the Redis event backend")
+            client = redis.from_url(url)
+        self.client = client
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, dispatch: Dispatch) -> None:
+        await super().start(dispatch)
+        self._pubsub = await self._subscribe()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _subscribe(self):
+        pubsub = self.client.pubsub()
+        await pubsub.psubscribe(f"{CHANNEL_PREFIX}*", f"{INTERNAL_CHANNEL_PREFIX}*")
+        return pubsub
+
+    async def _close_pubsub(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        try:
+            await pubsub.aclose()
+        except Exception as e:
+            logger.debug("Error closing Redis subscription: %s", e)
+
+    async def _listen(self) -> None:
+        """Dispatch published events until stopped, resubscribing whenever the connection is lost"""
+        attempt = 0
+        while True:
+            try:
+                if self._pubsub is None:
+                    self._pubsub = await self._subscribe()
+                    logger.info("Redis event subscription restored")
+                attempt = 0
+                async for message in self._pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel, payload = message["channel"], message["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    if isinstance(payload, bytes):
+                        payload = payload.decode()
+                    self.dispatch(channel, payload)
+                raise ConnectionError("subscription closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                attempt += 1
+                logger.warning("Redis event subscription lost (%s), reconnecting in %.2fs", e, delay)
+                await self._close_pubsub()
+                await asyncio.sleep(delay)
+
+    async def publish(self, channel: str, payload: str) -> None:
+        await self.client.publish(channel, payload)
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.punsubscribe()
+        await self._close_pubsub()
+
+class EventHub:
+    def __init__(self, backend: Optional[EventBackend] = None, queue_size: int = 100):
+        self.backend = backend or InProcessEventBackend()
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listeners: Dict[str, List[Listener]] = {}
+        # Lets listeners tell this worker's broadcasts from other workers'
+        self.instance_id = uuid.uuid4().hex
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if not self._started:
+                await self.backend.start(self._dispatch)
+                self._started = True
+
+    async def stop(self) -> None:
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        if channel.startswith(INTERNAL_CHANNEL_PREFIX):
+            self._notify_listeners(channel[len(INTERNAL_CHANNEL_PREFIX):], payload)
+            return
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than grow without bound
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    async def publish(self, session_id: str, event_type: str, data: Dict) -> None:
+        """Publish an event for a session. Failures are logged, never raised to the caller."""
+        payload = json.dumps({
+            "type": event_type,
+            "session_id": session_id,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        try:
+            await self.start()
+            await self.backend.publish(f"{CHANNEL_PREFIX}{session_id}", payload)
+        except Exception as e:
+            logger.error("Error publishing %s for session %s: %s", event_type, session_id, e)
+
+    def _notify_listeners(self, topic: str, payload: str) -> None:
+        message = json.loads(payload)
+        for listener in self._listeners.get(topic, ()):
+            try:
+                listener(message["data"], message["origin"])
+            except Exception as e:
+                logger.error("Listener for %s failed: %s", topic, e, exc_info=True)
+
+    def add_listener(self, topic: str, listener: Listener) -> None:
+        """Call `listener(data, origin)` for every broadcast on `topic`, including this hub's own"""
+        self._listeners.setdefault(topic, []).append(listener)
+
+    async def broadcast(self, topic: str, data: Dict) -> None:
+        """Send an internal message to every worker. Failures are logged, never raised to the caller."""
+        payload = json.dumps({"origin": self.instance_id, "data": data})
+        try:
+            await self.start()
+            await self.backend.publish(f"{INTERNAL_CHANNEL_PREFIX}{topic}", payload)
+        except Exception as e:
+            logger.error("Error broadcasting %s: %s", topic, e)
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str):
+        """Yield a queue that receives the JSON payload of every event for the session."""
+        await self.start()
+        channel = f"{CHANNEL_PREFIX}{session_id}"
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+class DeltaPublisher:
+    """
+    Forwards a token stream to a session's subscribers as GENERATION_PROGRESS
+    "streaming" events without slowing the stream down: deltas are coalesced
+    into at most one event per `interval` seconds and published, in order, by
+    a background task. Like EventHub.publish, failures are logged, never raised.
+    """
+
+    def __init__(self, hub: EventHub, session_id: str, interval: float = 0.25, max_pending: int = 16):
+        self.hub = hub
+        self.session_id = session_id
+        self.interval = interval
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def add(self, delta: str) -> None:
+        self._buffer.append(delta)
+        if time.monotonic() - self._last_flush >= self.interval:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._publish_queued())
+        try:
+            self._queue.put_nowait("".join(self._buffer))
+        except asyncio.QueueFull:
+            # The backend is falling behind: keep buffering, the next flush sends it all
+            return
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    async def _publish_queued(self) -> None:
+        while True:
+            content = await self._queue.get()
+            if content is None:
+                return
+            await self.hub.publish(self.session_id, GENERATION_PROGRESS, {"status": "streaming", "content": content})
+
+    async def close(self) -> None:
+        """Publish whatever is still buffered and wait for it to go out"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._buffer and self._worker is None:
+            self._worker = asyncio.create_task(self._publish_queued())
+        if self._worker is None:
+            return
+        if self._buffer:
+            await self._queue.put("".join(self._buffer))
+            self._buffer.clear()
+        await self._queue.put(None)
+        await self._worker
+
+def create_event_backend(url: Optional[str] = None) -> EventBackend:
+    """Pick the backend from EVENT_BACKEND_URL: redis://... or unset for in-process."""
+    url = url if url is not None else os.getenv("EVENT_BACKEND_URL", "")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisEventBackend(url)
+    if url:
+        raise ValueError(f"Unsupported event backend URL: {url}")
+    return InProcessEventBackend()
+
+event_hub = EventHub(create_event_backend())
@@ -0,0 +1,201 @@
+"""
+Logging setup: leveled, optionally JSON-structured records written by a
+background thread.
+
+Handlers log through a non-blocking QueueHandler; a QueueListener thread does
+the JSON encoding and the actual writes. If the queue is full, records are
+dropped and counted rather than blocking the event loop.
+
+Large payloads (chat histories, prompts, replies) are logged through
+payload_preview(), which is only rendered if the record is actually emitted
+and is capped at LOG_PAYLOAD_MAX_CHARS. DEBUG records carrying a payload are
+sampled at LOG_DEBUG_SAMPLE_RATE.
+
+Records written while handling a request carry its request_id, trace_id and
+span_id, so log lines can be matched with the request's trace.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Optional
+from .tracing import current_request_id, current_span, format_id
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_payload_max_chars = 500
+
+class PayloadPreview:
+    """A payload rendered (as JSON where possible) and truncated only when the record is formatted"""
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: Optional[int] = None):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        limit = self.max_chars if self.max_chars is not None else _payload_max_chars
+        if isinstance(self.value, str):
+            text = self.value
+        else:
+            try:
+                text = json.dumps(self.value, default=str, ensure_ascii=False)
+            except (TypeError, ValueError):
+                text = repr(self.value)
+        if len(text) <= limit:
+            return text
+        return f"{text[:limit]}... ({len(text) - limit} more chars)"
+
+def payload_preview(value: Any, max_chars: Optional[int] = None) -> PayloadPreview:
+    return PayloadPreview(value, max_chars)
+
+class PayloadSampler(logging.Filter):
+    """Keeps only a `rate` fraction of DEBUG records that carry a payload preview"""
+
+    def __init__(self, rate: float, rand: Callable[[], float] = random.random):
+        super().__init__()
+        self.rate = rate
+        self.rand = rand
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or not isinstance(record.args, tuple):
+            return True
+        if not any(isinstance(arg, PayloadPreview) for arg in record.args):
+            return True
+        return self.rand() < self.rate
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current request ID and trace/span ids to the record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = current_request_id()
+        if request_id is not None:
+            record.request_id = request_id
+        span = current_span()
+        if span is not None:
+            context = span.get_span_context()
+            record.trace_id = format_id(context.trace_id, 32)
+            record.span_id = format_id(context.span_id, 16)
+        return True
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, any `extra` fields and the traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now, while its arguments are still current;
+        # JSON encoding and I/O happen on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+@dataclass
+class LoggingSettings:
+    level: str = "INFO"
+    # "json" or "text"
+    format: str = "json"
+    payload_max_chars: int = 500
+    debug_sample_rate: float = 0.1
+    queue_size: int = 10000
+
+    @classmethod
+    def from_env(cls) -> "LoggingSettings":
+        """Read LOG_LEVEL, LOG_FORMAT, LOG_PAYLOAD_MAX_CHARS, LOG_DEBUG_SAMPLE_RATE and LOG_QUEUE_SIZE"""
+        defaults = cls()
+        return cls(
+            level=os.getenv("LOG_LEVEL", defaults.level).upper(),
+            format=os.getenv("LOG_FORMAT", defaults.format).lower(),
+            payload_max_chars=int(os.getenv("LOG_PAYLOAD_MAX_CHARS", str(defaults.payload_max_chars))),
+            debug_sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE_RATE", str(defaults.debug_sample_rate))),
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", str(defaults.queue_size))),
+        )
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+def configure_logging(settings: Optional[LoggingSettings] = None, stream=None) -> NonBlockingQueueHandler:
+    """
+    Route the root logger through a queue to a stream handler on a listener
+    thread. Calling it again replaces the previous configuration.
+    """
+    global _listener, _queue_handler, _payload_max_chars
+    settings = settings or LoggingSettings.from_env()
+    stop_logging()
+
+    _payload_max_chars = settings.payload_max_chars
+    output = logging.StreamHandler(stream or sys.stderr)
+    if settings.format == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s]: %(message)s", defaults={"request_id": "-"}
+        ))
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.queue_size))
+    _queue_handler.addFilter(PayloadSampler(settings.debug_sample_rate))
+    # Context variables are only visible on the logging thread, not the listener's
+    _queue_handler.addFilter(RequestContextFilter())
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(settings.level)
+    root.addHandler(_queue_handler)
+    return _queue_handler
+
+def stop_logging() -> None:
+    """Flush queued records and detach the queue handler"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def logging_stats() -> Dict[str, int]:
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
+
+atexit.register(stop_logging)
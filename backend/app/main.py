@@ -1,27 +1,73 @@
-from fastapi import FastAPI, HTTPException, Depends, Body
+from fastapi import FastAPI, HTTPException, Depends, Body, Header, Query, Response, WebSocket, WebSocketDisconnect, status, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field, field_validator, ValidationError
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import dataclasses
+import json
+from contextlib import aclosing, asynccontextmanager
+from functools import partial
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum, auto
-from services.openai_service import OpenAIService, OpenAIServiceError
+from services.openai_service import OpenAIService, OpenAIServiceError, NEWSLETTER_SYSTEM_PROMPT
+from templates.prompts import PROMPT_TEMPLATES
+from services.context import ContextWindow, create_context_assembler
+from services.summarizer import create_session_summarizer, summary_message
+from services.newsletter import create_newsletter_generator, COMPLETED, SECTION_DEPENDENCIES
+from services.assembly import create_newsletter_assembler
+from services.history_cache import CachedHistory, create_history_cache
+from services.session_state import create_session_state
+from services.cache import make_cache_key
+from services.usage import BudgetExceededError, TurnPlan, UsageEntry, UsageRecorder, capture_usage, create_token_budget
+from services.export import create_export_service, ExportError, ExportQueueFullError, ExportUnavailableError, MEDIA_TYPES
 from dotenv import load_dotenv
 import os
-from sqlalchemy.orm import Session
-from . import models, schemas, database
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, database
 from .database import get_db
+from .pagination import encode_cursor, decode_cursor
+from .compression import CompressionMiddleware, compression_options
+from .responses import ClosingStreamingResponse, ORJSONResponse
+from .schemas import (
+    MessageDelta, MessageOut, SectionList, SectionOut, SessionCreated, SessionDetail, SessionList,
+    SessionOut, StatusMessage, UsageBudget, UsageReport, UsageRow
+)
+from .queries import (
+    MESSAGE_COLUMNS, context_messages_query, message_page_query, session_messages_query, session_version_query,
+    session_with_summary_query, sessions_page_query, tokens_used_query, usage_report_query
+)
+from .events import DeltaPublisher, event_hub, MESSAGE_CREATED, SECTION_GENERATED, GENERATION_PROGRESS
+from .logging_config import configure_logging, logging_stats, payload_preview
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, GENERATIONS_IN_PROGRESS, MetricsMiddleware, expose as expose_metrics
+from .tracing import TracingMiddleware, configure_tracing, current_span, tracer, tracing_stats
 import logging
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Leveled (LOG_LEVEL), structured logging written from a background thread
+configure_logging()
 logger = logging.getLogger(__name__)
+# Spans for requests, SQL statements and OpenAI calls (TRACING_EXPORTER)
+configure_tracing()
 
 # Create the FastAPI app instance
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await event_hub.start()
+    yield
+    await event_hub.stop()
+    if hasattr(get_session_state, "_instance"):
+        await get_session_state._instance.close()
+    if hasattr(get_export_service, "_instance"):
+        get_export_service._instance.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Update the CORS middleware configuration
 app.add_middleware(
@@ -31,9 +77,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Now we can define the sessions dictionary
-sessions: Dict[str, Session] = {}
+# Brotli or gzip for responses over COMPRESSION_MINIMUM_SIZE bytes
+app.add_middleware(CompressionMiddleware, **compression_options())
+# Request latency for everything inside tracing (compression included); served at /metrics
+app.add_middleware(MetricsMiddleware)
+# Request IDs and the request span wrap everything else, including the metrics
+app.add_middleware(TracingMiddleware)
 
 # Add this function to get the OpenAI service
 def get_openai_service():
@@ -41,6 +90,46 @@ def get_openai_service():
         get_openai_service._instance = OpenAIService()
     return get_openai_service._instance
 
+def get_context_assembler():
+    if not hasattr(get_context_assembler, "_instance"):
+        get_context_assembler._instance = create_context_assembler(NEWSLETTER_SYSTEM_PROMPT)
+    return get_context_assembler._instance
+
+def get_session_summarizer():
+    if not hasattr(get_session_summarizer, "_instance"):
+        get_session_summarizer._instance = create_session_summarizer(get_session_state())
+    return get_session_summarizer._instance
+
+def get_history_cache():
+    if not hasattr(get_history_cache, "_instance"):
+        get_history_cache._instance = create_history_cache(event_hub)
+    return get_history_cache._instance
+
+def get_session_state():
+    if not hasattr(get_session_state, "_instance"):
+        get_session_state._instance = create_session_state()
+    return get_session_state._instance
+
+def get_newsletter_generator():
+    if not hasattr(get_newsletter_generator, "_instance"):
+        get_newsletter_generator._instance = create_newsletter_generator()
+    return get_newsletter_generator._instance
+
+def get_newsletter_assembler():
+    if not hasattr(get_newsletter_assembler, "_instance"):
+        get_newsletter_assembler._instance = create_newsletter_assembler()
+    return get_newsletter_assembler._instance
+
+def get_token_budget():
+    if not hasattr(get_token_budget, "_instance"):
+        get_token_budget._instance = create_token_budget()
+    return get_token_budget._instance
+
+def get_export_service():
+    if not hasattr(get_export_service, "_instance"):
+        get_export_service._instance = create_export_service()
+    return get_export_service._instance
+
 class SpeakerType(str, Enum):
     USER = "user"
     SYSTEM = "system"
@@ -52,21 +141,47 @@ class MessageCreate(BaseModel):
     content: str
     timestamp: str
     metadata: Optional[Dict] = {}
+    pinned: bool = False
 
     @field_validator('timestamp')
     def validate_timestamp(cls, v):
         try:
-            datetime.fromisoformat(v)
+            models.parse_timestamp(v)
         except ValueError:
             raise ValueError('Invalid timestamp format. Must be ISO format.')
         return v
 
+class MessageUpdate(BaseModel):
+    pinned: bool
+
+class FinalizeRequest(BaseModel):
+    session_id: str
+
+class SectionUpdate(BaseModel):
+    state: models.SectionState
+    # Defaults to the latest version
+    version: Optional[int] = None
+
 class SectionType(str, Enum):
     THESIS = "thesis"
     INTRODUCTION = "introduction"
+    BODY_SECTION = "body_section"
     ACTIONABLE_TRADES = "actionable_trades"
     CONCLUSION = "conclusion"
 
+# Prompt template (and stored section type) for section types whose names differ
+SECTION_TEMPLATE_KEYS = {SectionType.THESIS: "thesis_overview"}
+
+# Page size for message fetches that pass a cursor but no limit
+DEFAULT_MESSAGE_PAGE_SIZE = 100
+
+# Expiry of the per-session generation lock, so a crashed worker can't hold it forever
+GENERATION_LOCK_TTL_SECONDS = 600
+
+# Reply allowance of a chat turn and of a single section, as budgeted for
+CHAT_MAX_TOKENS = 2000
+SECTION_MAX_TOKENS = 500
+
 class NewsletterSection(BaseModel):
     section_type: SectionType
     content: str = Field(..., min_length=1)
@@ -86,6 +201,8 @@ class SectionGenerationRequest(BaseModel):
     session_id: str
     section_type: SectionType
     context: Dict[str, str]
+    # Skip the cached copy and regenerate (the fresh result replaces it)
+    bypass_cache: bool = False
 
     @field_validator('context')
     def validate_context(cls, v):
@@ -95,202 +212,1030 @@ class SectionGenerationRequest(BaseModel):
             raise ValueError(f"Missing required context fields: {', '.join(missing)}")
         return v
 
+class NewsletterGenerationRequest(BaseModel):
+    session_id: str
+    context: Dict[str, str]
+    bypass_cache: bool = False
+
+    @field_validator('context')
+    def validate_context(cls, v):
+        if 'topic' not in v:
+            raise ValueError("Missing required context fields: topic")
+        return v
+
 @app.get("/")
 def read_root():
     return {"message": "Newsletter Builder API"}
 
-@app.post("/session")
-async def create_session(db: Session = Depends(get_db)):
+@app.post("/session", response_model=SessionCreated)
+async def create_session(db: AsyncSession = Depends(get_db)):
     db_session = models.DBSession()
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    await db.commit()
+    await db.refresh(db_session)
     return {"session_id": db_session.id}
 
-@app.get("/sessions")
-async def get_sessions(db: Session = Depends(get_db)):
+@app.get("/sessions", response_model=SessionList)
+async def get_sessions(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    # Keyset pagination on (created_at, id), newest first
+    after = parse_cursor(cursor)
+
     try:
-        # Query all sessions ordered by creation date
-        sessions = db.query(models.DBSession).order_by(models.DBSession.created_at.desc()).all()
-        
-        # Format the response
-        formatted_sessions = []
-        for session in sessions:
-            try:
-                # Get message count for the session
-                message_count = db.query(models.DBMessage).filter(
-                    models.DBMessage.session_id == session.id
-                ).count()
-                
-                # Format the session data
-                formatted_session = {
-                    "id": session.id,
-                    "title": session.title or f"Chat from {session.created_at.strftime('%B %d, %Y')}",
-                    "created_at": session.created_at.isoformat(),
-                    "message_count": message_count
-                }
-                formatted_sessions.append(formatted_session)
-            except Exception as session_error:
-                logger.error(f"Error formatting session {session.id}: {str(session_error)}")
-                continue
-        
-        return {"sessions": formatted_sessions}
+        # Fetch one extra row to know whether there is a next page
+        result = await db.execute(sessions_page_query(limit + 1, after))
+        rows = result.all()
     except Exception as e:
-        logger.error(f"Error fetching sessions: {str(e)}", exc_info=True)
+        logger.error("Error fetching sessions: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500, 
             detail=f"Error fetching sessions: {str(e)}"
         )
 
-@app.get("/session/{session_id}")
-async def get_session(session_id: str, db: Session = Depends(get_db)):
-    session = db.query(models.DBSession).filter(models.DBSession.id == session_id).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Format messages to be properly returned to frontend
-    messages = db.query(models.DBMessage).filter(models.DBMessage.session_id == session_id).all()
-    formatted_messages = [
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    formatted_sessions = [
         {
-            "id": msg.id,
-            "session_id": msg.session_id,
-            "speaker": msg.speaker,
-            "timestamp": msg.timestamp.isoformat(),
-            "content": msg.content,
-            "message_metadata": msg.message_metadata
+            "id": row.id,
+            "title": row.title or f"Chat from {row.created_at.strftime('%B %d, %Y')}",
+            "created_at": row.created_at,
+            "message_count": row.message_count
         }
-        for msg in messages
+        for row in rows
     ]
-    
-    # Return formatted session data
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    body = {"sessions": formatted_sessions, "next_cursor": next_cursor}
+
+    # The page is one query either way; the ETag saves resending an unchanged list
+    etag = '"' + make_cache_key(page=body)[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return ORJSONResponse(body, headers=headers)
+
+def parse_cursor(cursor: Optional[str]):
+    """Decode an optional cursor query parameter, answering 400 if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+MESSAGE_FIELDS = tuple(column.key for column in MESSAGE_COLUMNS)
+
+def message_rows(rows) -> List[Dict]:
+    """Message rows (MESSAGE_COLUMNS) as response dicts in one pass; ORJSONResponse renders the timestamps"""
+    return [dict(zip(MESSAGE_FIELDS, row)) for row in rows]
+
+async def fetch_message_page(
+    session_id: str,
+    db: AsyncSession,
+    limit: int,
+    before: Optional[str] = None,
+    since: Optional[str] = None
+) -> Dict:
+    """
+    One keyset page of messages, oldest first. `has_more` says whether further
+    messages exist in the paging direction: older ones when paging back with
+    `before` (continue from `prev_cursor`), newer ones when syncing with `since`
+    (continue from `next_cursor`).
+    """
+    before_key, since_key = parse_cursor(before), parse_cursor(since)
+    # Fetch one extra row to know whether there is another page
+    result = await db.execute(message_page_query(session_id, limit + 1, before_key, since_key))
+    messages = result.all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if since_key is None:
+        messages.reverse()
+
+    oldest, newest = (messages[0], messages[-1]) if messages else (None, None)
     return {
+        "messages": message_rows(messages),
+        "has_more": has_more,
+        "prev_cursor": encode_cursor(oldest.timestamp, oldest.id) if has_more and since_key is None else None,
+        # Nothing new: hand the client's cursor back so it can poll with it again
+        "next_cursor": encode_cursor(newest.timestamp, newest.id) if newest else since
+    }
+
+def session_etag(version, **params) -> str:
+    """Strong ETag for a view of a session's messages: its last-modified message plus the query"""
+    key = make_cache_key(
+        session_id=version.id,
+        message_count=version.message_count,
+        last_modified=version.last_modified,
+        params=params
+    )
+    return '"' + key[:32] + '"'
+
+@app.get("/session/{session_id}", response_model=SessionDetail)
+async def get_session(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[str] = None,
+    since: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    A session and its messages, oldest first. Without parameters every message
+    is returned. With `limit` the newest `limit` messages are returned; `before`
+    pages back through older messages and `since` fetches only newer ones, both
+    taking the opaque cursors returned as `prev_cursor` / `next_cursor`.
+
+    The ETag comes from the session's message count and last-modified message,
+    so a matching If-None-Match gets a 304 before any message is loaded.
+    """
+    if before and since:
+        raise HTTPException(status_code=400, detail="Pass either before or since, not both")
+
+    session = (await db.execute(session_version_query(session_id))).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    etag = session_etag(session, limit=limit, before=before, since=since)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if limit is None and not before and not since:
+        result = await db.execute(session_messages_query(session_id))
+        messages = result.all()
+        page = {
+            "messages": message_rows(messages),
+            "has_more": False,
+            "prev_cursor": None,
+            "next_cursor": encode_cursor(messages[-1].timestamp, messages[-1].id) if messages else None
+        }
+    else:
+        page = await fetch_message_page(session_id, db, limit or DEFAULT_MESSAGE_PAGE_SIZE, before, since)
+
+    return ORJSONResponse({
         "id": session.id,
         "session_id": session.id,
-        "created_at": session.created_at.isoformat(),
-        "messages": formatted_messages
+        "created_at": session.created_at,
+        **page
+    }, headers=headers)
+
+@app.get("/session/{session_id}/messages/delta", response_model=MessageDelta)
+async def get_message_delta(
+    session_id: str,
+    since: str,
+    limit: int = Query(DEFAULT_MESSAGE_PAGE_SIZE, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Messages newer than the client's last-seen cursor, oldest first. Poll with
+    the returned `next_cursor`; `has_more` means another page is already waiting.
+    """
+    session = await db.get(models.DBSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    page = await fetch_message_page(session_id, db, limit, since=since)
+    return ORJSONResponse({"session_id": session_id, **page})
+
+def new_user_message(message: MessageCreate) -> models.DBMessage:
+    # The id is assigned up front so the message can be announced before it is flushed
+    return models.DBMessage(
+        id=models.generate_uuid(),
+        session_id=message.session_id,
+        speaker=message.speaker,
+        content=message.content,
+        timestamp=models.parse_timestamp(message.timestamp),
+        message_metadata=message.metadata,
+        pinned=message.pinned
+    )
+
+def history_item(msg: models.DBMessage):
+    return (msg.speaker, msg.content, msg.pinned)
+
+async def load_history(session_id: str, db: AsyncSession) -> CachedHistory:
+    """
+    The session's summary and the messages after it, from the history cache
+    or else the database: the session check together with its summary, then
+    the speaker/content of the history that follows it.
+    """
+    history_cache = get_history_cache()
+    cached = history_cache.get(session_id)
+    span = current_span()
+    if span is not None:
+        span.set_attribute("history.cache_hit", cached is not None)
+    if cached is not None:
+        return cached
+
+    token = history_cache.load_token()
+    with tracer.start_as_current_span("session.lookup"):
+        session = (await db.execute(session_with_summary_query(session_id))).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    summary = session if session.summary is not None else None
+
+    # Older turns are represented by the rolling summary; only load what follows it
+    # (plus pinned messages, which are always sent verbatim)
+    with tracer.start_as_current_span("history.query") as span:
+        result = await db.execute(context_messages_query(session_id, summary))
+        history = CachedHistory(session.summary, [(row.speaker, row.content, row.pinned) for row in result])
+        span.set_attribute("history.messages", len(history.messages))
+    history_cache.set(session_id, history, token)
+    return history
+
+def assemble_context(session_id: str, messages_context: List[Dict], budget: Optional[int] = None) -> ContextWindow:
+    """Fit the history into the context assembler's token budget, or into `budget` if given"""
+    assembler = get_context_assembler()
+    if budget is not None:
+        assembler = dataclasses.replace(assembler, budget=budget)
+    with tracer.start_as_current_span("prompt.assembly") as span:
+        window = assembler.assemble(messages_context)
+        span.set_attribute("prompt.tokens", window.metrics.tokens_kept)
+        span.set_attribute("prompt.messages", window.metrics.messages_kept)
+    logger.info(
+        "Context for session %s: kept %d tokens (%d messages), dropped %d tokens (%d messages)",
+        session_id, window.metrics.tokens_kept, window.metrics.messages_kept,
+        window.metrics.tokens_dropped, window.metrics.messages_dropped,
+        extra={"session_id": session_id, "context": window.metrics.to_dict()}
+    )
+    return window
+
+async def build_context(user_message: models.DBMessage, db: AsyncSession) -> Tuple[ContextWindow, TurnPlan]:
+    """
+    Return the context window for replying to `user_message` (not stored
+    yet) and how the reply fits the token budget. A turn that would overrun
+    the session or daily budget gets a smaller context window, or a cheaper
+    model and shorter reply (see TokenBudget); 429 if not even that fits.
+    """
+    history = await load_history(user_message.session_id, db)
+
+    # Format messages properly for OpenAI
+    messages_context = [summary_message(history.summary)] if history.summary is not None else []
+    for speaker, content, pinned in history.messages:
+        messages_context.append({
+            "role": speaker,  # This will be converted in the service
+            "content": content,
+            "pinned": pinned
+        })
+    messages_context.append({
+        "role": user_message.speaker,
+        "content": user_message.content,
+        "pinned": user_message.pinned
+    })
+
+    logger.debug("Previous messages context: %s", payload_preview(messages_context))
+
+    # Keep the prompt within the token budget
+    window = assemble_context(user_message.session_id, messages_context)
+    remaining = await remaining_budget(user_message.session_id, db)
+    plan = plan_turn(remaining, window.metrics.tokens_kept, CHAT_MAX_TOKENS)
+    if plan.trimmed and plan.context_budget < window.metrics.tokens_kept:
+        window = assemble_context(user_message.session_id, messages_context, plan.context_budget)
+    if plan.trimmed or plan.downgraded:
+        logger.info(
+            "Token budget for session %s: %d tokens left, turn %s",
+            user_message.session_id, remaining, plan.to_dict(),
+            extra={"session_id": user_message.session_id, "budget": plan.to_dict()}
+        )
+    return window, plan
+
+def start_of_day() -> datetime:
+    """Midnight UTC today, where the daily token budget resets"""
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+async def remaining_budget(session_id: str, db: AsyncSession) -> Optional[int]:
+    """Tokens left for the session today, or None when no budget is configured"""
+    budget = get_token_budget()
+    if not budget.enabled:
+        return None
+    session_used = await db.scalar(tokens_used_query(session_id=session_id)) if budget.session_limit > 0 else 0
+    daily_used = await db.scalar(tokens_used_query(since=start_of_day())) if budget.daily_limit > 0 else 0
+    return budget.remaining(session_used, daily_used)
+
+def plan_turn(remaining: Optional[int], prompt_tokens: int, max_tokens: int, trimmable: bool = True) -> TurnPlan:
+    try:
+        return get_token_budget().plan(remaining, prompt_tokens, max_tokens, trimmable=trimmable)
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def usage_rows(
+    session_id: str,
+    entries: List[UsageEntry],
+    message_id: Optional[str] = None,
+    section_id: Optional[str] = None
+) -> List[models.DBTokenUsage]:
+    """Ledger rows for recorded completions, to be committed with whatever they generated"""
+    now = datetime.utcnow()
+    return [
+        models.DBTokenUsage(
+            session_id=session_id,
+            message_id=message_id,
+            section_id=section_id,
+            purpose=entry.purpose,
+            model=entry.model,
+            prompt_tokens=entry.prompt_tokens,
+            completion_tokens=entry.completion_tokens,
+            created_at=now
+        )
+        for entry in entries
+    ]
+
+def section_prompt_tokens(section_type: str, context: Dict) -> int:
+    """Rough size of a section prompt, for budgeting before it is generated"""
+    text = NEWSLETTER_SYSTEM_PROMPT + PROMPT_TEMPLATES.get(section_type, "") + " ".join(str(v) for v in context.values())
+    return get_context_assembler().count_tokens(text)
+
+async def summarize_session(session_id: str, openai_service) -> None:
+    """Background task: fold older turns into the summary, then drop the now-stale cached history"""
+    with capture_usage() as usage:
+        summarized = await get_session_summarizer().maybe_summarize(session_id, openai_service)
+    if summarized:
+        await get_history_cache().invalidate(session_id)
+    if usage.entries:
+        try:
+            async with database.AsyncSessionLocal() as db:
+                db.add_all(usage_rows(session_id, usage.entries))
+                await db.commit()
+        except Exception as e:
+            logger.error("Error recording summary token usage for session %s: %s", session_id, e)
+
+async def remember_messages(session_id: str, messages: List[models.DBMessage]) -> None:
+    """Write just-committed messages through to the history cache and the session state store"""
+    await get_history_cache().append(session_id, [history_item(msg) for msg in messages])
+    try:
+        await get_session_state().push_messages(session_id, [format_message(msg) for msg in messages])
+    except Exception as e:
+        logger.error("Error storing recent messages for session %s: %s", session_id, e)
+
+async def store_user_message(message: MessageCreate, db: AsyncSession) -> Tuple[ContextWindow, TurnPlan]:
+    """
+    Persist the user's message, in the transaction that checked the session,
+    and return the token-budgeted context window and plan for the reply. The
+    turn is committed and announced before any model call, so it survives a
+    failed or interrupted reply.
+    """
+    user_message = new_user_message(message)
+    window, plan = await build_context(user_message, db)
+    with tracer.start_as_current_span("message.commit"):
+        db.add(user_message)
+        await db.commit()
+    await remember_messages(message.session_id, [user_message])
+    await event_hub.publish(message.session_id, MESSAGE_CREATED, format_message(user_message))
+    return window, plan
+
+def format_message(msg: models.DBMessage) -> Dict:
+    return {
+        "id": msg.id,
+        "session_id": msg.session_id,
+        "speaker": msg.speaker,
+        "content": msg.content,
+        "timestamp": msg.timestamp.isoformat(),
+        "metadata": msg.message_metadata or {},
+        "pinned": msg.pinned
     }
 
-@app.post("/message")
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/message", response_model=MessageOut)
 async def create_message(
     message: MessageCreate,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
 ):
-    try:
-        logger.debug(f"Received message request: {message}")
-        
-        # Verify session exists
-        session = db.query(models.DBSession).filter(
-            models.DBSession.id == message.session_id
-        ).first()
+    """
+    Store the user's message, then the assistant's reply. The session check,
+    history read and user message insert share one transaction, committed
+    before the model is called; the connection is released while the model
+    answers and the reply (with its token usage) is committed afterwards.
+    """
+    with tracer.start_as_current_span("create_message", attributes={"session.id": message.session_id}):
+        try:
+            logger.debug("Received message request for session %s: %s", message.session_id, payload_preview(message.content))
+            window, plan = await store_user_message(message, db)
+            # Don't hold a pooled connection for the length of the LLM call
+            await db.close()
+
+            # Generate AI response
+            logger.debug("Calling OpenAI service for response")
+            await event_hub.publish(message.session_id, GENERATION_PROGRESS, {"status": "started"})
+            with capture_usage() as usage, GENERATIONS_IN_PROGRESS.labels(kind="chat").track_inprogress():
+                ai_response = await get_openai_service().generate_response(
+                    messages=window.messages, **plan.overrides(CHAT_MAX_TOKENS)
+                )
         
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
+            # Log the AI response for debugging
+            logger.debug("Received AI response: %s", payload_preview(ai_response))
 
-        # Create user message
-        logger.debug("Creating user message in database")
-        user_message = models.DBMessage(
-            session_id=message.session_id,
-            speaker=message.speaker,
-            content=message.content,
-            timestamp=message.timestamp,
-            metadata=message.metadata
-        )
-        db.add(user_message)
-        db.commit()
-
-        # Get previous messages for context
-        previous_messages = db.query(models.DBMessage).filter(
-            models.DBMessage.session_id == message.session_id
-        ).order_by(models.DBMessage.timestamp).all()
-
-        # Format messages properly for OpenAI
-        messages_context = []
-        for msg in previous_messages:
-            messages_context.append({
-                "role": msg.speaker,  # This will be converted in the service
-                "content": msg.content
-            })
-
-        logger.debug(f"Previous messages context: {messages_context}")
-
-        # Generate AI response
-        logger.debug("Calling OpenAI service for response")
-        ai_response = await get_openai_service().generate_response(messages=messages_context)
+            ai_message = await save_assistant_message(
+                message.session_id, ai_response, reply_metadata(window, plan, usage.entries), usage.entries
+            )
+            # Create a properly formatted response that includes all needed data
+            response = format_message(ai_message)
+            await event_hub.publish(message.session_id, GENERATION_PROGRESS, {"status": "completed"})
+
+            # Fold older turns into the rolling summary after the response is sent
+            background_tasks.add_task(summarize_session, message.session_id, get_openai_service())
         
-        # Log the AI response for debugging
-        logger.debug(f"Received AI response: {ai_response[:100]}...")
+            logger.debug("Returning AI message %s with content length %d", response["id"], len(response["content"]))
+            return response
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Unexpected error in create_message: %s", e, exc_info=True)
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
-        # Create AI message
+def reply_metadata(window: ContextWindow, plan: TurnPlan, usage: List[UsageEntry], **extra) -> Dict:
+    """message_metadata of an assistant reply: context metrics, token usage and any budget adjustment"""
+    metadata = {**extra, "context": window.metrics.to_dict(), "usage": UsageRecorder.summarize(usage)}
+    if plan.trimmed or plan.downgraded:
+        metadata["budget"] = plan.to_dict()
+    return metadata
+
+async def save_assistant_message(
+    session_id: str, content: str, metadata: Dict, usage: Optional[List[UsageEntry]] = None
+) -> models.DBMessage:
+    """Write an assistant reply, and the tokens it used, in its own DB session once generation has ended"""
+    async with database.AsyncSessionLocal() as db:
         ai_message = models.DBMessage(
-            session_id=message.session_id,
+            id=models.generate_uuid(),
+            session_id=session_id,
             speaker=SpeakerType.ASSISTANT,
-            content=ai_response,
-            timestamp=datetime.utcnow().isoformat(),
-            metadata={}
+            content=content,
+            timestamp=datetime.utcnow(),
+            message_metadata=metadata,
+            pinned=False
         )
-        db.add(ai_message)
-        db.commit()
-        
-        # Create a properly formatted response that includes all needed data
-        response = {
-            "id": ai_message.id,
-            "session_id": ai_message.session_id,
-            "speaker": ai_message.speaker,
-            "content": ai_message.content,
-            "timestamp": ai_message.timestamp,
-            "metadata": ai_message.metadata or {}
-        }
-        
-        logger.debug(f"Returning AI message: {response['id']} with content length {len(response['content'])}")
-        return response
+        with tracer.start_as_current_span("message.commit"):
+            db.add_all([ai_message, *usage_rows(session_id, usage or [], message_id=ai_message.id)])
+            await db.commit()
+    await remember_messages(session_id, [ai_message])
+    await event_hub.publish(session_id, MESSAGE_CREATED, format_message(ai_message))
+    return ai_message
 
+@app.post("/message/stream")
+async def create_message_stream(
+    message: MessageCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Same as POST /message, but streams the reply as Server-Sent Events:
+    `delta` events carry content chunks, then a single `done` event carries the
+    stored assistant message (or an `error` event if generation failed).
+    """
+    try:
+        window, plan = await store_user_message(message, db)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error in create_message: {str(e)}", exc_info=True)
-        db.rollback()
+        logger.error("Unexpected error in create_message_stream: %s", e, exc_info=True)
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/generate/section")
-async def generate_section(request: SectionGenerationRequest):
-    if request.session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[request.session_id]
-    
+    openai_service = get_openai_service()
+
+    async def event_stream():
+        chunks = []
+        saved = False
+        usage = UsageRecorder()
+        in_progress = GENERATIONS_IN_PROGRESS.labels(kind="chat_stream")
+        in_progress.inc()
+        # Subscribers get the reply in coalesced batches, published off the token path
+        progress = DeltaPublisher(event_hub, message.session_id)
+
+        async def save_reply(**extra) -> models.DBMessage:
+            """Store the reply; marked saved up front so a failure after the commit never stores it twice"""
+            nonlocal saved
+            saved = True
+            return await save_assistant_message(
+                message.session_id, "".join(chunks), reply_metadata(window, plan, usage.entries, **extra),
+                usage.entries
+            )
+
+        try:
+            await event_hub.publish(message.session_id, GENERATION_PROGRESS, {"status": "started"})
+            deltas = openai_service.stream_response(messages=window.messages, **plan.overrides(CHAT_MAX_TOKENS))
+            # Closed as soon as this stream ends, even when the client left mid-reply
+            async with aclosing(deltas):
+                with capture_usage(usage):
+                    async for delta in deltas:
+                        chunks.append(delta)
+                        progress.add(delta)
+                        yield format_sse("delta", {"content": delta})
+            await progress.close()
+
+            ai_message = await save_reply()
+            await event_hub.publish(message.session_id, GENERATION_PROGRESS, {"status": "completed"})
+            yield format_sse("done", format_message(ai_message))
+
+        except OpenAIServiceError as e:
+            logger.error("Streaming generation failed: %s", e)
+            await progress.close()
+            await event_hub.publish(
+                message.session_id, GENERATION_PROGRESS, {"status": "failed", "detail": str(e)}
+            )
+            yield format_sse("error", {"detail": str(e)})
+
+        except Exception as e:
+            logger.error("Unexpected error in create_message_stream: %s", e, exc_info=True)
+            yield format_sse("error", {"detail": str(e)})
+
+        finally:
+            in_progress.dec()
+            await asyncio.shield(progress.close())
+            # Client disconnected or generation failed mid-stream: keep what was produced
+            if not saved and chunks:
+                await asyncio.shield(save_reply(partial=True))
+
+    return ClosingStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(summarize_session, message.session_id, openai_service)
+    )
+
+@app.patch("/message/{message_id}", response_model=MessageOut)
+async def update_message(
+    message_id: str,
+    update: MessageUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """Pin or unpin a message so it is always kept in the LLM context"""
+    message = await db.get(models.DBMessage, message_id)
+    if not message:
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    message.pinned = update.pinned
+    await db.commit()
+    await get_history_cache().invalidate(message.session_id)
+    return format_message(message)
+
+def format_section(section: models.DBNewsletterSection) -> Dict:
+    return {
+        "id": section.id,
+        "session_id": section.session_id,
+        "section_type": section.section_type,
+        "version": section.version,
+        "content": section.content,
+        "state": section.state,
+        "metadata": section.section_metadata or {},
+        "created_at": section.created_at.isoformat(),
+        "updated_at": section.updated_at.isoformat()
+    }
+
+async def mirror_section_state(section: models.DBNewsletterSection) -> None:
+    """Copy a section's review state to the session state store; Postgres stays authoritative"""
     try:
-        # Get OpenAI service instance
-        openai_service = get_openai_service()
-        
-        # Generate content using OpenAI
-        content = await openai_service.generate_section_content(
-            request.section_type.value,
-            request.context
+        await get_session_state().set_section_state(
+            section.session_id, section.section_type, section.version, section.state
         )
-        
-        # Create and validate section
-        section = NewsletterSection(
-            section_type=request.section_type,
+    except Exception as e:
+        logger.error("Error storing section state for session %s: %s", section.session_id, e)
+
+async def mirror_progress(session_id: str, progress: Dict) -> None:
+    """Copy a newsletter generation's progress to the session state store; it is only shown to clients"""
+    try:
+        await get_session_state().set_progress(session_id, progress)
+    except Exception as e:
+        logger.error("Error storing generation progress for session %s: %s", session_id, e)
+
+async def release_generation_lock(name: str, token: str) -> None:
+    """Release a generation lock; if the store is unreachable the lock's TTL frees it"""
+    try:
+        await get_session_state().release_lock(name, token)
+    except Exception as e:
+        logger.error("Error releasing lock %s: %s", name, e)
+
+async def save_section(
+    db: AsyncSession,
+    session_id: str,
+    section_type: str,
+    content: str,
+    metadata: Optional[Dict] = None,
+    usage: Optional[List[UsageEntry]] = None
+) -> models.DBNewsletterSection:
+    """
+    Store generated content as the next version of a section, awaiting
+    approval, together with the tokens generating it used
+    """
+    for attempt in range(3):
+        latest = await db.scalar(
+            select(func.max(models.DBNewsletterSection.version)).where(
+                models.DBNewsletterSection.session_id == session_id,
+                models.DBNewsletterSection.section_type == section_type
+            )
+        )
+        now = datetime.utcnow()
+        section = models.DBNewsletterSection(
+            id=models.generate_uuid(),
+            session_id=session_id,
+            section_type=section_type,
+            version=(latest or 0) + 1,
             content=content,
-            generated_at=datetime.now().isoformat()
+            state=models.SectionState.AWAITING_APPROVAL.value,
+            section_metadata=metadata or {},
+            created_at=now,
+            updated_at=now
         )
+        db.add_all([section, *usage_rows(session_id, usage or [], section_id=section.id)])
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another worker stored the same version first; take the next one
+            await db.rollback()
+            if attempt == 2:
+                raise
+        else:
+            await mirror_section_state(section)
+            return section
+
+def section_metadata(plan: TurnPlan, usage: List[UsageEntry]) -> Dict:
+    """section_metadata of a generated section: token usage (zero for cache hits) and any budget adjustment"""
+    metadata = {"usage": UsageRecorder.summarize(usage)}
+    if plan.downgraded or plan.max_tokens != SECTION_MAX_TOKENS:
+        metadata["budget"] = plan.to_dict()
+    return metadata
+
+@app.post("/generate/section")
+async def generate_section(
+    request: SectionGenerationRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    with tracer.start_as_current_span("generate_section", attributes={"session.id": request.session_id, "newsletter.section_type": request.section_type.value}):
+        session = await db.get(models.DBSession, request.session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        try:
+            # Get OpenAI service instance
+            openai_service = get_openai_service()
         
-        # Store in session
-        session.newsletter_sections[request.section_type.value] = section.content
+            section_key = SECTION_TEMPLATE_KEYS.get(request.section_type, request.section_type.value)
+            plan = plan_turn(
+                await remaining_budget(request.session_id, db),
+                section_prompt_tokens(section_key, request.context),
+                SECTION_MAX_TOKENS,
+                trimmable=False
+            )
+
+            # Generate content using OpenAI
+            with capture_usage() as usage, GENERATIONS_IN_PROGRESS.labels(kind="section").track_inprogress():
+                content = await openai_service.generate_section_content(
+                    section_key,
+                    request.context,
+                    use_cache=not request.bypass_cache,
+                    **plan.overrides(SECTION_MAX_TOKENS)
+                )
         
-        return section
+            # Create and validate section
+            section = NewsletterSection(
+                section_type=request.section_type,
+                content=content,
+                generated_at=datetime.now().isoformat()
+            )
         
-    except ValueError as e:
+            # Store as a new version so every worker sees it
+            stored = await save_section(
+                db, request.session_id, section_key, section.content,
+                section_metadata(plan, usage.entries), usage.entries
+            )
+            section.metadata = {"id": stored.id, "version": stored.version, "state": stored.state, **stored.section_metadata}
+            await event_hub.publish(request.session_id, SECTION_GENERATED, section.model_dump(mode="json"))
+        
+            return section
+        
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except OpenAIServiceError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+@app.post("/generate/newsletter")
+async def generate_newsletter(
+    request: NewsletterGenerationRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Generate every newsletter section, streamed as Server-Sent Events.
+
+    The thesis is generated first and the remaining sections concurrently.
+    A `section` event is sent as each one finishes (status completed, failed
+    or skipped), then a `done` event listing the sections that did not complete.
+    Only one generation runs per session at a time (409 otherwise), across workers;
+    if the lock store is unreachable the request is refused with 503 and Retry-After.
+    """
+    session = await db.get(models.DBSession, request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    context = {"additional_info": "", **request.context}
+    section_count = len(SECTION_DEPENDENCIES)
+    plan = plan_turn(
+        await remaining_budget(request.session_id, db),
+        sum(section_prompt_tokens(section, context) for section in SECTION_DEPENDENCIES),
+        section_count * SECTION_MAX_TOKENS,
+        trimmable=False
+    )
+    # Spread the (possibly shortened) reply allowance evenly over the sections
+    section_plan = dataclasses.replace(plan, max_tokens=plan.max_tokens // section_count)
+
+    session_state = get_session_state()
+    openai_service = get_openai_service()
+    generator = get_newsletter_generator()
+
+    async def event_stream():
+        progress = {"status": "running", "completed": [], "incomplete": []}
+        usage = UsageRecorder()
+        in_progress = GENERATIONS_IN_PROGRESS.labels(kind="newsletter")
+        in_progress.inc()
+        try:
+            await mirror_progress(request.session_id, progress)
+            await event_hub.publish(request.session_id, GENERATION_PROGRESS, {"status": "started", "kind": "newsletter"})
+            sections = generator.generate(
+                openai_service, context, use_cache=not request.bypass_cache,
+                **section_plan.overrides(SECTION_MAX_TOKENS)
+            )
+            with capture_usage(usage):
+                async for result in sections:
+                    if result["status"] == COMPLETED:
+                        entries = usage.for_purpose(result["section_type"])
+                        async with database.AsyncSessionLocal() as section_db:
+                            stored = await save_section(
+                                section_db, request.session_id, result["section_type"], result["content"],
+                                section_metadata(section_plan, entries), entries
+                            )
+                        result.update(
+                            generated_at=stored.created_at.isoformat(),
+                            id=stored.id,
+                            version=stored.version,
+                            state=stored.state
+                        )
+                        progress["completed"].append(result["section_type"])
+                        await event_hub.publish(request.session_id, SECTION_GENERATED, result)
+                    else:
+                        progress["incomplete"].append(result["section_type"])
+                    await mirror_progress(request.session_id, progress)
+                    yield format_sse("section", result)
+
+            progress["status"] = "failed" if progress["incomplete"] else "completed"
+            await mirror_progress(request.session_id, progress)
+            await event_hub.publish(
+                request.session_id, GENERATION_PROGRESS, {"status": progress["status"], "kind": "newsletter"}
+            )
+            yield format_sse("done", {"incomplete_sections": progress["incomplete"]})
+        finally:
+            in_progress.dec()
+
+    lock_name = f"newsletter:{request.session_id}"
+    try:
+        lock_token = await session_state.acquire_lock(lock_name, GENERATION_LOCK_TTL_SECONDS)
+    except Exception as e:
+        # Without the lock two workers could generate the same newsletter at once
+        logger.error("Error acquiring lock %s: %s", lock_name, e)
+        raise HTTPException(
+            status_code=503, detail="Session state store unavailable", headers={"Retry-After": "5"}
+        )
+    if lock_token is None:
+        raise HTTPException(status_code=409, detail="Newsletter generation already in progress")
+    # Released by the response however it ends, even if the body never starts
+    return ClosingStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        on_close=partial(release_generation_lock, lock_name, lock_token)
+    )
+
+def latest_sections_query(session_id: str, state: Optional[models.SectionState] = None):
+    """Latest version of each section type of a session, optionally only versions in `state`"""
+    conditions = [models.DBNewsletterSection.session_id == session_id]
+    if state is not None:
+        conditions.append(models.DBNewsletterSection.state == state.value)
+    latest = (
+        select(
+            models.DBNewsletterSection.section_type,
+            func.max(models.DBNewsletterSection.version).label("version")
+        )
+        .where(*conditions)
+        .group_by(models.DBNewsletterSection.section_type)
+        .subquery()
+    )
+    return (
+        select(models.DBNewsletterSection)
+        .join(latest, and_(
+            models.DBNewsletterSection.section_type == latest.c.section_type,
+            models.DBNewsletterSection.version == latest.c.version
+        ))
+        .where(models.DBNewsletterSection.session_id == session_id)
+        .order_by(models.DBNewsletterSection.created_at)
+    )
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+@app.get("/session/{session_id}/state")
+async def get_session_state_snapshot(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Hot state from the session state store: section review states, recent messages, generation progress"""
+    session = await db.get(models.DBSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    session_state = get_session_state()
+    return {
+        "session_id": session_id,
+        "sections": await session_state.get_section_states(session_id),
+        "recent_messages": await session_state.get_recent_messages(session_id),
+        "generation": await session_state.get_progress(session_id),
+        "generating": await session_state.is_locked(f"newsletter:{session_id}")
+    }
+
+@app.get("/session/{session_id}/sections", response_model=SectionList)
+async def get_sections(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Latest version of every generated section of a session"""
+    session = await db.get(models.DBSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    result = await db.execute(latest_sections_query(session_id))
+    return {"sections": [format_section(section) for section in result.scalars()]}
+
+async def finalized_document(session_id: str, db: AsyncSession) -> Dict:
+    """Assemble the latest approved version of each section of a session"""
+    session = await db.get(models.DBSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    result = await db.execute(latest_sections_query(session_id, models.SectionState.APPROVED))
+    sections = result.scalars().all()
+    if not sections:
+        raise HTTPException(status_code=409, detail="No approved sections to finalize")
+
+    return get_newsletter_assembler().assemble(session_id, session.title, sections)
+
+@app.post("/finalize")
+async def finalize_newsletter(
+    request: FinalizeRequest,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Assemble the latest approved version of each section into the final
+    newsletter. The response carries an ETag; sending it back in
+    If-None-Match returns 304 when nothing has changed.
+    """
+    document = await finalized_document(request.session_id, db)
+    headers = {"ETag": document["etag"], "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, document["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return ORJSONResponse(document, headers=headers)
+
+@app.get("/session/{session_id}/export/{export_format}")
+async def export_newsletter(
+    session_id: str,
+    export_format: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Download the finalized newsletter as txt, html or pdf. Rendering happens in
+    a worker process and the artifact is cached on disk, then streamed from there.
+    """
+    if export_format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {export_format}")
+
+    document = await finalized_document(session_id, db)
+    headers = {"ETag": document["etag"], "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, document["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        path = await get_export_service().export(document, export_format)
+    except ExportQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ExportError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except OpenAIServiceError as e:
-        raise HTTPException(status_code=503, detail=str(e))
+
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[export_format],
+        filename=f"newsletter-{session_id}.{export_format}",
+        headers=headers
+    )
+
+@app.patch("/session/{session_id}/sections/{section_type}", response_model=SectionOut)
+async def update_section(
+    session_id: str,
+    section_type: str,
+    update: SectionUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """Move a section version to another review state, e.g. approved or needs_revision"""
+    query = select(models.DBNewsletterSection).where(
+        models.DBNewsletterSection.session_id == session_id,
+        models.DBNewsletterSection.section_type == section_type
+    )
+    if update.version is not None:
+        query = query.where(models.DBNewsletterSection.version == update.version)
+    section = await db.scalar(query.order_by(models.DBNewsletterSection.version.desc()).limit(1))
+    if not section:
+        raise HTTPException(status_code=404, detail="Section not found")
+
+    section.state = update.state.value
+    section.updated_at = datetime.utcnow()
+    await db.commit()
+    await mirror_section_state(section)
+    return format_section(section)
+
+@app.websocket("/ws/session/{session_id}")
+async def session_updates(websocket: WebSocket, session_id: str):
+    """Push message, section and generation events for one session as JSON text frames"""
+    async with database.AsyncSessionLocal() as db:
+        session = await db.get(models.DBSession, session_id)
+    if not session:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Session not found")
+        return
+
+    await websocket.accept()
+    async with event_hub.subscribe(session_id) as queue:
+        async def forward_events():
+            while True:
+                await websocket.send_text(await queue.get())
+
+        async def wait_for_disconnect():
+            # Clients don't send anything meaningful; reading just detects the disconnect
+            while True:
+                await websocket.receive_text()
+
+        tasks = [
+            asyncio.create_task(forward_events()),
+            asyncio.create_task(wait_for_disconnect())
+        ]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not isinstance(task.exception(), (WebSocketDisconnect, type(None))):
+                logger.error("WebSocket error for session %s: %s", session_id, task.exception())
 
 @app.get("/health")
 async def health_check():
     """Basic health check endpoint"""
     return {
         "status": "healthy",
+        "logging": logging_stats(),
+        "tracing": tracing_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request, database and OpenAI metrics for this worker, in the Prometheus text format (empty without prometheus_client)"""
+    return Response(content=expose_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/usage", response_model=UsageReport)
+async def get_usage(
+    group_by: str = Query("day", pattern="^(day|session)$"),
+    days: int = Query(30, ge=1, le=366),
+    session_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Tokens used over the last `days` days (today included) per UTC day or per session, and the budget status"""
+    since = start_of_day() - timedelta(days=days - 1)
+    result = await db.execute(usage_report_query(group_by, since, session_id, limit))
+    rows = [
+        UsageRow(
+            key=str(row.key),
+            prompt_tokens=row.prompt_tokens,
+            completion_tokens=row.completion_tokens,
+            total_tokens=row.prompt_tokens + row.completion_tokens,
+            generations=row.generations
+        )
+        for row in result.all()
+    ]
+
+    budget = get_token_budget()
+    daily_used = await db.scalar(tokens_used_query(since=start_of_day()))
+    return UsageReport(
+        group_by=group_by,
+        since=since,
+        rows=rows,
+        budget=UsageBudget(
+            session_limit=budget.session_limit,
+            daily_limit=budget.daily_limit,
+            daily_used=daily_used,
+            daily_remaining=max(budget.daily_limit - daily_used, 0) if budget.daily_limit > 0 else None
+        )
+    )
+
 @app.get("/health/openai")
 async def check_openai():
     """Check OpenAI API connection"""
@@ -332,30 +1277,62 @@ async def check_openai():
             "timestamp": datetime.now().isoformat()
         }
 
-@app.delete("/session/{session_id}")
-async def delete_session(session_id: str, db: Session = Depends(get_db)):
-    session = db.query(models.DBSession).filter(models.DBSession.id == session_id).first()
+@app.get("/health/database")
+async def database_stats():
+    """Connection pool checkout waits, timeouts and saturation"""
+    return {
+        "pool": database.pool_metrics.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/health/cache")
+async def cache_stats():
+    """Hit/miss/eviction counters for the section, finalized-newsletter and chat history caches"""
+    return {
+        "section_cache": get_openai_service().section_cache.stats(),
+        "finalize_cache": get_newsletter_assembler().stats(),
+        "exports": get_export_service().stats(),
+        "history_cache": get_history_cache().stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/health/openai/resilience")
+async def resilience_stats():
+    """Retry, fallback, circuit breaker, in-flight and coalescing counters for OpenAI calls"""
+    openai_service = get_openai_service()
+    return {
+        "openai": openai_service.resilience.stats(),
+        "singleflight": openai_service.singleflight.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.delete("/session/{session_id}", response_model=StatusMessage)
+async def delete_session(session_id: str, db: AsyncSession = Depends(get_db)):
+    session = await db.get(models.DBSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await db.commit()
+    await get_history_cache().invalidate(session_id)
+    await get_session_state().clear_session(session_id)
     return {"message": "Session deleted successfully"}
 
-@app.patch("/session/{session_id}")
+@app.patch("/session/{session_id}", response_model=SessionOut)
 async def update_session(
     session_id: str, 
     update_data: dict = Body(..., example={"title": "New Title"}), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    session = db.query(models.DBSession).filter(models.DBSession.id == session_id).first()
+    session = await db.get(models.DBSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     if "title" in update_data:
         session.title = update_data["title"]
     
-    db.commit()
+    await db.commit()
+    await get_history_cache().invalidate(session_id)
     return {
         "id": session.id,
         "title": session.title,
@@ -0,0 +1,109 @@
+"""
+Prometheus metrics for endpoints, DB queries and OpenAI calls, served by
+GET /metrics, when prometheus_client is installed (the `metrics` extra).
+Without it every metric is a no-op and /metrics has no samples.
+
+Each worker process keeps its own series; scrape every worker, or aggregate
+with the worker's instance label, when running several.
+"""
+import time
+from contextlib import contextmanager
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+# Seconds; covers fast DB queries up to long LLM generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class _NoopMetric:
+    """Stands in for Counter, Gauge and Histogram when prometheus_client is not installed"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, **labels: str) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    @contextmanager
+    def track_inprogress(self):
+        yield
+
+    @contextmanager
+    def time(self):
+        yield
+
+if prometheus_client is not None:
+    from prometheus_client import CONTENT_TYPE_LATEST as CONTENT_TYPE, REGISTRY, Counter, Gauge, Histogram
+
+    def expose() -> bytes:
+        return prometheus_client.generate_latest(REGISTRY)
+else:
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    REGISTRY = None
+    Counter = Gauge = Histogram = _NoopMetric
+
+    def expose() -> bytes:
+        return b""
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"],
+    buckets=DEFAULT_BUCKETS
+)
+DB_QUERIES = Counter("db_queries", "SQL statements executed", ["operation"])
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["operation"], buckets=DEFAULT_BUCKETS
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "OpenAI call latency per model and outcome (for streams, until the stream opens)",
+    ["model", "outcome"],
+    buckets=DEFAULT_BUCKETS
+)
+OPENAI_ERRORS = Counter("openai_errors", "Failed OpenAI calls per model and HTTP status or error type", ["model", "error"])
+OPENAI_FALLBACKS = Counter("openai_fallbacks", "Fallback model activations, labelled with the model fallen back to", ["model"])
+OPENAI_TOKENS = Counter("openai_tokens", "Prompt and completion tokens reported by OpenAI", ["section_type", "kind"])
+GENERATIONS_IN_PROGRESS = Gauge("generations_in_progress", "LLM generations currently running", ["kind"])
+
+class MetricsMiddleware:
+    """Records http_request_duration_seconds, labelled with the matched route template rather than the raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "<unmatched>"),
+                status=str(status_code)
+            ).observe(time.perf_counter() - started)
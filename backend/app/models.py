@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 import uuid
 from .database import Base
@@ -11,20 +11,50 @@ class SpeakerType(str, Enum):
     ASSISTANT = "assistant"
     SYSTEM = "system"
 
+# Review states of a newsletter section version
+class SectionState(str, Enum):
+    DRAFT = "draft"
+    AWAITING_APPROVAL = "awaiting_approval"
+    APPROVED = "approved"
+    NEEDS_REVISION = "needs_revision"
+
 def generate_uuid():
     return str(uuid.uuid4())
 
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO timestamp into the naive UTC datetimes the DateTime columns
+    hold; offsets (e.g. the trailing Z of JavaScript's toISOString) are
+    converted, since Postgres won't bind aware datetimes to them.
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
 # SQLAlchemy models
 class DBSession(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Newest-first keyset pagination in GET /sessions
+        Index("ix_sessions_created_at", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     messages = relationship("DBMessage", back_populates="session", cascade="all, delete-orphan")
+    summary = relationship("DBSessionSummary", uselist=False, cascade="all, delete-orphan")
+    sections = relationship("DBNewsletterSection", cascade="all, delete-orphan")
 
 class DBMessage(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # A session's messages in (timestamp, id) order, and per-session counts
+        Index("ix_messages_session_id_timestamp", "session_id", "timestamp", "id"),
+        # Last-modified lookup behind the GET /session/{id} ETag
+        Index("ix_messages_session_id_updated_at", "session_id", "updated_at"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     session_id = Column(String, ForeignKey("sessions.id"))
@@ -32,5 +62,73 @@ class DBMessage(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     content = Column(String)
     message_metadata = Column(JSON, default={})
+    # Pinned messages (e.g. the approved thesis) always stay in the LLM context
+    pinned = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    session = relationship("DBSession", back_populates="messages") 
\ No newline at end of file
+    session = relationship("DBSession", back_populates="messages")
+
+class DBSessionSummary(Base):
+    """Running summary of the older part of a session's conversation"""
+    __tablename__ = "session_summaries"
+
+    session_id = Column(String, ForeignKey("sessions.id"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    # (timestamp, id) of the newest message folded into the summary
+    summarized_through_timestamp = Column(DateTime, nullable=False)
+    summarized_through_id = Column(String, nullable=False)
+    summarized_message_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DBResponseCache(Base):
+    """Persistent tier of the generated-section cache, keyed by prompt/parameter hash"""
+    __tablename__ = "response_cache"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+class DBNewsletterSection(Base):
+    """One version of a generated newsletter section; every regeneration adds a version"""
+    __tablename__ = "newsletter_sections"
+    __table_args__ = (
+        # Serves "latest version of a section" lookups and keeps versions unique
+        Index("ix_newsletter_sections_session_id_section_type", "session_id", "section_type", "version", unique=True),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
+    section_type = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    state = Column(String, default=SectionState.AWAITING_APPROVAL.value, nullable=False)
+    section_metadata = Column(JSON, default={})
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DBTokenUsage(Base):
+    """
+    Tokens used by one generation (a chat reply, a section or a summary),
+    with the message or section it produced. session_id is deliberately not
+    a foreign key: usage outlives deleted sessions for cost reporting and the
+    daily budget.
+    """
+    __tablename__ = "token_usage"
+    __table_args__ = (
+        # Per-session budget and usage report
+        Index("ix_token_usage_session_id_created_at", "session_id", "created_at"),
+        # Global daily budget and per-day report
+        Index("ix_token_usage_created_at", "created_at"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    session_id = Column(String, nullable=False)
+    message_id = Column(String, nullable=True)
+    section_id = Column(String, nullable=True)
+    # "chat", "summary" or the section type
+    purpose = Column(String, nullable=False)
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
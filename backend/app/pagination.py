@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+from .models import parse_timestamp
+
+# Opaque keyset cursors: "<iso timestamp>|<row id>", urlsafe-base64 encoded
+CURSOR_SEPARATOR = "|"
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    """Encode the (timestamp, id) sort key of a row as an opaque cursor."""
+    raw = f"{timestamp.isoformat()}{CURSOR_SEPARATOR}{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, row_id = raw.split(CURSOR_SEPARATOR, 1)
+        return parse_timestamp(timestamp), row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
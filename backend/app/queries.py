@@ -0,0 +1,173 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from services.summarizer import after_summary
+from . import models
+
+# Hot read queries, kept in one place so tests/unit/test_query_plans.py can
+# check they stay on the indexes
+
+# Columns of a message as returned by the API, selected as plain rows so large
+# message lists never build ORM objects
+MESSAGE_COLUMNS = (
+    models.DBMessage.id,
+    models.DBMessage.session_id,
+    models.DBMessage.speaker,
+    models.DBMessage.timestamp,
+    models.DBMessage.content,
+    models.DBMessage.message_metadata,
+    models.DBMessage.pinned,
+)
+
+def session_messages_query(session_id: str):
+    """All message rows of a session, oldest first (served by ix_messages_session_id_timestamp)"""
+    return (
+        select(*MESSAGE_COLUMNS)
+        .where(models.DBMessage.session_id == session_id)
+        .order_by(models.DBMessage.timestamp, models.DBMessage.id)
+    )
+
+def message_page_query(
+    session_id: str,
+    limit: int,
+    before: Optional[Tuple[datetime, str]] = None,
+    since: Optional[Tuple[datetime, str]] = None
+):
+    """
+    Keyset page of a session's message rows on (timestamp, id); fetches `limit` rows.
+    With `since`, the oldest messages after that sort key, oldest first. Otherwise
+    the newest messages (before `before`, if given), newest first.
+    """
+    query = select(*MESSAGE_COLUMNS).where(models.DBMessage.session_id == session_id)
+    if since:
+        timestamp, message_id = since
+        return (
+            query.where(or_(
+                models.DBMessage.timestamp > timestamp,
+                and_(models.DBMessage.timestamp == timestamp, models.DBMessage.id > message_id)
+            ))
+            .order_by(models.DBMessage.timestamp, models.DBMessage.id)
+            .limit(limit)
+        )
+    if before:
+        timestamp, message_id = before
+        query = query.where(or_(
+            models.DBMessage.timestamp < timestamp,
+            and_(models.DBMessage.timestamp == timestamp, models.DBMessage.id < message_id)
+        ))
+    return query.order_by(models.DBMessage.timestamp.desc(), models.DBMessage.id.desc()).limit(limit)
+
+def session_version_query(session_id: str):
+    """
+    The session (to check it exists) with its message count and the newest
+    message modification time, read from ix_messages_session_id_updated_at
+    without touching the message rows. Any new or edited message changes it.
+    """
+    return (
+        select(
+            models.DBSession.id,
+            models.DBSession.created_at,
+            # updated_at rather than id, so both aggregates come from the index alone
+            func.count(models.DBMessage.updated_at).label("message_count"),
+            func.max(models.DBMessage.updated_at).label("last_modified")
+        )
+        .outerjoin(models.DBMessage, models.DBMessage.session_id == models.DBSession.id)
+        .where(models.DBSession.id == session_id)
+        .group_by(models.DBSession.id, models.DBSession.created_at)
+    )
+
+def session_with_summary_query(session_id: str):
+    """The session id (to check it exists) and its rolling summary, if any, in one round trip"""
+    return (
+        select(
+            models.DBSession.id,
+            models.DBSessionSummary.summary,
+            models.DBSessionSummary.summarized_through_timestamp,
+            models.DBSessionSummary.summarized_through_id
+        )
+        .outerjoin(models.DBSessionSummary, models.DBSessionSummary.session_id == models.DBSession.id)
+        .where(models.DBSession.id == session_id)
+    )
+
+def context_messages_query(session_id: str, summary):
+    """
+    Messages after the rolling summary plus pinned ones, oldest first. Only
+    the columns the prompt needs, so no ORM objects or JSON metadata are loaded.
+    """
+    return (
+        select(models.DBMessage.speaker, models.DBMessage.content, models.DBMessage.pinned)
+        .where(
+            models.DBMessage.session_id == session_id,
+            or_(after_summary(summary), models.DBMessage.pinned.is_(True))
+        )
+        .order_by(models.DBMessage.timestamp, models.DBMessage.id)
+    )
+
+def sessions_page_query(limit: int, after: Optional[Tuple[datetime, str]] = None):
+    """
+    One page of sessions, newest first, with message counts. Keyset pagination
+    on (created_at, id) after the `after` sort key; fetches `limit` rows.
+    """
+    page = select(models.DBSession).order_by(
+        models.DBSession.created_at.desc(), models.DBSession.id.desc()
+    )
+    if after:
+        created_at, session_id = after
+        page = page.where(or_(
+            models.DBSession.created_at < created_at,
+            and_(
+                models.DBSession.created_at == created_at,
+                models.DBSession.id < session_id
+            )
+        ))
+    page = page.limit(limit).subquery()
+
+    # Count messages for just this page in the same query
+    return (
+        select(
+            page.c.id,
+            page.c.title,
+            page.c.created_at,
+            func.count(models.DBMessage.id).label("message_count")
+        )
+        .outerjoin(models.DBMessage, models.DBMessage.session_id == page.c.id)
+        .group_by(page.c.id, page.c.title, page.c.created_at)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    )
+
+def tokens_used_query(session_id: Optional[str] = None, since: Optional[datetime] = None):
+    """Total tokens recorded for a session and/or since a time (served by the token_usage indexes)"""
+    query = select(func.coalesce(
+        func.sum(models.DBTokenUsage.prompt_tokens + models.DBTokenUsage.completion_tokens), 0
+    ))
+    if session_id is not None:
+        query = query.where(models.DBTokenUsage.session_id == session_id)
+    if since is not None:
+        query = query.where(models.DBTokenUsage.created_at >= since)
+    return query
+
+def usage_report_query(group_by: str, since: datetime, session_id: Optional[str] = None, limit: int = 100):
+    """
+    Token usage since `since`, per session (largest first) or per UTC day
+    (newest first), optionally for one session
+    """
+    if group_by == "day":
+        key = func.date(models.DBTokenUsage.created_at)
+    else:
+        key = models.DBTokenUsage.session_id
+    prompt = func.sum(models.DBTokenUsage.prompt_tokens)
+    completion = func.sum(models.DBTokenUsage.completion_tokens)
+    query = (
+        select(
+            key.label("key"),
+            prompt.label("prompt_tokens"),
+            completion.label("completion_tokens"),
+            func.count().label("generations")
+        )
+        .where(models.DBTokenUsage.created_at >= since)
+        .group_by(key)
+    )
+    if session_id is not None:
+        query = query.where(models.DBTokenUsage.session_id == session_id)
+    order = key.desc() if group_by == "day" else (prompt + completion).desc()
+    return query.order_by(order).limit(limit)
@@ -0,0 +1,58 @@
+"""
+JSON responses rendered with orjson when it is installed, and a streaming
+response that cleans up after itself.
+
+orjson serializes datetimes (as ISO 8601, like datetime.isoformat) and UUIDs
+itself, so handlers can pass query rows through without converting every
+value first. Without orjson the standard library renders the same output.
+"""
+import asyncio
+import json
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Optional
+from uuid import UUID
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that closes its body generator, then awaits
+    `on_close`, once it is over, however it ends: completed, client gone
+    mid-stream (Starlette leaves the generator suspended until it is garbage
+    collected), or gone before the body started (the generator then never
+    runs, so its own finally can't clean up).
+    """
+    def __init__(self, content: Any, *args: Any, on_close: Optional[Callable[[], Awaitable[Any]]] = None, **kwargs: Any):
+        super().__init__(content, *args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await asyncio.shield(aclose())
+            if self.on_close is not None:
+                await asyncio.shield(self.on_close())
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
@@ -26,5 +26,94 @@ class Session(BaseModel):
     created_at: datetime
     messages: List[Message] = []
 
-    class Config:
-        from_attributes = True 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True) 
+# Response models. Declaring them on the routes lets FastAPI serialize
+# straight to JSON bytes with pydantic-core; the routes that build their own
+# responses (ETag / 304 handling) still declare them for the OpenAPI schema.
+
+class SessionCreated(BaseModel):
+    session_id: str
+
+class SessionListItem(BaseModel):
+    id: str
+    title: str
+    created_at: datetime
+    message_count: int
+
+class SessionList(BaseModel):
+    sessions: List[SessionListItem]
+    next_cursor: Optional[str] = None
+
+class SessionOut(BaseModel):
+    id: str
+    title: Optional[str] = None
+    created_at: datetime
+
+class SessionMessage(BaseModel):
+    id: str
+    session_id: str
+    speaker: str
+    timestamp: datetime
+    content: str
+    message_metadata: Optional[Dict] = None
+    pinned: bool
+
+class MessagePage(BaseModel):
+    messages: List[SessionMessage]
+    has_more: bool
+    prev_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+class SessionDetail(MessagePage):
+    id: str
+    session_id: str
+    created_at: datetime
+
+class MessageDelta(MessagePage):
+    session_id: str
+
+class MessageOut(BaseModel):
+    id: str
+    session_id: str
+    speaker: str
+    content: str
+    timestamp: datetime
+    metadata: Dict = Field(default_factory=dict)
+    pinned: bool
+
+class SectionOut(BaseModel):
+    id: str
+    session_id: str
+    section_type: str
+    version: int
+    content: str
+    state: str
+    metadata: Dict = Field(default_factory=dict)
+    created_at: datetime
+    updated_at: datetime
+
+class SectionList(BaseModel):
+    sections: List[SectionOut]
+
+class StatusMessage(BaseModel):
+    message: str
+
+class UsageRow(BaseModel):
+    # Session ID or ISO day, depending on group_by
+    key: str
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    generations: int
+
+class UsageBudget(BaseModel):
+    session_limit: int
+    daily_limit: int
+    daily_used: int
+    daily_remaining: Optional[int] = None
+
+class UsageReport(BaseModel):
+    group_by: str
+    since: datetime
+    rows: List[UsageRow]
+    budget: UsageBudget
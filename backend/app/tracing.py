@@ -0,0 +1,218 @@
+"""
+Request tracing with OpenTelemetry: spans around HTTP requests, SQL
+statements and OpenAI calls.
+
+Spans are created through the OpenTelemetry API, and trace context is read
+from and written to W3C `traceparent` headers, so traces line up with other
+instrumented services. Recording and exporting them needs the SDK (the
+`tracing` extra); finished spans are then written by an exporter that needs
+no collector (console or a JSON-lines file). Without the SDK every span is a
+no-op. Each request also gets a request ID (X-Request-ID, or a generated one)
+that is attached to every log record written while handling it.
+"""
+import atexit
+import logging
+import os
+import re
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, TextIO
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:
+    TracerProvider = None
+    SpanProcessor = object
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+tracer = trace.get_tracer("newsletter-backend")
+propagator = TraceContextTextMapPropagator()
+
+def current_span() -> Optional[trace.Span]:
+    """The span of the surrounding trace, or None outside one (or when spans aren't recorded)"""
+    span = trace.get_current_span()
+    return span if span.is_recording() else None
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+def format_id(value: int, width: int) -> str:
+    """Trace (width 32) and span (width 16) ids as the lowercase hex used in traceparent and logs"""
+    return format(value, f"0{width}x")
+
+class _ExportingSpanProcessor(SpanProcessor):
+    """
+    The provider's single processor, forwarding to whichever processor is
+    configured; the SDK can't remove processors from a provider, so
+    configure_tracing (and tests) swap this one's target instead.
+    """
+
+    def __init__(self):
+        self.target = None
+
+    def on_start(self, span, parent_context=None) -> None:
+        target = self.target
+        if target is not None:
+            target.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span) -> None:
+        target = self.target
+        if target is not None:
+            target.on_end(span)
+
+    def shutdown(self) -> None:
+        stop_tracing()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        target = self.target
+        return target.force_flush(timeout_millis) if target is not None else True
+
+_processor = _ExportingSpanProcessor()
+_provider = None
+_output: Optional[TextIO] = None
+
+def set_span_processor(processor) -> Any:
+    """Send finished spans to `processor` (None: don't export them); returns the previous one"""
+    previous, _processor.target = _processor.target, processor
+    return previous
+
+def json_lines(span) -> str:
+    """One span per line, in the SDK's JSON span layout"""
+    return span.to_json(indent=None) + "\n"
+
+class TracingMiddleware:
+    """
+    Wraps each HTTP request in a SERVER span (continuing an incoming
+    traceparent), makes its request ID available to log records, and echoes
+    X-Request-ID and traceparent on the response. When an outer layer already
+    opened the SERVER span (FastAPI's own OpenTelemetry support, or the ASGI
+    instrumentation), that span is annotated instead of starting a second one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id", "")
+        if not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        token = _request_id.set(request_id)
+        try:
+            outer = current_span()
+            if outer is not None:
+                outer.set_attribute("request.id", request_id)
+                await self._handle(scope, receive, send, outer, request_id)
+                return
+            method = scope["method"]
+            with tracer.start_as_current_span(
+                f"{method} {scope['path']}",
+                context=propagator.extract({"traceparent": headers.get("traceparent", "")}),
+                kind=SpanKind.SERVER,
+                attributes={"http.request.method": method, "url.path": scope["path"], "request.id": request_id}
+            ) as span:
+                try:
+                    await self._handle(scope, receive, send, span, request_id)
+                finally:
+                    route = scope.get("route")
+                    if route is not None and hasattr(route, "path"):
+                        span.update_name(f"{method} {route.path}")
+                        span.set_attribute("http.route", route.path)
+        finally:
+            _request_id.reset(token)
+
+    async def _handle(self, scope, receive, send, span, request_id):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Request-ID"] = request_id
+                if span.is_recording():
+                    carrier: Dict[str, str] = {}
+                    propagator.inject(carrier, context=trace.set_span_in_context(span))
+                    response_headers["traceparent"] = carrier["traceparent"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+@dataclass
+class TracingSettings:
+    # "none", "console" or "file"
+    exporter: str = "none"
+    file: str = "traces.jsonl"
+    service_name: str = "newsletter-backend"
+    queue_size: int = 2048
+
+    @classmethod
+    def from_env(cls) -> "TracingSettings":
+        """Read TRACING_EXPORTER, TRACING_FILE, TRACING_SERVICE_NAME and TRACING_QUEUE_SIZE"""
+        defaults = cls()
+        return cls(
+            exporter=os.getenv("TRACING_EXPORTER", defaults.exporter).lower(),
+            file=os.getenv("TRACING_FILE", defaults.file),
+            service_name=os.getenv("TRACING_SERVICE_NAME", defaults.service_name),
+            queue_size=int(os.getenv("TRACING_QUEUE_SIZE", str(defaults.queue_size))),
+        )
+
+def configure_tracing(settings: Optional[TracingSettings] = None) -> None:
+    """
+    Install the SDK's tracer provider (once per process, named after the
+    first configured service) and export finished spans as configured. With
+    the "none" exporter spans are still recorded (their ids appear in the
+    logs) but not written anywhere.
+    """
+    global _provider, _output
+    settings = settings or TracingSettings.from_env()
+    if settings.exporter not in ("none", "console", "file"):
+        raise ValueError(f"Unknown TRACING_EXPORTER: {settings.exporter}")
+    stop_tracing()
+    if TracerProvider is None:
+        if settings.exporter != "none":
+            logger.warning("TRACING_EXPORTER=%s needs opentelemetry-sdk; spans are not recorded", settings.exporter)
+        return
+    if _provider is None:
+        _provider = TracerProvider(resource=Resource.create({"service.name": settings.service_name}))
+        _provider.add_span_processor(_processor)
+        trace.set_tracer_provider(_provider)
+    if settings.exporter == "none":
+        return
+    if settings.exporter == "file":
+        _output = open(settings.file, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=_output, formatter=json_lines)
+    else:
+        exporter = ConsoleSpanExporter(formatter=json_lines)
+    set_span_processor(BatchSpanProcessor(exporter, max_queue_size=settings.queue_size))
+
+def stop_tracing() -> None:
+    """Flush queued spans and stop exporting"""
+    global _output
+    processor = set_span_processor(None)
+    if processor is not None:
+        processor.shutdown()
+    if _output is not None:
+        _output.close()
+        _output = None
+
+def tracing_stats() -> Dict[str, Any]:
+    return {"recording": _provider is not None, "exporting": _processor.target is not None}
+
+atexit.register(stop_tracing)
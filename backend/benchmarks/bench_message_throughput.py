@@ -0,0 +1,91 @@
+"""
+Concurrent POST /message throughput with a slow mocked LLM.
+
+By default the backend runs in-process on a scratch SQLite database and the
+OpenAI client is wired to benchmarks.mock_openai_server. To compare against
+another build (e.g. the synchronous-DB handlers), start that build against the
+mock server and pass --url:
+
+    python -m benchmarks.bench_message_throughput --requests 50 --concurrency 25
+    python -m benchmarks.bench_message_throughput --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+import httpx
+
+async def run(client: httpx.AsyncClient, total: int, concurrency: int) -> dict:
+    session_ids = [
+        (await client.post("/session")).json()["session_id"] for _ in range(concurrency)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def send(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/message", json={
+                "session_id": session_ids[i % len(session_ids)],
+                "speaker": "user",
+                "content": f"Benchmark message {i}",
+                "timestamp": datetime.now().isoformat()
+            })
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[send(i) for i in range(total)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_s": round(latencies[len(latencies) // 2], 3),
+        "p95_s": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+    }
+
+async def run_in_process(total: int, concurrency: int, delay: float) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+
+    from app import main
+    from app.database import Base, engine
+    from services.openai_service import OpenAIService
+    from benchmarks.mock_openai_server import create_mock_client
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    service = OpenAIService()
+    service.client = create_mock_client(delay)
+    main.get_openai_service = lambda: service
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        return await run(client, total, concurrency)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="Mock LLM latency in seconds (in-process only)")
+    args = parser.parse_args()
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            result = await run(client, args.requests, args.concurrency)
+    else:
+        result = await run_in_process(args.requests, args.concurrency, args.llm_delay)
+
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Serializing a large session's message list: the old path (ORM objects,
+isoformat per timestamp, jsonable_encoder, json.dumps) against the current
+one (row tuples zipped into dicts in one pass and rendered by orjson), plus
+validating and dumping the SessionDetail response model with pydantic-core
+(FastAPI's response_model path) for reference.
+
+    python -m benchmarks.bench_serialization --messages 5000 --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+def build_rows(count: int) -> list:
+    base = datetime(2025, 1, 1)
+    return [
+        (
+            f"message-{i:06d}",
+            "session-1",
+            "user" if i % 2 == 0 else "assistant",
+            base + timedelta(seconds=i, microseconds=i),
+            f"Agent output {i}: 10y yield 4.{i % 10}%, 2s10s spread {i % 50}bp\n" * 8,
+            {"context": {"tokens_kept": i, "messages_kept": i % 20}},
+            i % 25 == 0,
+        )
+        for i in range(count)
+    ]
+
+def time_runs(fn, runs: int) -> tuple:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    from fastapi.encoders import jsonable_encoder
+    from app import models
+    from app.main import message_rows
+    from app.responses import ORJSONResponse, orjson
+    from app.schemas import SessionDetail
+    from pydantic import TypeAdapter
+
+    rows = build_rows(args.messages)
+    orm_messages = [
+        models.DBMessage(
+            id=row[0], session_id=row[1], speaker=row[2], timestamp=row[3],
+            content=row[4], message_metadata=row[5], pinned=row[6]
+        )
+        for row in rows
+    ]
+    envelope = {"id": "session-1", "session_id": "session-1", "created_at": datetime(2025, 1, 1),
+                "has_more": False, "prev_cursor": None, "next_cursor": None}
+
+    def orm_jsonable():
+        messages = [
+            {
+                "id": msg.id,
+                "session_id": msg.session_id,
+                "speaker": msg.speaker,
+                "timestamp": msg.timestamp.isoformat(),
+                "content": msg.content,
+                "message_metadata": msg.message_metadata,
+                "pinned": msg.pinned
+            }
+            for msg in orm_messages
+        ]
+        content = jsonable_encoder({**envelope, "created_at": envelope["created_at"].isoformat(), "messages": messages})
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    def rows_orjson():
+        return ORJSONResponse({**envelope, "messages": message_rows(rows)}).body
+
+    adapter = TypeAdapter(SessionDetail)
+
+    def pydantic_model():
+        return adapter.dump_json(adapter.validate_python({**envelope, "messages": message_rows(rows)}))
+
+    results = {}
+    for name, fn in (("orm + jsonable_encoder", orm_jsonable), ("rows + orjson", rows_orjson), ("rows + pydantic", pydantic_model)):
+        seconds, body = time_runs(fn, args.runs)
+        results[name] = (seconds, body)
+
+    reference = json.loads(results["orm + jsonable_encoder"][1])
+    assert json.loads(results["rows + orjson"][1]) == reference, "orjson output differs"
+
+    baseline = results["orm + jsonable_encoder"][0]
+    print(f"{args.messages} messages, median of {args.runs} runs (orjson {'installed' if orjson else 'missing: stdlib fallback'})")
+    for name, (seconds, body) in results.items():
+        print(f"{name:>24}: {seconds * 1000:8.2f} ms  {len(body) / 1024:8.1f} KiB  {baseline / seconds:5.1f}x")
+
+if __name__ == "__main__":
+    main()
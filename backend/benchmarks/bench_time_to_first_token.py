@@ -0,0 +1,108 @@
+"""
+Time-to-first-token of POST /message/stream versus POST /message.
+
+For the streaming endpoint, TTFT is the time until the first `delta` event
+arrives. For the blocking endpoint, the first token only reaches the client
+with the complete response. By default the backend and
+benchmarks.mock_openai_server are served from this process on local ports
+(real sockets, so chunks are not buffered); pass --url to measure a running
+server that has OPENAI_BASE_URL pointed at the mock server.
+
+    python -m benchmarks.bench_time_to_first_token --runs 10 --llm-delay 0.3 --token-delay 0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+import httpx
+
+def user_message(session_id: str) -> dict:
+    return {
+        "session_id": session_id,
+        "speaker": "user",
+        "content": "Write the intro section",
+        "timestamp": datetime.now().isoformat()
+    }
+
+async def measure_stream(client: httpx.AsyncClient, session_id: str) -> tuple:
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/message/stream", json=user_message(session_id)) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: delta":
+                first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+async def measure_blocking(client: httpx.AsyncClient, session_id: str) -> tuple:
+    start = time.perf_counter()
+    response = await client.post("/message", json=user_message(session_id))
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+async def run(client: httpx.AsyncClient, runs: int) -> dict:
+    session_id = (await client.post("/session")).json()["session_id"]
+    results = {}
+    for name, measure in (("blocking", measure_blocking), ("stream", measure_stream)):
+        samples = [await measure(client, session_id) for _ in range(runs)]
+        results[name] = {
+            "ttft_p50_s": round(statistics.median(s[0] for s in samples), 3),
+            "total_p50_s": round(statistics.median(s[1] for s in samples), 3),
+        }
+    return results
+
+async def run_in_process(runs: int, delay: float, token_delay: float, port: int) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+
+    from app import main
+    from app.database import Base, engine
+    from services.openai_service import OpenAIService
+    from openai import AsyncOpenAI
+    from benchmarks import mock_openai_server
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    mock_openai_server.app.state.delay = delay
+    mock_openai_server.app.state.token_delay = token_delay
+    mock_server, mock_task = await mock_openai_server.start_server(mock_openai_server.app, port + 1)
+
+    service = OpenAIService()
+    service.client = AsyncOpenAI(api_key="mock-key", base_url=f"http://127.0.0.1:{port + 1}/v1")
+    main.get_openai_service = lambda: service
+    api_server, api_task = await mock_openai_server.start_server(main.app, port)
+
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            return await run(client, runs)
+    finally:
+        api_server.should_exit = True
+        mock_server.should_exit = True
+        await asyncio.gather(api_task, mock_task)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--llm-delay", type=float, default=0.3, help="Mock delay before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Mock delay per token")
+    parser.add_argument("--port", type=int, default=8765, help="Local port for the in-process API (mock uses port + 1)")
+    args = parser.parse_args()
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            results = await run(client, args.runs)
+    else:
+        results = await run_in_process(args.runs, args.llm_delay, args.token_delay, args.port)
+
+    for name, result in results.items():
+        print(f"{name:>8}: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Minimal stand-in for the OpenAI chat completions API used by the benchmarks.
+
+Run it as a standalone server and point the backend at it:
+
+    MOCK_LLM_DELAY=1.0 uvicorn benchmarks.mock_openai_server:app --port 9000
+    OPENAI_BASE_URL=http://localhost:9000/v1 uvicorn app.main:app --port 8000
+
+or mount it in-process with httpx.ASGITransport (see create_mock_client).
+ASGITransport buffers whole responses, so streaming benchmarks serve it on a
+local port instead (see start_server).
+
+MOCK_LLM_DELAY is the time before the first token; MOCK_LLM_TOKEN_DELAY is
+added per generated token, so a non-streamed completion takes
+delay + tokens * token_delay while a streamed one starts after delay.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
+
+app = FastAPI()
+
+app.state.delay = float(os.getenv("MOCK_LLM_DELAY", "1.0"))
+app.state.token_delay = float(os.getenv("MOCK_LLM_TOKEN_DELAY", "0.0"))
+
+MOCK_COMPLETION = "This is a mock completion from the benchmark LLM server."
+
+def completion_tokens():
+    return [word + " " for word in MOCK_COMPLETION.split(" ")]
+
+async def stream_chunks(completion_id: str, model: str):
+    await asyncio.sleep(app.state.delay)
+    for token in completion_tokens():
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(app.state.token_delay)
+    yield "data: [DONE]\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    model = body.get("model", "mock")
+
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(completion_id, model), media_type="text/event-stream")
+
+    tokens = completion_tokens()
+    await asyncio.sleep(app.state.delay + app.state.token_delay * len(tokens))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(tokens).strip()},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+    }
+
+def create_mock_client(delay: float, token_delay: float = 0.0) -> AsyncOpenAI:
+    """Build an AsyncOpenAI client that talks to this app in-process"""
+    app.state.delay = delay
+    app.state.token_delay = token_delay
+    return AsyncOpenAI(
+        api_key="mock-key",
+        base_url="http://mock-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+
+async def start_server(asgi_app, port: int):
+    """
+    Serve an ASGI app on 127.0.0.1:port from the running event loop.
+
+    Returns the server and its task; set server.should_exit and await the task to stop it.
+    """
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+from services.cache import LRUTTLCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Order of the stories in the final newsletter
+STORY_SECTIONS = ["introduction", "body_section", "actionable_trades"]
+FINAL_SECTIONS = ["thesis_overview"] + STORY_SECTIONS + ["conclusion"]
+
+HEADER_BANNER_IMAGE = "header_banner.png"
+SUBJECT_MAX_LENGTH = 78
+PREVIEW_MAX_LENGTH = 140
+
+# Every generated section ends by asking for edits; that line has no place in the final copy
+CLOSING_QUESTION = re.compile(r"^.*Are there any edits you'd like.*$\n?", re.IGNORECASE | re.MULTILINE)
+IMAGE_MARKER = re.compile(r"(?<!\[Image: )\b([\w-]+\.(?:png|jpe?g|gif))\b", re.IGNORECASE)
+SECTION_HEADING = re.compile(r"^\*{3}.*\*{3}\s*$\n?", re.MULTILINE)
+
+def render_fragment(content: str) -> str:
+    """Final copy of one approved section: prompt scaffolding removed, image markers made explicit"""
+    text = CLOSING_QUESTION.sub("", content)
+    text = SECTION_HEADING.sub("", text)
+    text = IMAGE_MARKER.sub(r"[Image: \1]", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def _first_line(text: str) -> str:
+    for line in text.splitlines():
+        line = line.strip().lstrip("-*# ").rstrip("*").strip()
+        if line:
+            return line
+    return ""
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(" ", 1)[0] + "…"
+
+def compute_etag(session_title: Optional[str], sections: Sequence) -> str:
+    """Strong ETag over everything the finalized newsletter is built from"""
+    parts = [session_title or ""] + [
+        f"{s.section_type}:{s.version}:{hashlib.sha256(s.content.encode()).hexdigest()}" for s in sections
+    ]
+    return '"' + hashlib.sha256("|".join(parts).encode()).hexdigest()[:32] + '"'
+
+class NewsletterAssembler:
+    """
+    Assembles approved sections into the final newsletter template: subject,
+    preview text, header banner, stories and conclusion.
+
+    Each section is rendered into a fragment cached by section type, version
+    and content hash, so re-finalizing after one edit only re-renders that
+    fragment. Whole documents are cached by ETag as well.
+    """
+
+    def __init__(self, fragments: LRUTTLCache, documents: LRUTTLCache):
+        self.fragments = fragments
+        self.documents = documents
+        self.renders = 0
+
+    def fragment(self, section) -> str:
+        key = make_cache_key(
+            section_type=section.section_type,
+            version=section.version,
+            content=hashlib.sha256(section.content.encode()).hexdigest()
+        )
+        rendered = self.fragments.get(key)
+        if rendered is None:
+            rendered = render_fragment(section.content)
+            self.renders += 1
+            self.fragments.set(key, rendered)
+        return rendered
+
+    def assemble(self, session_id: str, session_title: Optional[str], sections: Sequence) -> Dict:
+        """
+        Args:
+            sections: The approved version of each section (objects with
+                section_type, version and content)
+
+        Returns:
+            The finalized newsletter, including its ETag
+        """
+        etag = compute_etag(session_title, sections)
+        cached = self.documents.get(etag)
+        if cached is not None:
+            return cached
+
+        by_type = {s.section_type: s for s in sections}
+        fragments = {section_type: self.fragment(s) for section_type, s in by_type.items()}
+        thesis = fragments.get("thesis_overview", "")
+        stories: List[Dict] = [
+            {"section_type": t, "version": by_type[t].version, "content": fragments[t]}
+            for t in STORY_SECTIONS if t in fragments
+        ]
+        conclusion = fragments.get("conclusion", "")
+
+        subject = _truncate(_first_line(thesis) or session_title or "Newsletter", SUBJECT_MAX_LENGTH)
+        preview_source = stories[0]["content"] if stories else thesis
+        preview_text = _truncate(_first_line(preview_source), PREVIEW_MAX_LENGTH)
+
+        body = [f"Subject: {subject}", f"Preview: {preview_text}", f"[Image: {HEADER_BANNER_IMAGE}]"]
+        body += [thesis] + [story["content"] for story in stories] + [conclusion]
+        document = {
+            "session_id": session_id,
+            "etag": etag,
+            "subject": subject,
+            "preview_text": preview_text,
+            "header_banner": {"image": HEADER_BANNER_IMAGE, "content": thesis},
+            "stories": stories,
+            "conclusion": conclusion,
+            "missing_sections": [t for t in FINAL_SECTIONS if t not in by_type],
+            "content": "\n\n".join(part for part in body if part),
+        }
+        self.documents.set(etag, document)
+        return document
+
+    def stats(self) -> Dict:
+        return {
+            "fragments": self.fragments.stats(),
+            "documents": self.documents.stats(),
+            "renders": self.renders,
+        }
+
+def create_newsletter_assembler() -> NewsletterAssembler:
+    """Build an assembler whose caches hold FINALIZE_CACHE_MAX_ENTRIES entries for FINALIZE_CACHE_TTL_SECONDS"""
+    max_entries = int(os.getenv("FINALIZE_CACHE_MAX_ENTRIES", "512"))
+    ttl_seconds = float(os.getenv("FINALIZE_CACHE_TTL_SECONDS", "86400"))
+    return NewsletterAssembler(
+        fragments=LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds),
+        documents=LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds),
+    )
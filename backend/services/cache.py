@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import delete
+from app import database, models
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(**parts: Any) -> str:
+    """Stable SHA-256 key over everything that determines a completion"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class LRUTTLCache:
+    """In-memory LRU cache whose entries also expire after `ttl_seconds`"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (value, self.clock() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class SQLResponseCache:
+    """
+    Persistent cache tier in the response_cache table, shared by all workers.
+    Expired rows are deleted when read, and every `purge_every` writes a
+    sweep deletes the rest, so keys that are never asked for again don't
+    accumulate.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, purge_every: int = 100):
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.purged = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        async with database.AsyncSessionLocal() as db:
+            entry = await db.get(models.DBResponseCache, key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= datetime.utcnow():
+                await db.delete(entry)
+                await db.commit()
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.value
+
+    async def set(self, key: str, value: str) -> None:
+        now = datetime.utcnow()
+        async with database.AsyncSessionLocal() as db:
+            await db.merge(models.DBResponseCache(
+                key=key,
+                value=value,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds)
+            ))
+            await db.commit()
+        self.writes += 1
+        if self.purge_every and self.writes % self.purge_every == 0:
+            try:
+                self.purged += await self.purge_expired()
+            except Exception as e:
+                # The entry itself was stored; the next sweep will catch up
+                logger.error("Purging expired cache entries failed: %s", e)
+
+    async def purge_expired(self) -> int:
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(models.DBResponseCache).where(models.DBResponseCache.expires_at <= datetime.utcnow())
+            )
+            await db.commit()
+            return result.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "purged": self.purged}
+
+class ResponseCache:
+    """
+    Two-tier completion cache: an in-memory LRU/TTL tier in front of an
+    optional persistent tier. Persistent hits are promoted into memory.
+    Errors from the persistent tier are logged and treated as misses.
+    """
+
+    def __init__(self, memory: LRUTTLCache, persistent: Optional[SQLResponseCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        try:
+            value = await self.persistent.get(key)
+        except Exception as e:
+            logger.error("Persistent cache read failed: %s", e)
+            return None
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, value)
+            except Exception as e:
+                logger.error("Persistent cache write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent else None,
+        }
+
+def create_response_cache() -> ResponseCache:
+    """
+    Build the section cache from SECTION_CACHE_MAX_ENTRIES, SECTION_CACHE_TTL_SECONDS,
+    SECTION_CACHE_PERSISTENT (store entries in the database as well) and
+    SECTION_CACHE_PURGE_EVERY (writes between sweeps of expired rows).
+    """
+    ttl_seconds = float(os.getenv("SECTION_CACHE_TTL_SECONDS", "3600"))
+    persistent = None
+    if os.getenv("SECTION_CACHE_PERSISTENT", "false").lower() in ("1", "true", "yes"):
+        persistent = SQLResponseCache(
+            ttl_seconds=ttl_seconds, purge_every=int(os.getenv("SECTION_CACHE_PURGE_EVERY", "100"))
+        )
+    return ResponseCache(
+        LRUTTLCache(
+            max_entries=int(os.getenv("SECTION_CACHE_MAX_ENTRIES", "256")),
+            ttl_seconds=ttl_seconds,
+        ),
+        persistent,
+    )
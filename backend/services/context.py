@@ -0,0 +1,126 @@
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing overhead in the chat format (role, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+def approximate_token_count(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used when tiktoken is unavailable"""
+    return (len(text) + 3) // 4
+
+def get_token_counter(encoding_name: str = "o200k_base") -> Callable[[str], int]:
+    """
+    Return a function that counts tokens with tiktoken's local tokenizer, or the
+    character-based approximation if tiktoken or its encoding files are unavailable.
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning("tiktoken unavailable (%s), using approximate token counts", e)
+        return approximate_token_count
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+@dataclass
+class ContextMetrics:
+    budget: int
+    tokens_kept: int = 0
+    tokens_dropped: int = 0
+    messages_kept: int = 0
+    messages_dropped: int = 0
+    over_budget: bool = False
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+@dataclass
+class ContextWindow:
+    messages: List[Dict[str, str]]
+    metrics: ContextMetrics
+
+@dataclass
+class ContextAssembler:
+    """
+    Fits a session's history into a token budget.
+
+    The system prompt, pinned messages (e.g. the approved thesis) and the most
+    recent messages are always kept. Older turns are added newest-first while
+    they fit; the rest are replaced by a single note saying they were omitted.
+    """
+    budget: int = 12000
+    min_recent_messages: int = 4
+    system_prompt: str = ""
+    count_tokens: Callable[[str], int] = field(default=approximate_token_count)
+
+    def message_tokens(self, message: Dict) -> int:
+        return self.count_tokens(message["content"]) + MESSAGE_TOKEN_OVERHEAD
+
+    def assemble(self, history: List[Dict]) -> ContextWindow:
+        """
+        Select which history messages to send.
+
+        Args:
+            history: Oldest-first dicts with "role" and "content", optionally "pinned"
+
+        Returns:
+            The selected messages (role/content only, original order) and metrics
+        """
+        metrics = ContextMetrics(budget=self.budget)
+        costs = [self.message_tokens(msg) for msg in history]
+        used = self.count_tokens(self.system_prompt) + MESSAGE_TOKEN_OVERHEAD
+
+        recent_start = max(len(history) - self.min_recent_messages, 0)
+        keep = set()
+        for i, msg in enumerate(history):
+            if i >= recent_start or msg.get("pinned"):
+                keep.add(i)
+                used += costs[i]
+
+        older = [i for i in range(recent_start - 1, -1, -1) if i not in keep]
+        note_cost = self.message_tokens({"content": self._omission_note(len(older))})
+        if used + sum(costs[i] for i in older) <= self.budget:
+            # Whole history fits, nothing to elide
+            keep.update(older)
+            used += sum(costs[i] for i in older)
+        else:
+            # Fill newest-first, leaving room for the omission note
+            for i in older:
+                if used + costs[i] + note_cost > self.budget:
+                    break
+                keep.add(i)
+                used += costs[i]
+
+        dropped = [i for i in range(len(history)) if i not in keep]
+        messages = []
+        note_added = False
+        for i, msg in enumerate(history):
+            if i in keep:
+                messages.append({"role": msg["role"], "content": msg["content"]})
+            elif not note_added:
+                messages.append({"role": "system", "content": self._omission_note(len(dropped))})
+                used += note_cost
+                note_added = True
+
+        metrics.tokens_kept = used
+        metrics.tokens_dropped = sum(costs[i] for i in dropped)
+        metrics.messages_kept = len(keep)
+        metrics.messages_dropped = len(dropped)
+        metrics.over_budget = used > self.budget
+        return ContextWindow(messages=messages, metrics=metrics)
+
+    @staticmethod
+    def _omission_note(count: int) -> str:
+        return f"[{count} earlier messages omitted to fit the context window]"
+
+def create_context_assembler(system_prompt: str) -> ContextAssembler:
+    """Build an assembler configured from CONTEXT_TOKEN_BUDGET / CONTEXT_MIN_RECENT_MESSAGES"""
+    return ContextAssembler(
+        budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000")),
+        min_recent_messages=int(os.getenv("CONTEXT_MIN_RECENT_MESSAGES", "4")),
+        system_prompt=system_prompt,
+        count_tokens=get_token_counter(),
+    )
@@ -0,0 +1,215 @@
+import asyncio
+import html
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "txt": "text/plain; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+class ExportError(Exception):
+    """Base class for export failures"""
+    pass
+
+class ExportUnavailableError(ExportError):
+    """Raised when a format's optional renderer is not installed"""
+    pass
+
+class ExportQueueFullError(ExportError):
+    """Raised when every worker is busy and the wait queue is full"""
+    pass
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{subject}</title>
+<style>
+body {{ font-family: Georgia, serif; max-width: 640px; margin: 0 auto; line-height: 1.5; }}
+.preview {{ display: none; }}
+.banner img, img.image {{ width: 100%; }}
+section {{ margin: 1.5em 0; }}
+</style>
+</head>
+<body>
+<span class="preview">{preview_text}</span>
+<header class="banner"><img src="{banner_image}" alt="Header banner">
+{banner}
+</header>
+{stories}
+<footer class="conclusion">
+{conclusion}
+</footer>
+</body>
+</html>
+"""
+
+# Only file names become images; any other marker stays as (escaped) text
+IMAGE_MARKER = re.compile(r"\[Image: ([\w.-]+)\]")
+
+def _inline(line: str) -> str:
+    """Escape a line of text; [Image: file.png] markers become <img> placeholders"""
+    return IMAGE_MARKER.sub(
+        lambda m: f'<img class="image" src="{m.group(1)}" alt="{m.group(1)}">',
+        html.escape(line, quote=False)
+    )
+
+def text_to_html(text: str) -> str:
+    """Paragraphs and "- " bullet lists to HTML"""
+    blocks = []
+    bullets = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("- "):
+            bullets.append(f"<li>{_inline(line[2:])}</li>")
+            continue
+        if bullets:
+            blocks.append("<ul>" + "".join(bullets) + "</ul>")
+            bullets = []
+        if line:
+            blocks.append(f"<p>{_inline(line)}</p>")
+    if bullets:
+        blocks.append("<ul>" + "".join(bullets) + "</ul>")
+    return "\n".join(blocks)
+
+def render_html(document: Dict) -> str:
+    return HTML_TEMPLATE.format(
+        subject=html.escape(document["subject"]),
+        preview_text=html.escape(document["preview_text"]),
+        banner_image=html.escape(document["header_banner"]["image"]),
+        banner=text_to_html(document["header_banner"]["content"]),
+        stories="\n".join(f"<section>{text_to_html(story['content'])}</section>" for story in document["stories"]),
+        conclusion=text_to_html(document["conclusion"]),
+    )
+
+def render_export(document: Dict, fmt: str, path: str) -> str:
+    """
+    Render a finalized newsletter to `path`. Runs in a worker process, so it
+    only takes and returns picklable values. The file is written under a
+    temporary name and renamed, so readers never see a partial artifact.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if fmt == "txt":
+                f.write(document["content"].encode())
+            elif fmt == "html":
+                f.write(render_html(document).encode())
+            elif fmt == "pdf":
+                try:
+                    from weasyprint import HTML
+                except ImportError:
+                    raise ExportUnavailableError("PDF export requires WeasyPrint (pip install weasyprint)")
+                HTML(string=render_html(document)).write_pdf(f)
+            else:
+                raise ExportError(f"Unsupported export format: {fmt}")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+class ExportService:
+    """
+    Renders newsletter exports in a process pool so CPU-heavy rendering never
+    blocks the event loop.
+
+    At most `max_workers` renders run at once and `max_queue` more may wait;
+    beyond that ExportQueueFullError is raised so callers can shed load.
+    Artifacts are stored in `cache_dir` under the finalized newsletter's hash,
+    so an export is rendered once per distinct newsletter and format, and
+    concurrent requests for the same artifact share one render.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_workers: int = 2,
+        max_queue: int = 8,
+        executor_factory: Optional[Callable[[int], Executor]] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor_factory = executor_factory or (lambda workers: ProcessPoolExecutor(max_workers=workers))
+        self._executor: Optional[Executor] = None
+        self.singleflight = SingleFlight()
+        self.pending = 0
+        self.renders = 0
+        self.hits = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use so importing the app doesn't start worker processes
+        if self._executor is None:
+            self._executor = self.executor_factory(self.max_workers)
+        return self._executor
+
+    def path_for(self, content_hash: str, fmt: str) -> Path:
+        name = content_hash.removeprefix("W/").strip('"')
+        return self.cache_dir / f"{name}.{fmt}"
+
+    async def export(self, document: Dict, fmt: str) -> Path:
+        """
+        Returns:
+            Path of the rendered artifact in the on-disk cache
+        """
+        if fmt not in MEDIA_TYPES:
+            raise ExportError(f"Unsupported export format: {fmt}")
+
+        path = self.path_for(document["etag"], fmt)
+        if path.exists():
+            self.hits += 1
+            return path
+        return await self.singleflight.do(str(path), lambda: self._render(document, fmt, path))
+
+    async def _render(self, document: Dict, fmt: str, path: Path) -> Path:
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExportQueueFullError("Export queue is full, try again shortly")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, render_export, document, fmt, str(path))
+        finally:
+            self.pending -= 1
+        self.renders += 1
+        logger.info("Rendered %s export %s", fmt, path.name)
+        return path
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "pending": self.pending,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "renders": self.renders,
+            "hits": self.hits,
+            "rejected": self.rejected,
+        }
+
+def create_export_service() -> ExportService:
+    """Build the export service from EXPORT_CACHE_DIR, EXPORT_MAX_WORKERS and EXPORT_MAX_QUEUE"""
+    return ExportService(
+        cache_dir=os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "newsletter_exports")),
+        max_workers=int(os.getenv("EXPORT_MAX_WORKERS", "2")),
+        max_queue=int(os.getenv("EXPORT_MAX_QUEUE", "8")),
+    )
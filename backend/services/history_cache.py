@@ -0,0 +1,163 @@
+import logging
+import os
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Broadcast topic telling other workers to drop a session's cached history
+HISTORY_INVALIDATED = "history.invalidated"
+
+# (role, content, pinned)
+HistoryItem = Tuple[str, str, bool]
+
+class CachedHistory:
+    """What a chat turn needs from the database: the rolling summary and the messages after it"""
+    __slots__ = ("summary", "messages", "size")
+
+    def __init__(self, summary: Optional[str], messages: List[HistoryItem]):
+        self.summary = summary
+        self.messages = messages
+        self.size = sys.getsizeof(self) + (sys.getsizeof(summary) if summary is not None else 0)
+        self.size += sys.getsizeof(messages) + sum(item_size(item) for item in messages)
+
+def item_size(item: HistoryItem) -> int:
+    return sys.getsizeof(item) + sys.getsizeof(item[0]) + sys.getsizeof(item[1])
+
+class HistoryCache:
+    """
+    Bounded LRU cache of compact per-session chat histories.
+
+    Entries are filled on a miss and kept current write-through: messages
+    this process commits are appended instead of invalidating. Anything else
+    that changes a history (deleted sessions, pins, a new summary) invalidates
+    the entry. With an event hub attached, every local write also broadcasts
+    an invalidation so other workers drop their copy.
+
+    Loads take a token from load_token() before reading the database; set()
+    ignores the result if that session was written in between, so a slow read
+    can't overwrite a fresher history with a stale one. Writes to other
+    sessions don't affect it.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024, hub=None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.hub = hub
+        self._entries: "OrderedDict[str, CachedHistory]" = OrderedDict()
+        # Bumped by every write; each session remembers the value of its last one
+        self._sequence = 0
+        self._written: "OrderedDict[str, int]" = OrderedDict()
+        # Sessions forgotten from _written count as written at this point
+        self._written_floor = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if hub is not None:
+            hub.add_listener(HISTORY_INVALIDATED, self._on_remote_invalidation)
+
+    def get(self, session_id: str) -> Optional[CachedHistory]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry
+
+    def load_token(self) -> int:
+        return self._sequence
+
+    def set(self, session_id: str, entry: CachedHistory, token: int) -> None:
+        if token < self._written_floor or self._written.get(session_id, 0) > token:
+            return
+        self._drop(session_id)
+        self._entries[session_id] = entry
+        self.bytes += entry.size
+        self._evict()
+
+    async def append(self, session_id: str, items: Iterable[HistoryItem]) -> None:
+        """Write-through for newly committed messages"""
+        self._record_write(session_id)
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            for item in items:
+                entry.messages.append(item)
+                entry.size += item_size(item)
+                self.bytes += item_size(item)
+            self._evict()
+        await self._broadcast(session_id)
+
+    async def invalidate(self, session_id: str) -> None:
+        self._record_write(session_id)
+        if self._drop(session_id):
+            self.invalidations += 1
+        await self._broadcast(session_id)
+
+    def clear(self) -> None:
+        self._sequence += 1
+        self._written.clear()
+        self._written_floor = self._sequence
+        self._entries.clear()
+        self.bytes = 0
+
+    def _record_write(self, session_id: str) -> None:
+        self._sequence += 1
+        self._written.pop(session_id, None)
+        self._written[session_id] = self._sequence
+        # Bounded like the entries: forgetting the oldest writes only makes loads
+        # that started before them conservatively rejected
+        while len(self._written) > self.max_sessions:
+            _, self._written_floor = self._written.popitem(last=False)
+
+    def _drop(self, session_id: str) -> bool:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        self.bytes -= entry.size
+        return True
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_sessions or self.bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    async def _broadcast(self, session_id: str) -> None:
+        if self.hub is not None:
+            await self.hub.broadcast(HISTORY_INVALIDATED, {"session_id": session_id})
+
+    def _on_remote_invalidation(self, data: Dict, origin: str) -> None:
+        # Our own writes are already reflected locally
+        if origin == self.hub.instance_id:
+            return
+        self._record_write(data["session_id"])
+        if self._drop(data["session_id"]):
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "messages": sum(len(entry.messages) for entry in self._entries.values()),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+def create_history_cache(hub=None) -> HistoryCache:
+    """Build the cache from HISTORY_CACHE_MAX_SESSIONS and HISTORY_CACHE_MAX_BYTES"""
+    return HistoryCache(
+        max_sessions=int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", "1000")),
+        max_bytes=int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        hub=hub,
+    )
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Dict, List
+from services.openai_service import OpenAIServiceError
+
+logger = logging.getLogger(__name__)
+
+# Sections of a full newsletter and the sections each one builds on. Everything
+# after the thesis only needs the thesis, so those sections run concurrently.
+SECTION_DEPENDENCIES: Dict[str, List[str]] = {
+    "thesis_overview": [],
+    "introduction": ["thesis_overview"],
+    "body_section": ["thesis_overview"],
+    "actionable_trades": ["thesis_overview"],
+    "conclusion": ["thesis_overview"],
+}
+
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+def section_context(context: Dict[str, str], section_type: str, results: Dict[str, str]) -> Dict[str, str]:
+    """Prompt context for a section, with the content of its dependencies appended to additional_info"""
+    parts = [context.get("additional_info", "")]
+    for dependency in SECTION_DEPENDENCIES[section_type]:
+        parts.append(f"Build on this {dependency.replace('_', ' ')}:\n{results[dependency]}")
+    return {**context, "additional_info": "\n\n".join(p for p in parts if p)}
+
+class NewsletterGenerator:
+    """
+    Generates every newsletter section as a dependency DAG.
+
+    A section starts as soon as its dependencies are done, with at most
+    `max_concurrency` sections in flight, so a full draft takes roughly the
+    critical path (thesis + slowest other section) instead of the sum. Results
+    are yielded as each section finishes. A section that fails with an OpenAI
+    error is retried on its own, up to `max_attempts` times; sections that
+    depend on a section that still failed are skipped. Successful sections are
+    in the section cache, so re-running a partially failed draft only
+    regenerates what is missing.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_attempts: int = 2):
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+
+    async def generate(
+        self,
+        openai_service,
+        context: Dict[str, str],
+        use_cache: bool = True,
+        **overrides
+    ) -> AsyncIterator[Dict]:
+        """
+        `overrides` (model, max_tokens) are passed on to every
+        generate_section_content call.
+
+        Yields:
+            One dict per section: section_type, status (completed/failed/skipped),
+            attempts, and content or detail
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[str, str] = {}
+        attempts: Dict[str, int] = {section: 0 for section in SECTION_DEPENDENCIES}
+        pending = set(SECTION_DEPENDENCIES)
+        running: Dict[asyncio.Task, str] = {}
+
+        async def run(section_type: str) -> str:
+            async with semaphore:
+                return await openai_service.generate_section_content(
+                    section_type,
+                    section_context(context, section_type, results),
+                    use_cache=use_cache,
+                    **overrides
+                )
+
+        def start(section_type: str) -> None:
+            attempts[section_type] += 1
+            running[asyncio.create_task(run(section_type))] = section_type
+
+        try:
+            while pending or running:
+                ready = [s for s in pending if all(d in results for d in SECTION_DEPENDENCIES[s])]
+                for section_type in ready:
+                    pending.discard(section_type)
+                    start(section_type)
+
+                if not running:
+                    # Whatever is left depends on a section that failed for good
+                    for section_type in sorted(pending):
+                        yield {
+                            "section_type": section_type,
+                            "status": SKIPPED,
+                            "attempts": 0,
+                            "detail": "A section it depends on failed",
+                        }
+                    return
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    section_type = running.pop(task)
+                    try:
+                        results[section_type] = task.result()
+                    except OpenAIServiceError as e:
+                        if attempts[section_type] < self.max_attempts:
+                            logger.warning("Section %s failed (%s), retrying", section_type, e)
+                            start(section_type)
+                            continue
+                        yield {
+                            "section_type": section_type,
+                            "status": FAILED,
+                            "attempts": attempts[section_type],
+                            "detail": str(e),
+                        }
+                        continue
+                    except ValueError as e:
+                        yield {
+                            "section_type": section_type,
+                            "status": FAILED,
+                            "attempts": attempts[section_type],
+                            "detail": str(e),
+                        }
+                        continue
+                    yield {
+                        "section_type": section_type,
+                        "status": COMPLETED,
+                        "attempts": attempts[section_type],
+                        "content": results[section_type],
+                    }
+        finally:
+            # The consumer went away (e.g. client disconnect): stop outstanding work
+            for task in running:
+                task.cancel()
+
+def create_newsletter_generator() -> NewsletterGenerator:
+    """Build a generator configured from NEWSLETTER_MAX_CONCURRENCY / NEWSLETTER_SECTION_ATTEMPTS"""
+    return NewsletterGenerator(
+        max_concurrency=int(os.getenv("NEWSLETTER_MAX_CONCURRENCY", "4")),
+        max_attempts=int(os.getenv("NEWSLETTER_SECTION_ATTEMPTS", "2")),
+    )
@@ -1,23 +1,50 @@
 from openai import AsyncOpenAI, OpenAIError
-from typing import Optional, Dict, List, Any
+from opentelemetry import trace
+from typing import Optional, Dict, List, Any, AsyncIterator
 import os
-from datetime import datetime
-from templates.prompts import PROMPT_TEMPLATES
+from templates.prompts import PROMPT_TEMPLATES, SUMMARY_PROMPT
+from services.cache import create_response_cache, make_cache_key
+from services.resilience import create_resilient_caller
+from services.singleflight import SingleFlight
+from services.usage import report_usage
 from dotenv import load_dotenv
 import logging
 from fastapi import HTTPException
+from app.logging_config import payload_preview
+from app.metrics import OPENAI_TOKENS
+from app.tracing import current_span, tracer
 
 # Load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class OpenAIServiceError(Exception):
     """Custom exception for OpenAI service errors"""
     pass
 
+def record_usage(usage: Any, section_type: str, model: Optional[str] = None) -> None:
+    """
+    Add a completion's `usage` to openai_tokens_total, the current span and
+    the caller's usage recorder, labelled with what was generated
+    """
+    if usage is None:
+        return
+    span = current_span()
+    counts = {}
+    for kind, attribute in (("prompt", "gen_ai.usage.input_tokens"), ("completion", "gen_ai.usage.output_tokens")):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            counts[kind] = tokens
+            OPENAI_TOKENS.labels(section_type=section_type, kind=kind).inc(tokens)
+            if span is not None:
+                span.set_attribute(attribute, tokens)
+    if counts:
+        report_usage(
+            section_type, model if isinstance(model, str) else None,
+            counts.get("prompt", 0), counts.get("completion", 0)
+        )
+
 # Updated detailed system prompt for newsletter creation
 NEWSLETTER_SYSTEM_PROMPT = """
 You are a professional financial newsletter writer. The newsletter creation process occurs in multiple, interactive steps. For each step, output the content following the exact format provided and then end with the question: "Are there any edits you'd like or can we continue to the next section?" This ensures a step-by-step, interactive process.
@@ -70,12 +97,20 @@ class OpenAIService:
             raise OpenAIServiceError("OPENAI_API_KEY not found in environment variables")
         
         logger.debug("Initializing AsyncOpenAI client")
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # Retries are handled by self.resilience, so the SDK's own retries are disabled
+        self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        self.section_cache = create_response_cache()
+        self.resilience = create_resilient_caller()
+        # Identical concurrent generations share one upstream call
+        self.singleflight = SingleFlight()
 
     async def generate_section_content(
         self,
         section_type: str,
-        context: Dict[str, str]
+        context: Dict[str, str],
+        use_cache: bool = True,
+        model: Optional[str] = None,
+        max_tokens: int = 500
     ) -> str:
         """
         Generate content for a newsletter section using OpenAI.
@@ -83,105 +118,221 @@ class OpenAIService:
         Args:
             section_type: Type of section to generate (e.g. "thesis_overview", "introduction", "body_section", "actionable_trades", "conclusion")
             context: Dictionary containing context variables for the prompt
+            use_cache: Look the section up in the response cache first. The
+                generated content is cached either way, so bypassing refreshes the entry.
+            model: Model to use instead of the pinned default (e.g. a cheaper one
+                when the token budget is running out)
+            max_tokens: Cap on the length of the generated section
         
         Returns:
             Generated content as a string
         """
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        with tracer.start_as_current_span("openai.generate_section_content", attributes={"newsletter.section_type": section_type}) as span:
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is not set")
             
-        # Retrieve the appropriate template
-        template = PROMPT_TEMPLATES.get(section_type)
-        if not template:
-            raise ValueError(f"No template found for section type: {section_type}")
+            # Retrieve the appropriate template
+            template = PROMPT_TEMPLATES.get(section_type)
+            if not template:
+                raise ValueError(f"No template found for section type: {section_type}")
 
-        # Format the prompt with the provided context
-        try:
-            prompt = template.format(**context)
-        except KeyError as e:
-            raise ValueError(f"Missing required context key: {str(e)}")
+            # Format the prompt with the provided context
+            try:
+                prompt = template.format(**context)
+            except KeyError as e:
+                raise ValueError(f"Missing required context key: {str(e)}")
 
-        try:
-            # Call OpenAI API with the detailed newsletter system prompt
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18",
-                messages=[
+            request = {
+                "model": model or "gpt-4o-mini-2024-07-18",
+                "messages": [
                     {"role": "system", "content": NEWSLETTER_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.7,
-                max_tokens=500
+                "temperature": 0.7,
+                "max_tokens": max_tokens
+            }
+            cache_key = make_cache_key(**request)
+
+            if use_cache:
+                cached = await self.section_cache.get(cache_key)
+                span.set_attribute("cache.hit", cached is not None)
+                if cached is not None:
+                    logger.debug("Section cache hit for %s", section_type)
+                    return cached
+
+            async def generate() -> str:
+                models_used = []
+
+                async def create(model):
+                    models_used.append(model)
+                    return await self.client.chat.completions.create(**{**request, "model": model})
+
+                try:
+                    # Call OpenAI API with the detailed newsletter system prompt
+                    response = await self.resilience.call(request["model"], create)
+                    record_usage(response.usage, section_type, response.model)
+                    content = response.choices[0].message.content.strip()
+
+                except OpenAIError as e:
+                    raise OpenAIServiceError(f"OpenAI API error: {str(e)}")
+                except Exception as e:
+                    raise OpenAIServiceError(f"Unexpected error: {str(e)}")
+
+                # Only cache output from the model the key was computed for
+                if models_used[-1] == request["model"]:
+                    await self.section_cache.set(cache_key, content)
+                return content
+
+            return await self.singleflight.do(f"section:{cache_key}", generate)
+
+    async def summarize_conversation(self, previous_summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Fold new messages into a running conversation summary.
+
+        Args:
+            previous_summary: Summary so far (empty string if none)
+            messages: Oldest-first dicts with "role" and "content" to fold in
+
+        Returns:
+            The updated summary
+        """
+        with tracer.start_as_current_span("openai.summarize_conversation"):
+            transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+            prompt = SUMMARY_PROMPT.format(
+                previous_summary=previous_summary or "(none)",
+                messages=transcript
             )
-            return response.choices[0].message.content.strip()
 
-        except OpenAIError as e:
-            raise OpenAIServiceError(f"OpenAI API error: {str(e)}")
-        except Exception as e:
-            raise OpenAIServiceError(f"Unexpected error: {str(e)}")
+            try:
+                response = await self.resilience.call("gpt-4o-mini", lambda model: self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,
+                    max_tokens=800
+                ))
+                record_usage(response.usage, "summary", response.model)
+                return response.choices[0].message.content.strip()
 
-    async def generate_response(self, messages, context=None):
-        try:
-            model = "gpt-4o-mini"  # Primary model
-            system_prompt = NEWSLETTER_SYSTEM_PROMPT
+            except OpenAIError as e:
+                raise OpenAIServiceError(f"OpenAI API error: {str(e)}")
+            except Exception as e:
+                raise OpenAIServiceError(f"Unexpected error: {str(e)}")
 
-            # Prepare message history
-            formatted_messages = []
-            formatted_messages.append({"role": "system", "content": system_prompt})
-            
-            logger.debug(f"Message structure: {messages[0] if messages else 'No messages'}")
-            
-            for msg in messages:
-                if isinstance(msg, dict):
-                    if "role" in msg and "content" in msg:
-                        formatted_messages.append(msg)
-                    elif "speaker" in msg and "content" in msg:
-                        role = msg["speaker"]
-                        if role in ["assistant", "user", "system"]:
-                            formatted_messages.append({"role": role, "content": msg["content"]})
-                        else:
-                            formatted_messages.append({"role": "user", "content": msg["content"]})
-                elif hasattr(msg, 'speaker') and hasattr(msg, 'content'):
-                    role = msg.speaker
+    def _format_messages(self, messages, context=None) -> List[Dict[str, str]]:
+        """Prepend the system prompt and normalise chat history into OpenAI message dicts"""
+        formatted_messages = []
+        formatted_messages.append({"role": "system", "content": NEWSLETTER_SYSTEM_PROMPT})
+        
+        if messages:
+            logger.debug("Message structure: %s", payload_preview(messages[0]))
+        
+        for msg in messages:
+            if isinstance(msg, dict):
+                if "role" in msg and "content" in msg:
+                    formatted_messages.append(msg)
+                elif "speaker" in msg and "content" in msg:
+                    role = msg["speaker"]
                     if role in ["assistant", "user", "system"]:
-                        formatted_messages.append({"role": role, "content": msg.content})
+                        formatted_messages.append({"role": role, "content": msg["content"]})
                     else:
-                        formatted_messages.append({"role": "user", "content": msg.content})
+                        formatted_messages.append({"role": "user", "content": msg["content"]})
+            elif hasattr(msg, 'speaker') and hasattr(msg, 'content'):
+                role = msg.speaker
+                if role in ["assistant", "user", "system"]:
+                    formatted_messages.append({"role": role, "content": msg.content})
+                else:
+                    formatted_messages.append({"role": "user", "content": msg.content})
 
-            if context:
-                formatted_messages.insert(1, {
-                    "role": "system",
-                    "content": f"Additional context: {context}"
-                })
+        if context:
+            formatted_messages.insert(1, {
+                "role": "system",
+                "content": f"Additional context: {context}"
+            })
 
-            logger.debug(f"Sending formatted messages to OpenAI: {formatted_messages}")
+        return formatted_messages
 
+    async def generate_response(self, messages, context=None, model: str = "gpt-4o-mini", max_tokens: int = 2000):
+        with tracer.start_as_current_span("openai.generate_response"):
             try:
-                response = await self.client.chat.completions.create(
-                    model=model,
-                    messages=formatted_messages,
-                    temperature=0.7,
-                    max_tokens=2000
-                )
+                formatted_messages = self._format_messages(messages, context)
+
+                logger.debug("Sending formatted messages to OpenAI: %s", payload_preview(formatted_messages))
+
+                request_key = make_cache_key(model=model, messages=formatted_messages, temperature=0.7, max_tokens=max_tokens)
+
+                async def create():
+                    response = await self.resilience.call(model, lambda m: self.client.chat.completions.create(
+                        model=m,
+                        messages=formatted_messages,
+                        temperature=0.7,
+                        max_tokens=max_tokens
+                    ))
+                    # Once per upstream call, however many callers share it
+                    record_usage(response.usage, "chat", response.model)
+                    return response
+
+                # Retries, circuit breaking and fallback models are handled by the resilience layer;
+                # identical in-flight requests (e.g. a double submit) share one call
+                response = await self.singleflight.do(f"response:{request_key}", create)
                 response_text = response.choices[0].message.content
-                logger.debug(f"Received response from OpenAI: {response_text[:100]}...")
+                logger.debug("Received response from OpenAI (%s): %s", response.model, payload_preview(response_text))
                 return response_text
-                
-            except Exception as api_err:
-                logger.error(f"Error from OpenAI API: {str(api_err)}")
-                logger.info("Trying fallback model gpt-3.5-turbo")
-                response = await self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
+
+            except Exception as e:
+                logger.error("Error generating OpenAI response: %s", e, exc_info=True)
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to generate response: {str(e)}"
+                )
+
+    async def stream_response(
+        self, messages, context=None, model: str = "gpt-4o-mini", max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat response from OpenAI, yielding content deltas as they arrive.
+
+        Retries and fallback models only apply to opening the stream, before any
+        content has been produced; errors after that surface as OpenAIServiceError
+        so the caller can keep the partial output.
+        """
+        # The span is only made current while this generator runs, never across a
+        # yield, or it would leak into (and be ended by) the consumer's context
+        span = tracer.start_span("openai.stream_response")
+        formatted_messages = self._format_messages(messages, context)
+        stream = None
+
+        try:
+            with trace.use_span(span):
+                stream = await self.resilience.call(model, lambda m: self.client.chat.completions.create(
+                    model=m,
                     messages=formatted_messages,
                     temperature=0.7,
-                    max_tokens=2000
-                )
-                response_text = response.choices[0].message.content
-                logger.debug(f"Received response from fallback model: {response_text[:100]}...")
-                return response_text
+                    max_tokens=max_tokens,
+                    stream=True,
+                    # Usage arrives in a final chunk with no choices
+                    stream_options={"include_usage": True}
+                ))
+
+            chunks = stream.__aiter__()
+            while True:
+                with trace.use_span(span):
+                    chunk = await anext(chunks, None)
+                    if chunk is None:
+                        break
+                    record_usage(getattr(chunk, "usage", None), "chat", getattr(chunk, "model", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
 
+        except OpenAIError as e:
+            raise OpenAIServiceError(f"OpenAI API error: {str(e)}")
         except Exception as e:
-            logger.error(f"Error generating OpenAI response: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate response: {str(e)}"
-            )
\ No newline at end of file
+            raise OpenAIServiceError(f"Unexpected error: {str(e)}")
+        finally:
+            # The consumer may stop early (client gone): drop the upstream connection
+            # rather than let OpenAI keep generating tokens nobody reads
+            if stream is not None:
+                await stream.close()
+            span.end()
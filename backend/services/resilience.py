@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+from opentelemetry.trace import SpanKind
+from app.metrics import OPENAI_ERRORS, OPENAI_FALLBACKS, OPENAI_REQUEST_DURATION
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status codes worth retrying (or falling back on): timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+class CircuitOpenError(Exception):
+    """Raised when every model in the chain has an open circuit breaker"""
+    pass
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS_CODES or exc.status_code >= 500
+    return False
+
+def error_label(exc: BaseException) -> str:
+    """HTTP status for API errors, otherwise the exception type (openai_errors_total `error` label)"""
+    if isinstance(exc, APIStatusError):
+        return str(exc.status_code)
+    return type(exc).__name__
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read the server's requested wait from retry-after-ms / retry-after headers, if any"""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                retry_at = parsedate_to_datetime(value)
+                return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+class RetryPolicy:
+    """Exponential backoff with full jitter; a server-provided Retry-After takes precedence"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt` (0-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    """
+    Stops calling a model after `failure_threshold` consecutive retryable
+    failures. After `reset_timeout` seconds one trial call is let through
+    (half-open); success closes the circuit, failure opens it again, and a
+    trial that ends without an outcome (cancelled) frees the slot for the next call.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            # Let exactly one trial call through
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def release_trial(self) -> None:
+        """The half-open trial was abandoned before it answered; let the next call be the trial"""
+        if self.state == self.HALF_OPEN:
+            # opened_at is kept, so the reset timeout has already elapsed
+            self.state = self.OPEN
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+class ResilientCaller:
+    """
+    Runs OpenAI requests with retry/backoff, a circuit breaker per model, a
+    process-wide cap on in-flight calls and a fallback model chain. Fallbacks
+    are only tried after retryable errors; anything else is raised at once.
+    """
+
+    def __init__(
+        self,
+        policy: Optional[RetryPolicy] = None,
+        max_inflight: int = 16,
+        fallback_models: Optional[List[str]] = None,
+        breaker_factory: Optional[Callable[[], CircuitBreaker]] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.max_inflight = max_inflight
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        self.fallback_models = fallback_models if fallback_models is not None else []
+        self.breaker_factory = breaker_factory or CircuitBreaker
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.sleep = sleep
+        self.inflight = 0
+        self.retries = 0
+        self.fallbacks = 0
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = self.breaker_factory()
+        return self.breakers[model]
+
+    def model_chain(self, primary: str) -> List[str]:
+        return [primary] + [m for m in self.fallback_models if m != primary]
+
+    async def call(self, primary_model: str, request: Callable[[str], Awaitable[T]]) -> T:
+        """
+        Call `request(model)` for the primary model, then each fallback model.
+
+        Returns:
+            The first successful result
+        """
+        last_error: BaseException = CircuitOpenError(f"Circuit open for all models: {self.model_chain(primary_model)}")
+        for index, model in enumerate(self.model_chain(primary_model)):
+            if index > 0:
+                self.fallbacks += 1
+                OPENAI_FALLBACKS.labels(model=model).inc()
+                logger.info("Falling back to model %s", model)
+            breaker = self.breaker(model)
+            for attempt in range(self.policy.max_attempts):
+                if not breaker.allow():
+                    logger.warning("Circuit open for model %s, skipping", model)
+                    break
+                try:
+                    async with self.semaphore:
+                        self.inflight += 1
+                        started = time.perf_counter()
+                        try:
+                            # One span per attempt, so retries and fallbacks show up in the trace
+                            with tracer.start_as_current_span("openai.chat.completions", kind=SpanKind.CLIENT, attributes={
+                                "gen_ai.request.model": model,
+                                "openai.attempt": attempt + 1,
+                                "openai.fallback": index > 0,
+                            }):
+                                result = await request(model)
+                        finally:
+                            self.inflight -= 1
+                            elapsed = time.perf_counter() - started
+                except Exception as e:
+                    OPENAI_REQUEST_DURATION.labels(model=model, outcome="error").observe(elapsed)
+                    OPENAI_ERRORS.labels(model=model, error=error_label(e)).inc()
+                    if not is_retryable(e):
+                        # The model answered (e.g. a 400), so it is reachable
+                        breaker.record_success()
+                        raise
+                    breaker.record_failure()
+                    last_error = e
+                    if attempt + 1 < self.policy.max_attempts:
+                        delay = self.policy.compute_delay(attempt, retry_after_seconds(e))
+                        logger.warning("Retryable error from %s (%s), retrying in %.2fs", model, e, delay)
+                        self.retries += 1
+                        await self.sleep(delay)
+                    continue
+                except BaseException:
+                    # Cancelled (client gone, coalesced caller cancelled, sibling section failed):
+                    # no outcome to record, but a half-open trial must not hold the breaker forever
+                    breaker.release_trial()
+                    raise
+                OPENAI_REQUEST_DURATION.labels(model=model, outcome="success").observe(elapsed)
+                breaker.record_success()
+                return result
+        raise last_error
+
+    def stats(self) -> Dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "retries": self.retries,
+            "fallbacks": self.fallbacks,
+            "breakers": {
+                model: {"state": b.state, "failures": b.failures, "times_opened": b.times_opened}
+                for model, b in self.breakers.items()
+            },
+        }
+
+def create_resilient_caller() -> ResilientCaller:
+    """
+    Build the caller from OPENAI_MAX_ATTEMPTS, OPENAI_BACKOFF_BASE_SECONDS,
+    OPENAI_BACKOFF_MAX_SECONDS, OPENAI_MAX_INFLIGHT, OPENAI_BREAKER_THRESHOLD,
+    OPENAI_BREAKER_RESET_SECONDS and OPENAI_FALLBACK_MODELS (comma-separated).
+    """
+    threshold = int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5"))
+    reset_timeout = float(os.getenv("OPENAI_BREAKER_RESET_SECONDS", "30"))
+    fallback_models = [m.strip() for m in os.getenv("OPENAI_FALLBACK_MODELS", "gpt-3.5-turbo").split(",") if m.strip()]
+    return ResilientCaller(
+        policy=RetryPolicy(
+            max_attempts=int(os.getenv("OPENAI_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", "0.5")),
+            max_delay=float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", "20")),
+        ),
+        max_inflight=int(os.getenv("OPENAI_MAX_INFLIGHT", "16")),
+        fallback_models=fallback_models,
+        breaker_factory=lambda: CircuitBreaker(threshold, reset_timeout),
+    )
@@ -0,0 +1,242 @@
+"""
+Fast tier for hot per-session state: the section review states, the most
+recent messages, newsletter generation progress and generation locks.
+
+Postgres stays the durable store; everything here is a copy that can be
+lost and expires after `ttl_seconds` without activity. The in-process
+backend suits a single worker and tests, while the Redis backend shares the
+state between every worker connected to the same server.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class SessionStateBackend(ABC):
+    """Interface for the session state store. All methods are coroutines."""
+
+    @abstractmethod
+    async def get_section_states(self, session_id: str) -> Dict[str, Dict]:
+        """Section type -> {"version", "state"} for the latest known version of each section"""
+        ...
+
+    @abstractmethod
+    async def set_section_state(self, session_id: str, section_type: str, version: int, state: str) -> None:
+        ...
+
+    @abstractmethod
+    async def push_messages(self, session_id: str, messages: List[Dict]) -> None:
+        """Append messages, keeping only the newest `recent_messages` per session"""
+        ...
+
+    @abstractmethod
+    async def get_recent_messages(self, session_id: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def set_progress(self, session_id: str, progress: Dict) -> None:
+        ...
+
+    @abstractmethod
+    async def get_progress(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        """Take the lock and return its token, or None if someone else holds it"""
+        ...
+
+    @abstractmethod
+    async def release_lock(self, name: str, token: str) -> bool:
+        """Release the lock if `token` still owns it"""
+        ...
+
+    @abstractmethod
+    async def is_locked(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def clear_session(self, session_id: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+class InMemorySessionState(SessionStateBackend):
+    """Keeps the state in this process only (single worker, tests)"""
+
+    def __init__(self, recent_messages: int = 50, ttl_seconds: float = 86400, clock: Callable[[], float] = time.monotonic):
+        self.recent_messages = recent_messages
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        # key -> (value, expires_at)
+        self._values: Dict[str, tuple] = {}
+
+    def _get(self, key: str, default=None):
+        entry = self._values.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._values[key]
+            return default
+        return value
+
+    def _set(self, key: str, value, ttl_seconds: Optional[float] = None) -> None:
+        self._values[key] = (value, self.clock() + (ttl_seconds or self.ttl_seconds))
+
+    async def get_section_states(self, session_id: str) -> Dict[str, Dict]:
+        return dict(self._get(f"{session_id}:sections", {}))
+
+    async def set_section_state(self, session_id: str, section_type: str, version: int, state: str) -> None:
+        sections = self._get(f"{session_id}:sections", {})
+        sections[section_type] = {"version": version, "state": state}
+        self._set(f"{session_id}:sections", sections)
+
+    async def push_messages(self, session_id: str, messages: List[Dict]) -> None:
+        recent = self._get(f"{session_id}:messages", []) + list(messages)
+        self._set(f"{session_id}:messages", recent[-self.recent_messages:])
+
+    async def get_recent_messages(self, session_id: str) -> List[Dict]:
+        return list(self._get(f"{session_id}:messages", []))
+
+    async def set_progress(self, session_id: str, progress: Dict) -> None:
+        self._set(f"{session_id}:progress", dict(progress))
+
+    async def get_progress(self, session_id: str) -> Optional[Dict]:
+        return self._get(f"{session_id}:progress")
+
+    async def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        if self._get(f"lock:{name}") is not None:
+            return None
+        token = uuid.uuid4().hex
+        self._set(f"lock:{name}", token, ttl_seconds)
+        return token
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        if self._get(f"lock:{name}") != token:
+            return False
+        del self._values[f"lock:{name}"]
+        return True
+
+    async def is_locked(self, name: str) -> bool:
+        return self._get(f"lock:{name}") is not None
+
+    async def clear_session(self, session_id: str) -> None:
+        for suffix in ("sections", "messages", "progress"):
+            self._values.pop(f"{session_id}:{suffix}", None)
+
+class RedisSessionState(SessionStateBackend):
+    """Shares the state between workers through Redis hashes, lists and SET NX locks"""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client=None,
+        recent_messages: int = 50,
+        ttl_seconds: float = 86400,
+        prefix: str = "newsletter:"
+    ):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("The redis package is required for the Redis session state backend")
+            client = redis.from_url(url)
+        self.client = client
+        self.recent_messages = recent_messages
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _key(self, session_id: str, suffix: str) -> str:
+        return f"{self.prefix}session:{session_id}:{suffix}"
+
+    def _lock_key(self, name: str) -> str:
+        return f"{self.prefix}lock:{name}"
+
+    async def get_section_states(self, session_id: str) -> Dict[str, Dict]:
+        fields = await self.client.hgetall(self._key(session_id, "sections"))
+        return {_decode(field): json.loads(value) for field, value in fields.items()}
+
+    async def set_section_state(self, session_id: str, section_type: str, version: int, state: str) -> None:
+        key = self._key(session_id, "sections")
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, section_type, json.dumps({"version": version, "state": state}))
+            pipe.expire(key, int(self.ttl_seconds))
+            await pipe.execute()
+
+    async def push_messages(self, session_id: str, messages: List[Dict]) -> None:
+        if not messages:
+            return
+        key = self._key(session_id, "messages")
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *(json.dumps(message) for message in messages))
+            pipe.ltrim(key, -self.recent_messages, -1)
+            pipe.expire(key, int(self.ttl_seconds))
+            await pipe.execute()
+
+    async def get_recent_messages(self, session_id: str) -> List[Dict]:
+        return [json.loads(value) for value in await self.client.lrange(self._key(session_id, "messages"), 0, -1)]
+
+    async def set_progress(self, session_id: str, progress: Dict) -> None:
+        await self.client.set(self._key(session_id, "progress"), json.dumps(progress), ex=int(self.ttl_seconds))
+
+    async def get_progress(self, session_id: str) -> Optional[Dict]:
+        value = await self.client.get(self._key(session_id, "progress"))
+        return json.loads(value) if value is not None else None
+
+    async def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = await self.client.set(self._lock_key(name), token, nx=True, px=int(ttl_seconds * 1000))
+        return token if acquired else None
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        from redis.exceptions import WatchError
+
+        key = self._lock_key(name)
+        # Compare-and-delete, so an expired lock taken over by another worker isn't released
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if _decode(await pipe.get(key)) != token:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def is_locked(self, name: str) -> bool:
+        return bool(await self.client.exists(self._lock_key(name)))
+
+    async def clear_session(self, session_id: str) -> None:
+        await self.client.delete(*(self._key(session_id, suffix) for suffix in ("sections", "messages", "progress")))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+def create_session_state(url: Optional[str] = None) -> SessionStateBackend:
+    """
+    Pick the backend from SESSION_STATE_URL: redis://... or unset for in-process.
+    SESSION_STATE_RECENT_MESSAGES and SESSION_STATE_TTL_SECONDS apply to both.
+    """
+    url = url if url is not None else os.getenv("SESSION_STATE_URL", "")
+    options = {
+        "recent_messages": int(os.getenv("SESSION_STATE_RECENT_MESSAGES", "50")),
+        "ttl_seconds": float(os.getenv("SESSION_STATE_TTL_SECONDS", "86400")),
+    }
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionState(url, **options)
+    if url:
+        raise ValueError(f"Unsupported session state URL: {url}")
+    return InMemorySessionState(**options)
@@ -0,0 +1,149 @@
+import logging
+import os
+from typing import Dict, Optional, Set
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import database, models
+from services.session_state import SessionStateBackend
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Expiry of the cross-worker summarization lock, in case a worker dies holding it
+SUMMARY_LOCK_TTL_SECONDS = 300
+
+def after_summary(summary: Optional[models.DBSessionSummary]):
+    """Filter for messages newer than the last one folded into the summary"""
+    if summary is None:
+        return True
+    return or_(
+        models.DBMessage.timestamp > summary.summarized_through_timestamp,
+        and_(
+            models.DBMessage.timestamp == summary.summarized_through_timestamp,
+            models.DBMessage.id > summary.summarized_through_id
+        )
+    )
+
+def summary_message(summary: str) -> Dict:
+    """Context entry carrying the running summary; pinned so the budget never drops it"""
+    return {"role": "system", "content": SUMMARY_PREFIX + summary, "pinned": True}
+
+class SessionSummarizer:
+    """
+    Maintains a persisted rolling summary per session.
+
+    Once more than `trigger_messages` messages sit after the summarized point,
+    all but the newest `keep_recent` are folded into the stored summary. Only
+    that delta is sent to the model, and the result is written to
+    session_summaries so every worker reads the same summary. With a
+    `session_state` store, a lock in it keeps workers from summarizing the
+    same session at once; the write is conditional on the stored summary not
+    having moved in the meantime either way.
+    """
+
+    def __init__(self, trigger_messages: int = 20, keep_recent: int = 8, session_state: Optional[SessionStateBackend] = None):
+        self.trigger_messages = trigger_messages
+        self.keep_recent = keep_recent
+        self.session_state = session_state
+        self._in_progress: Set[str] = set()
+
+    async def maybe_summarize(self, session_id: str, openai_service) -> bool:
+        """
+        Fold older turns into the session summary if the threshold is reached.
+        Meant to run as a background task; errors are logged, not raised.
+
+        Returns:
+            True if the summary was updated
+        """
+        # One summarization per session at a time in this process
+        if session_id in self._in_progress:
+            return False
+        self._in_progress.add(session_id)
+        lock_token = None
+        try:
+            # ...and across workers
+            if self.session_state is not None:
+                lock_token = await self.session_state.acquire_lock(f"summary:{session_id}", SUMMARY_LOCK_TTL_SECONDS)
+                if lock_token is None:
+                    return False
+            return await self._summarize(session_id, openai_service)
+        except Exception as e:
+            logger.error("Error summarizing session %s: %s", session_id, e, exc_info=True)
+            return False
+        finally:
+            self._in_progress.discard(session_id)
+            if lock_token is not None:
+                await self.session_state.release_lock(f"summary:{session_id}", lock_token)
+
+    async def _summarize(self, session_id: str, openai_service) -> bool:
+        # Read the delta, then give the connection back for the length of the model call
+        async with database.AsyncSessionLocal() as db:
+            summary = await db.get(models.DBSessionSummary, session_id)
+            result = await db.execute(
+                select(
+                    models.DBMessage.id,
+                    models.DBMessage.timestamp,
+                    models.DBMessage.speaker,
+                    models.DBMessage.content
+                )
+                .where(models.DBMessage.session_id == session_id, after_summary(summary))
+                .order_by(models.DBMessage.timestamp, models.DBMessage.id)
+            )
+            rows = result.all()
+        if len(rows) <= self.trigger_messages:
+            return False
+
+        delta = rows[:len(rows) - self.keep_recent]
+        updated = await openai_service.summarize_conversation(
+            summary.summary if summary else "",
+            [{"role": row.speaker, "content": row.content} for row in delta]
+        )
+
+        async with database.AsyncSessionLocal() as db:
+            if summary is None:
+                db.add(models.DBSessionSummary(
+                    session_id=session_id,
+                    summary=updated,
+                    summarized_through_timestamp=delta[-1].timestamp,
+                    summarized_through_id=delta[-1].id,
+                    summarized_message_count=len(delta)
+                ))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    stored = False
+                else:
+                    stored = True
+            else:
+                # Compare-and-set on the summarized point read above
+                result = await db.execute(
+                    update(models.DBSessionSummary)
+                    .where(
+                        models.DBSessionSummary.session_id == session_id,
+                        models.DBSessionSummary.summarized_through_timestamp == summary.summarized_through_timestamp,
+                        models.DBSessionSummary.summarized_through_id == summary.summarized_through_id
+                    )
+                    .values(
+                        summary=updated,
+                        summarized_through_timestamp=delta[-1].timestamp,
+                        summarized_through_id=delta[-1].id,
+                        summarized_message_count=models.DBSessionSummary.summarized_message_count + len(delta)
+                    )
+                )
+                await db.commit()
+                stored = result.rowcount == 1
+
+        if not stored:
+            logger.info("Summary for session %s was updated concurrently, discarding this one", session_id)
+            return False
+        logger.info("Folded %d messages into the summary for session %s", len(delta), session_id)
+        return True
+
+def create_session_summarizer(session_state: Optional[SessionStateBackend] = None) -> SessionSummarizer:
+    """Build a summarizer configured from SUMMARY_TRIGGER_MESSAGES / SUMMARY_KEEP_RECENT"""
+    return SessionSummarizer(
+        trigger_messages=int(os.getenv("SUMMARY_TRIGGER_MESSAGES", "20")),
+        keep_recent=int(os.getenv("SUMMARY_KEEP_RECENT", "8")),
+        session_state=session_state,
+    )
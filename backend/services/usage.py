@@ -0,0 +1,165 @@
+"""
+Token accounting and budgets.
+
+OpenAIService reports the `usage` of every completion it receives to the
+UsageRecorder active in the current context (see capture_usage), so callers
+can attribute tokens to the message or section they generated without the
+service's return values changing. TokenBudget decides how a turn is fitted
+into what is left of the per-session and global daily budgets.
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+@dataclass
+class UsageEntry:
+    # "chat", "summary" or the section type
+    purpose: str
+    model: Optional[str]
+    prompt_tokens: int
+    completion_tokens: int
+
+@dataclass
+class UsageRecorder:
+    entries: List[UsageEntry] = field(default_factory=list)
+
+    def add(self, purpose: str, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> None:
+        self.entries.append(UsageEntry(purpose, model, prompt_tokens, completion_tokens))
+
+    def for_purpose(self, purpose: str) -> List[UsageEntry]:
+        return [entry for entry in self.entries if entry.purpose == purpose]
+
+    @staticmethod
+    def summarize(entries: List[UsageEntry]) -> Dict[str, Any]:
+        """Totals for message/section metadata; the model is that of the last call (after any fallback)"""
+        return {
+            "model": entries[-1].model if entries else None,
+            "prompt_tokens": sum(e.prompt_tokens for e in entries),
+            "completion_tokens": sum(e.completion_tokens for e in entries),
+        }
+
+_recorder: ContextVar[Optional[UsageRecorder]] = ContextVar("usage_recorder", default=None)
+
+@contextmanager
+def capture_usage(recorder: Optional[UsageRecorder] = None) -> Iterator[UsageRecorder]:
+    """
+    Collect the usage of every completion made inside the block, including
+    from tasks it starts, into `recorder` (a new one by default). A call
+    shared through single-flight is recorded once, by the caller that started it.
+    """
+    recorder = recorder if recorder is not None else UsageRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        try:
+            _recorder.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned streaming generator)
+            pass
+
+def report_usage(purpose: str, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> None:
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(purpose, model, prompt_tokens, completion_tokens)
+
+class BudgetExceededError(Exception):
+    """Raised when not even a trimmed, downgraded turn fits in the remaining budget"""
+
+    def __init__(self, remaining: int):
+        super().__init__(f"Token budget exhausted ({max(remaining, 0)} tokens left)")
+        self.remaining = remaining
+
+@dataclass
+class TurnPlan:
+    max_tokens: int
+    # None: the service's usual model
+    model: Optional[str] = None
+    # None: the context assembler's configured budget
+    context_budget: Optional[int] = None
+
+    @property
+    def trimmed(self) -> bool:
+        return self.context_budget is not None
+
+    @property
+    def downgraded(self) -> bool:
+        return self.model is not None
+
+    def overrides(self, default_max_tokens: int) -> Dict[str, Any]:
+        """Keyword arguments for the OpenAIService call; empty when the turn runs as usual"""
+        overrides: Dict[str, Any] = {}
+        if self.model is not None:
+            overrides["model"] = self.model
+        if self.max_tokens != default_max_tokens:
+            overrides["max_tokens"] = self.max_tokens
+        return overrides
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trimmed": self.trimmed, "downgraded": self.downgraded, "max_tokens": self.max_tokens}
+
+@dataclass
+class TokenBudget:
+    """
+    Total-token budgets per session and across all sessions per UTC day
+    (0 = unlimited). A turn that would not fit first has its context trimmed,
+    keeping the full reply allowance; if even a `min_context_tokens` context
+    does not leave room for that, the reply is shortened and `downgrade_model`
+    used instead. Prompt sizes are estimates, so budgets can be overshot by a
+    little.
+    """
+    session_limit: int = 0
+    daily_limit: int = 0
+    downgrade_model: str = "gpt-3.5-turbo"
+    min_context_tokens: int = 1000
+    min_completion_tokens: int = 200
+
+    @property
+    def enabled(self) -> bool:
+        return self.session_limit > 0 or self.daily_limit > 0
+
+    def remaining(self, session_used: int, daily_used: int) -> Optional[int]:
+        """Tokens left for a turn, or None when no budget applies"""
+        limits = []
+        if self.session_limit > 0:
+            limits.append(self.session_limit - session_used)
+        if self.daily_limit > 0:
+            limits.append(self.daily_limit - daily_used)
+        return min(limits) if limits else None
+
+    def plan(self, remaining: Optional[int], prompt_tokens: int, max_tokens: int, trimmable: bool = True) -> TurnPlan:
+        """
+        Fit a turn of about `prompt_tokens` plus up to `max_tokens` of reply into
+        `remaining`. Pass trimmable=False when the prompt cannot be shortened.
+
+        Raises:
+            BudgetExceededError: Not even a minimal turn fits
+        """
+        if remaining is None or prompt_tokens + max_tokens <= remaining:
+            return TurnPlan(max_tokens)
+        if trimmable and remaining - max_tokens >= self.min_context_tokens:
+            return TurnPlan(max_tokens, context_budget=remaining - max_tokens)
+
+        prompt = min(prompt_tokens, self.min_context_tokens) if trimmable else prompt_tokens
+        completion = remaining - prompt
+        if completion < self.min_completion_tokens:
+            raise BudgetExceededError(remaining)
+        return TurnPlan(
+            min(completion, max_tokens),
+            model=self.downgrade_model,
+            context_budget=prompt if prompt < prompt_tokens else None
+        )
+
+def create_token_budget() -> TokenBudget:
+    """
+    Build the budget from TOKEN_BUDGET_PER_SESSION, TOKEN_BUDGET_DAILY,
+    TOKEN_BUDGET_DOWNGRADE_MODEL and TOKEN_BUDGET_MIN_CONTEXT_TOKENS.
+    """
+    return TokenBudget(
+        session_limit=int(os.getenv("TOKEN_BUDGET_PER_SESSION", "0")),
+        daily_limit=int(os.getenv("TOKEN_BUDGET_DAILY", "0")),
+        downgrade_model=os.getenv("TOKEN_BUDGET_DOWNGRADE_MODEL", "gpt-3.5-turbo"),
+        min_context_tokens=int(os.getenv("TOKEN_BUDGET_MIN_CONTEXT_TOKENS", "1000")),
+    )
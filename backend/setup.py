@@ -10,5 +10,25 @@ setup(
         "pydantic",
         "openai",
         "python-dotenv",
+        "sqlalchemy[asyncio]>=2.0",
+        "asyncpg",
+        "aiosqlite",
+        "opentelemetry-api",
     ],
+    extras_require={
+        # Share WebSocket events between uvicorn workers
+        "redis": ["redis>=5"],
+        # Exact token counts for the context budget (falls back to an estimate)
+        "tokenizer": ["tiktoken"],
+        # PDF export (txt and html work without it)
+        "pdf": ["weasyprint"],
+        # Brotli response compression (gzip works without it)
+        "brotli": ["brotli"],
+        # Faster JSON rendering for large message lists (stdlib json otherwise)
+        "orjson": ["orjson"],
+        # Prometheus metrics at /metrics (empty without it)
+        "metrics": ["prometheus_client"],
+        # Record and export trace spans (no-op spans without it)
+        "tracing": ["opentelemetry-sdk"],
+    },
 ) 
\ No newline at end of file
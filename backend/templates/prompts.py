@@ -43,3 +43,12 @@ PROMPT_TEMPLATES = {
         "{additional_info}"
     )
 }
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a financial newsletter writer. "
+    "Update the existing summary with the new messages below. Keep the newsletter topic, the thesis, "
+    "decisions and approvals, requested edits, and any agent outputs the user supplied (with key figures). "
+    "Drop pleasantries and superseded drafts. Reply with the updated summary only.\n\n"
+    "Existing summary:\n{previous_summary}\n\n"
+    "New messages:\n{messages}"
+)
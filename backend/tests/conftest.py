@@ -1,6 +1,17 @@
+import os
+import tempfile
 import pytest
+
+# Point the app at a throwaway SQLite database before it is imported
+TEST_DB_PATH = os.path.join(tempfile.gettempdir(), "newsletter_builder_test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TEST_DB_PATH}")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
 from fastapi.testclient import TestClient
-from app.main import app, get_openai_service
+from sqlalchemy import create_engine
+from app.main import app, get_openai_service, get_history_cache
+from app.database import Base, SQLALCHEMY_DATABASE_URL
+from services.session_state import InMemorySessionState
 from tests.mocks import MockOpenAIService
 
 @pytest.fixture
@@ -14,19 +25,27 @@ def mock_openai_service(monkeypatch):
     monkeypatch.setattr("app.main.get_openai_service", lambda: mock_service)
     return mock_service
 
+@pytest.fixture(autouse=True)
+def session_state(monkeypatch):
+    """Give every test an empty in-process session state store"""
+    state = InMemorySessionState()
+    monkeypatch.setattr("app.main.get_session_state", lambda: state)
+    return state
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    """Recreate all tables so every test starts from an empty database"""
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+    # Cached histories would outlive the rows they mirror
+    get_history_cache().clear()
+    yield
+    Base.metadata.drop_all(sync_engine)
+    sync_engine.dispose()
+
 @pytest.fixture
 def test_session(client):
     """Create a test session and return its ID"""
     response = client.post("/session/start")
     return response.json()["session_id"]
-
-@pytest.fixture(autouse=True)
-def setup_teardown():
-    # Setup - runs before each test
-    from app.main import sessions
-    sessions.clear()
-    
-    yield
-    
-    # Teardown - runs after each test
-    sessions.clear() 
\ No newline at end of file
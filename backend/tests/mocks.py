@@ -1,8 +1,106 @@
+import asyncio
+import json
+import httpx
+from openai import AsyncOpenAI
+
 class MockOpenAIService:
-    async def generate_response(self, system_prompt: str, context: dict) -> str:
+    async def generate_response(self, messages: list, context: dict = None) -> str:
         """Mock response generation"""
         return "This is a mock response from the AI assistant."
 
-    async def generate_section_content(self, section_type: str, context: dict) -> str:
+    async def generate_section_content(self, section_type: str, context: dict, use_cache: bool = True) -> str:
         """Mock section content generation"""
-        return f"Mock content for section type: {section_type}" 
\ No newline at end of file
+        return f"Mock content for section type: {section_type}" 
+
+    async def stream_response(self, messages: list, context: dict = None):
+        """Mock streaming generation"""
+        for chunk in ["This is ", "a mock ", "streamed response."]:
+            yield chunk
+
+    async def summarize_conversation(self, previous_summary: str, messages: list) -> str:
+        """Mock summarization"""
+        return f"Mock summary of {len(messages)} messages"
+
+class TrackedStream(httpx.AsyncByteStream):
+    """Response body that tells the server when the client closed it"""
+    def __init__(self, content: bytes, server: "FakeOpenAIServer"):
+        self.content = content
+        self.server = server
+
+    async def __aiter__(self):
+        yield self.content
+
+    async def aclose(self) -> None:
+        self.server.closed_streams += 1
+
+class FakeOpenAIServer:
+    """
+    In-process fake of the chat completions endpoint, served through
+    httpx.MockTransport. Replays scripted error responses (e.g. 429/5xx with
+    Retry-After headers), can fail specific models outright, and adds latency.
+    Streamed requests get the reply as one content chunk and a usage chunk;
+    `closed_streams` counts the streamed responses the client has closed.
+    """
+    def __init__(self, script=None, failing_models=None, latency: float = 0.0):
+        self.script = list(script or [])  # (status, headers) returned in order before succeeding
+        self.failing_models = dict(failing_models or {})  # model -> status it always returns
+        self.latency = latency
+        self.requested_models = []
+        self.inflight = 0
+        self.max_inflight = 0
+        self.closed_streams = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        model = body["model"]
+        self.requested_models.append(model)
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(self.latency)
+            if model in self.failing_models:
+                return self.error(self.failing_models[model])
+            if self.script:
+                status, headers = self.script.pop(0)
+                return self.error(status, headers)
+            if body.get("stream"):
+                return self.stream(model)
+            return httpx.Response(200, json={
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f"Reply from {model}"},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+            })
+        finally:
+            self.inflight -= 1
+
+    def stream(self, model: str) -> httpx.Response:
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model}
+        chunks = [
+            {**base, "choices": [{"index": 0, "delta": {"content": f"Reply from {model}"}, "finish_reason": "stop"}]},
+            {**base, "choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}},
+        ]
+        content = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, stream=TrackedStream(content.encode(), self)
+        )
+
+    @staticmethod
+    def error(status: int, headers: dict = None) -> httpx.Response:
+        return httpx.Response(status, headers=headers or {}, json={
+            "error": {"message": f"Injected {status}", "type": "server_error", "code": None}
+        })
+
+    def client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="test-key",
+            base_url="https://fake-openai.test/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)),
+        )
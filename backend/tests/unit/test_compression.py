@@ -0,0 +1,175 @@
+import gzip
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.compression import CompressionMiddleware, accepted_encodings
+from app.database import SQLALCHEMY_DATABASE_URL
+from tests.unit.test_message_transaction import count_round_trips
+
+BODY = "Rates are turning and spreads are tightening. " * 200
+
+@pytest.fixture
+def compressed_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BODY[:1000], BODY[1000:]]), media_type="text/plain")
+
+    @app.get("/report.pdf")
+    def report():
+        return Response(BODY.encode(), media_type="application/pdf")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(gzip.compress(BODY.encode()), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([f"data: {BODY}\n\n"]), media_type="text/event-stream")
+
+    return TestClient(app)
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.8") == {"gzip"}
+    assert accepted_encodings("") == set()
+
+class TestCompressionMiddleware:
+    def test_brotli_preferred(self, compressed_client):
+        pytest.importorskip("brotli")
+        response = compressed_client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["vary"] == "Accept-Encoding"
+        # httpx only decodes br when a brotli package is importable
+        assert response.text == BODY
+        assert int(response.headers["content-length"]) < len(BODY) / 10
+
+    def test_gzip(self, compressed_client):
+        response = compressed_client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == BODY
+
+    def test_brotli_refused(self, compressed_client):
+        response = compressed_client.get("/large", headers={"Accept-Encoding": "br;q=0, gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+
+    def test_below_threshold_is_sent_as_is(self, compressed_client):
+        response = compressed_client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+
+    def test_identity(self, compressed_client):
+        response = compressed_client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.text == BODY
+
+    def test_event_streams_are_not_compressed(self, compressed_client):
+        response = compressed_client.get("/events", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+
+    def test_streamed_body(self, compressed_client):
+        response = compressed_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.text == BODY
+
+    def test_compressed_media_is_sent_as_is(self, compressed_client):
+        response = compressed_client.get("/report.pdf", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+        assert response.content == BODY.encode()
+
+    def test_encoded_responses_are_not_compressed_twice(self, compressed_client):
+        response = compressed_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == BODY
+
+@pytest.fixture
+def large_session():
+    """A session with 200 long, pasted-output style messages"""
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    db = sessionmaker(bind=sync_engine)()
+    base = datetime(2025, 1, 1)
+    db.add(models.DBSession(id="session-1", created_at=base))
+    for i in range(200):
+        db.add(models.DBMessage(
+            id=f"m-{i:03d}",
+            session_id="session-1",
+            speaker="user" if i % 2 == 0 else "assistant",
+            content=f"Agent output {i}: " + "10y yield 4.{0}%, 2s10s spread {0}bp, CPI print 3.{0}%\n".format(i % 10) * 40,
+            timestamp=base + timedelta(minutes=i)
+        ))
+    db.commit()
+    db.close()
+    sync_engine.dispose()
+    return "session-1"
+
+class TestSessionConditionalGet:
+    def test_large_session_is_compressed(self, client, large_session):
+        plain = client.get(f"/session/{large_session}", headers={"Accept-Encoding": "identity"})
+        compressed = client.get(f"/session/{large_session}", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.json() == plain.json()
+        assert int(compressed.headers["content-length"]) * 10 < int(plain.headers["content-length"])
+
+    def test_not_modified_skips_loading_messages(self, client, large_session):
+        response = client.get(f"/session/{large_session}")
+        etag = response.headers["etag"]
+        assert not etag.startswith("W/")
+
+        with count_round_trips() as recorded:
+            response = client.get(f"/session/{large_session}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        # Only the session/last-modified lookup, never the messages themselves
+        assert recorded["statements"] == ["SELECT"]
+
+    def test_etag_changes_with_messages(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        empty = client.get(f"/session/{session_id}").headers["etag"]
+
+        reply = client.post("/message", json={
+            "session_id": session_id,
+            "speaker": "user",
+            "content": "Hello",
+            "timestamp": datetime.now().isoformat()
+        }).json()
+        after_message = client.get(f"/session/{session_id}").headers["etag"]
+        assert after_message != empty
+
+        client.patch(f"/message/{reply['id']}", json={"pinned": True})
+        response = client.get(f"/session/{session_id}", headers={"If-None-Match": after_message})
+        assert response.status_code == 200
+        assert response.json()["messages"][-1]["pinned"] is True
+
+    def test_etag_depends_on_the_page(self, client, large_session):
+        full = client.get(f"/session/{large_session}").headers["etag"]
+        page = client.get(f"/session/{large_session}", params={"limit": 10})
+        assert page.headers["etag"] != full
+        response = client.get(f"/session/{large_session}", params={"limit": 10}, headers={"If-None-Match": page.headers["etag"]})
+        assert response.status_code == 304
+
+class TestSessionsConditionalGet:
+    def test_not_modified_until_the_list_changes(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        etag = client.get("/sessions").headers["etag"]
+        assert client.get("/sessions", headers={"If-None-Match": etag}).status_code == 304
+
+        client.patch(f"/session/{session_id}", json={"title": "Rates"})
+        response = client.get("/sessions", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["sessions"][0]["title"] == "Rates"
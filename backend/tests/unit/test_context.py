@@ -0,0 +1,85 @@
+from datetime import datetime
+from services.context import ContextAssembler, MESSAGE_TOKEN_OVERHEAD, approximate_token_count
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+def turn(content, role="user", pinned=False):
+    return {"role": role, "content": content, "pinned": pinned}
+
+def make_assembler(budget, min_recent_messages=2, system_prompt="system prompt"):
+    return ContextAssembler(
+        budget=budget,
+        min_recent_messages=min_recent_messages,
+        system_prompt=system_prompt,
+        count_tokens=count_words,
+    )
+
+class TestContextAssembler:
+    def test_keeps_everything_within_budget(self):
+        history = [turn(f"message number {i}") for i in range(5)]
+        window = make_assembler(budget=1000).assemble(history)
+        assert window.messages == [{"role": "user", "content": m["content"]} for m in history]
+        assert window.metrics.messages_dropped == 0
+        assert window.metrics.tokens_dropped == 0
+        assert window.metrics.tokens_kept == 2 + 5 * (3 + MESSAGE_TOKEN_OVERHEAD) + MESSAGE_TOKEN_OVERHEAD
+
+    def test_drops_oldest_turns_and_elides_them(self):
+        history = [turn(f"message number {i}") for i in range(10)]
+        window = make_assembler(budget=40).assemble(history)
+        contents = [m["content"] for m in window.messages]
+        assert contents[0].startswith("[")
+        assert contents[-2:] == ["message number 8", "message number 9"]
+        assert window.metrics.messages_dropped + window.metrics.messages_kept == 10
+        assert window.metrics.messages_dropped > 0
+        assert window.metrics.tokens_kept <= 40
+        assert window.metrics.tokens_dropped == window.metrics.messages_dropped * (3 + MESSAGE_TOKEN_OVERHEAD)
+
+    def test_pinned_messages_survive(self):
+        history = [turn("approved thesis statement", role="assistant", pinned=True)]
+        history += [turn(f"message number {i}") for i in range(10)]
+        window = make_assembler(budget=40).assemble(history)
+        assert window.messages[0] == {"role": "assistant", "content": "approved thesis statement"}
+        assert window.messages[1]["role"] == "system"
+
+    def test_recent_messages_kept_even_over_budget(self):
+        history = [turn("word " * 50), turn("word " * 50)]
+        window = make_assembler(budget=10).assemble(history)
+        assert len(window.messages) == 2
+        assert window.metrics.over_budget is True
+
+    def test_output_has_only_role_and_content(self):
+        window = make_assembler(budget=100).assemble([turn("hi", pinned=True)])
+        assert window.messages == [{"role": "user", "content": "hi"}]
+
+def test_approximate_token_count():
+    assert approximate_token_count("") == 0
+    assert approximate_token_count("abcd") == 1
+    assert approximate_token_count("abcde") == 2
+
+class TestContextMetricsInResponses:
+    def test_reply_reports_context_metrics(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/message", json={
+            "session_id": session_id,
+            "speaker": "user",
+            "content": "Hello",
+            "timestamp": datetime.now().isoformat()
+        })
+        metrics = response.json()["metadata"]["context"]
+        assert metrics["messages_kept"] == 1
+        assert metrics["messages_dropped"] == 0
+        assert metrics["tokens_kept"] > 0
+
+    def test_pin_message(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        reply = client.post("/message", json={
+            "session_id": session_id,
+            "speaker": "user",
+            "content": "Write the thesis",
+            "timestamp": datetime.now().isoformat()
+        }).json()
+        response = client.patch(f"/message/{reply['id']}", json={"pinned": True})
+        assert response.status_code == 200
+        assert response.json()["pinned"] is True
+        assert client.patch("/message/nonexistent", json={"pinned": True}).status_code == 404
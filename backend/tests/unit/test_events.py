@@ -0,0 +1,166 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+from app.events import (
+    DeltaPublisher, EventBackend, EventHub, InProcessEventBackend, RedisEventBackend, create_event_backend,
+    MESSAGE_CREATED, GENERATION_PROGRESS
+)
+
+async def wait_for_log(caplog, text, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if text in caplog.text:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{text!r} was never logged")
+
+class TestEventHub:
+    async def test_publish_reaches_session_subscribers_only(self):
+        hub = EventHub(InProcessEventBackend())
+        async with hub.subscribe("a") as queue_a, hub.subscribe("b") as queue_b:
+            await hub.publish("a", MESSAGE_CREATED, {"id": "1"})
+            event = json.loads(queue_a.get_nowait())
+            assert event["type"] == MESSAGE_CREATED
+            assert event["session_id"] == "a"
+            assert event["data"] == {"id": "1"}
+            assert queue_b.empty()
+
+    async def test_unsubscribe_on_exit(self):
+        hub = EventHub(InProcessEventBackend())
+        async with hub.subscribe("a"):
+            pass
+        assert hub._subscribers == {}
+
+    async def test_slow_consumer_drops_oldest(self):
+        hub = EventHub(InProcessEventBackend(), queue_size=2)
+        async with hub.subscribe("a") as queue:
+            for i in range(3):
+                await hub.publish("a", GENERATION_PROGRESS, {"n": i})
+            assert [json.loads(queue.get_nowait())["data"]["n"] for _ in range(2)] == [1, 2]
+
+    async def test_redis_backend_shares_events_between_hubs(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        publisher = EventHub(RedisEventBackend(client=fakeredis.FakeAsyncRedis(server=server)))
+        subscriber = EventHub(RedisEventBackend(client=fakeredis.FakeAsyncRedis(server=server)))
+        try:
+            async with subscriber.subscribe("a") as queue:
+                await publisher.publish("a", MESSAGE_CREATED, {"id": "1"})
+                event = json.loads(await asyncio.wait_for(queue.get(), timeout=2))
+                assert event["data"] == {"id": "1"}
+        finally:
+            await publisher.stop()
+            await subscriber.stop()
+
+    async def test_redis_subscription_reconnects(self, caplog):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        publisher = EventHub(RedisEventBackend(client=fakeredis.FakeAsyncRedis(server=server)))
+        subscriber = EventHub(RedisEventBackend(client=fakeredis.FakeAsyncRedis(server=server), base_delay=0.01))
+        try:
+            async with subscriber.subscribe("a") as queue:
+                server.connected = False
+                await wait_for_log(caplog, "Redis event subscription lost")
+                server.connected = True
+                await wait_for_log(caplog, "Redis event subscription restored")
+                await publisher.publish("a", MESSAGE_CREATED, {"id": "1"})
+                event = json.loads(await asyncio.wait_for(queue.get(), timeout=2))
+                assert event["data"] == {"id": "1"}
+        finally:
+            await publisher.stop()
+            await subscriber.stop()
+
+    def test_backends_must_implement_publish(self):
+        class Incomplete(EventBackend):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+class SlowBackend(InProcessEventBackend):
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+
+    async def publish(self, channel: str, payload: str) -> None:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("backend down")
+        await super().publish(channel, payload)
+
+def streamed(queue):
+    events = []
+    while not queue.empty():
+        events.append(json.loads(queue.get_nowait())["data"])
+    return [event["content"] for event in events if event["status"] == "streaming"]
+
+class TestDeltaPublisher:
+    async def test_deltas_are_coalesced(self):
+        hub = EventHub(InProcessEventBackend())
+        async with hub.subscribe("a") as queue:
+            progress = DeltaPublisher(hub, "a", interval=60)
+            for delta in ("Rates ", "are ", "turning"):
+                progress.add(delta)
+            assert queue.empty()
+            await progress.close()
+            assert streamed(queue) == ["Rates are turning"]
+
+    async def test_slow_backend_keeps_order_without_blocking(self):
+        hub = EventHub(SlowBackend(delay=0.01))
+        async with hub.subscribe("a") as queue:
+            progress = DeltaPublisher(hub, "a", interval=0, max_pending=2)
+            for i in range(10):
+                progress.add(f"{i} ")
+            assert queue.empty()
+            await progress.close()
+            assert "".join(streamed(queue)) == "".join(f"{i} " for i in range(10))
+
+    async def test_backend_failures_are_logged(self, caplog):
+        hub = EventHub(SlowBackend(fail=True))
+        progress = DeltaPublisher(hub, "a", interval=0)
+        progress.add("Rates")
+        await progress.close()
+        assert "Error publishing generation.progress" in caplog.text
+
+class TestEventBackendConfig:
+    def test_default_is_in_process(self):
+        assert isinstance(create_event_backend(""), InProcessEventBackend)
+
+    def test_redis_url(self):
+        pytest.importorskip("redis")
+        assert isinstance(create_event_backend("redis://localhost:6379/0"), RedisEventBackend)
+
+    def test_unknown_url(self):
+        with pytest.raises(ValueError):
+            create_event_backend("kafka://localhost")
+
+class TestSessionWebSocket:
+    def test_pushes_message_and_progress_events(self):
+        with TestClient(app) as client:
+            session_id = client.post("/session").json()["session_id"]
+            with client.websocket_connect(f"/ws/session/{session_id}") as websocket:
+                response = client.post("/message", json={
+                    "session_id": session_id,
+                    "speaker": "user",
+                    "content": "Hello",
+                    "timestamp": datetime.now().isoformat()
+                })
+                assert response.status_code == 200
+                events = [json.loads(websocket.receive_text()) for _ in range(4)]
+
+        assert [(e["type"], e["data"].get("speaker") or e["data"].get("status")) for e in events] == [
+            (MESSAGE_CREATED, "user"),
+            (GENERATION_PROGRESS, "started"),
+            (MESSAGE_CREATED, "assistant"),
+            (GENERATION_PROGRESS, "completed"),
+        ]
+        assert events[2]["data"]["id"] == response.json()["id"]
+
+    def test_unknown_session_is_rejected(self):
+        with TestClient(app) as client:
+            with pytest.raises(WebSocketDisconnect):
+                with client.websocket_connect("/ws/session/nonexistent") as websocket:
+                    websocket.receive_text()
@@ -0,0 +1,133 @@
+import asyncio
+import importlib.util
+import pytest
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from services.export import (
+    ExportService, ExportQueueFullError, ExportUnavailableError, render_html, text_to_html
+)
+from tests.unit.test_finalize import approve
+
+DOCUMENT = {
+    "etag": '"abc123"',
+    "subject": "Rates & You",
+    "preview_text": "Why the pivot matters",
+    "header_banner": {"image": "header_banner.png", "content": "Rates are turning"},
+    "stories": [{"section_type": "introduction", "version": 1, "content": "Lead\n- Yields fell [Image: image7.png]\n- <b>Spreads</b>"}],
+    "conclusion": "Wrap up",
+    "missing_sections": [],
+    "content": "Subject: Rates & You\n\nLead",
+}
+
+class GateExecutor(Executor):
+    """Holds submitted work until released, to keep renders in flight"""
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.jobs.append((future, fn, args))
+        return future
+
+    def release(self):
+        for future, fn, args in self.jobs:
+            future.set_result(fn(*args))
+        self.jobs.clear()
+
+class TestRenderHtml:
+    def test_template(self):
+        page = render_html(DOCUMENT)
+        assert "<title>Rates &amp; You</title>" in page
+        assert "<li>Yields fell <img class=\"image\" src=\"image7.png\" alt=\"image7.png\"></li>" in page
+        assert "&lt;b&gt;Spreads&lt;/b&gt;" in page
+        assert '<img src="header_banner.png" alt="Header banner">' in page
+
+    def test_image_marker_cannot_inject_attributes(self):
+        page = text_to_html('Chart [Image: x" onerror="alert(1)]')
+        assert "<img" not in page
+        assert page == '<p>Chart [Image: x" onerror="alert(1)]</p>'
+
+class TestExportService:
+    async def test_renders_in_process_pool_and_caches_on_disk(self, tmp_path):
+        service = ExportService(str(tmp_path), max_workers=1)
+        try:
+            path = await service.export(DOCUMENT, "txt")
+            assert path == tmp_path / "abc123.txt"
+            assert path.read_text() == DOCUMENT["content"]
+
+            assert await service.export(DOCUMENT, "txt") == path
+            assert service.renders == 1
+            assert service.hits == 1
+            assert not list(tmp_path.glob("*.part"))
+        finally:
+            service.shutdown()
+
+    async def test_concurrent_requests_share_one_render(self, tmp_path):
+        gate = GateExecutor()
+        service = ExportService(str(tmp_path), executor_factory=lambda workers: gate)
+
+        waiters = [asyncio.create_task(service.export(DOCUMENT, "html")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert len(gate.jobs) == 1
+        gate.release()
+        paths = await asyncio.gather(*waiters)
+        assert len(set(paths)) == 1
+        assert service.renders == 1
+
+    async def test_queue_is_bounded(self, tmp_path):
+        gate = GateExecutor()
+        service = ExportService(str(tmp_path), max_workers=1, max_queue=1, executor_factory=lambda workers: gate)
+
+        running = [
+            asyncio.create_task(service.export({**DOCUMENT, "etag": f'"doc{i}"'}, "txt")) for i in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExportQueueFullError):
+            await service.export({**DOCUMENT, "etag": '"doc2"'}, "txt")
+        assert service.rejected == 1
+
+        gate.release()
+        await asyncio.gather(*running)
+        assert service.pending == 0
+
+    async def test_pdf_requires_weasyprint(self, tmp_path):
+        if importlib.util.find_spec("weasyprint"):
+            pytest.skip("WeasyPrint is installed")
+        service = ExportService(str(tmp_path), executor_factory=lambda workers: ThreadPoolExecutor(workers))
+        with pytest.raises(ExportUnavailableError):
+            await service.export(DOCUMENT, "pdf")
+        assert not list(tmp_path.iterdir())
+        service.shutdown()
+
+@pytest.fixture
+def export_service(tmp_path, monkeypatch):
+    service = ExportService(str(tmp_path), executor_factory=lambda workers: ThreadPoolExecutor(workers))
+    monkeypatch.setattr("app.main.get_export_service", lambda: service)
+    yield service
+    service.shutdown()
+
+class TestExportEndpoint:
+    def test_download_streams_cached_file(self, client, export_service):
+        session_id = client.post("/session").json()["session_id"]
+        approve(client, session_id, "thesis")
+
+        response = client.get(f"/session/{session_id}/export/html")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        assert "attachment" in response.headers["content-disposition"]
+        assert "<title>Mock content for section type: thesis_overview</title>" in response.text
+
+        etag = response.headers["etag"]
+        assert client.get(f"/session/{session_id}/export/html").text == response.text
+        assert export_service.renders == 1
+        assert export_service.hits == 1
+
+        response = client.get(f"/session/{session_id}/export/html", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_unsupported_format(self, client, export_service):
+        session_id = client.post("/session").json()["session_id"]
+        assert client.get(f"/session/{session_id}/export/docx").status_code == 400
+
+    def test_nothing_to_export(self, client, export_service):
+        session_id = client.post("/session").json()["session_id"]
+        assert client.get(f"/session/{session_id}/export/txt").status_code == 409
@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+from services.assembly import NewsletterAssembler, render_fragment, compute_etag
+from services.cache import LRUTTLCache
+
+THESIS = (
+    "Rates Are Turning: What It Means for Your Portfolio\n"
+    "- Introduction\n- Trades\n\n"
+    "Are there any edits you'd like or can we continue to the next section (Intro)?"
+)
+INTRO = (
+    "***Intro Section***\n"
+    "Why the Fed pivot matters\n"
+    "- Yields fell sharply this week (see image7.png)\n\n\n\n"
+    "Are there any edits you'd like or can we continue to the next section?"
+)
+
+def section(section_type, content, version=1):
+    return SimpleNamespace(section_type=section_type, content=content, version=version)
+
+def make_assembler():
+    return NewsletterAssembler(fragments=LRUTTLCache(), documents=LRUTTLCache())
+
+class TestRenderFragment:
+    def test_strips_scaffolding_and_marks_images(self):
+        rendered = render_fragment(INTRO)
+        assert "Are there any edits" not in rendered
+        assert "***" not in rendered
+        assert "[Image: image7.png]" in rendered
+        assert "\n\n\n" not in rendered
+
+    def test_existing_markers_are_kept(self):
+        assert render_fragment("Chart: [Image: chart.png]") == "Chart: [Image: chart.png]"
+
+class TestNewsletterAssembler:
+    def test_assembles_template(self):
+        document = make_assembler().assemble("s1", None, [
+            section("thesis_overview", THESIS),
+            section("conclusion", "Wrap up"),
+            section("introduction", INTRO),
+        ])
+        assert document["subject"] == "Rates Are Turning: What It Means for Your Portfolio"
+        assert document["preview_text"] == "Why the Fed pivot matters"
+        assert document["header_banner"]["image"] == "header_banner.png"
+        assert [s["section_type"] for s in document["stories"]] == ["introduction"]
+        assert document["conclusion"] == "Wrap up"
+        assert document["missing_sections"] == ["body_section", "actionable_trades"]
+        assert document["content"].startswith("Subject: Rates Are Turning")
+
+    def test_only_changed_fragment_is_rerendered(self):
+        assembler = make_assembler()
+        sections = [section("thesis_overview", THESIS), section("introduction", INTRO), section("conclusion", "Wrap up")]
+        first = assembler.assemble("s1", None, sections)
+        assert assembler.renders == 3
+
+        sections[2] = section("conclusion", "Wrap up, revised", version=2)
+        second = assembler.assemble("s1", None, sections)
+        assert assembler.renders == 4
+        assert second["etag"] != first["etag"]
+        assert second["conclusion"] == "Wrap up, revised"
+
+    def test_unchanged_document_served_from_cache(self):
+        assembler = make_assembler()
+        sections = [section("thesis_overview", THESIS)]
+        first = assembler.assemble("s1", None, sections)
+        assert assembler.assemble("s1", None, sections) is first
+        assert assembler.documents.hits == 1
+
+    def test_etag_depends_on_content_version_and_title(self):
+        base = compute_etag("Title", [section("conclusion", "a")])
+        assert compute_etag("Title", [section("conclusion", "a")]) == base
+        assert compute_etag("Title", [section("conclusion", "b")]) != base
+        assert compute_etag("Title", [section("conclusion", "a", version=2)]) != base
+        assert compute_etag("Other", [section("conclusion", "a")]) != base
+
+def approve(client, session_id, section_type):
+    client.post("/generate/section", json={
+        "session_id": session_id,
+        "section_type": section_type,
+        "context": {"topic": "Rates", "additional_info": ""}
+    })
+    stored_type = "thesis_overview" if section_type == "thesis" else section_type
+    client.patch(f"/session/{session_id}/sections/{stored_type}", json={"state": "approved"})
+
+class TestFinalizeEndpoint:
+    def test_finalize_approved_sections(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        approve(client, session_id, "thesis")
+        approve(client, session_id, "introduction")
+        # Generated but not approved: left out
+        client.post("/generate/section", json={
+            "session_id": session_id, "section_type": "conclusion", "context": {"topic": "Rates"}
+        })
+
+        response = client.post("/finalize", json={"session_id": session_id})
+        assert response.status_code == 200
+        document = response.json()
+        assert response.headers["etag"] == document["etag"]
+        assert document["subject"] == "Mock content for section type: thesis_overview"
+        assert [s["section_type"] for s in document["stories"]] == ["introduction"]
+        assert "conclusion" in document["missing_sections"]
+
+    def test_if_none_match_returns_304(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        approve(client, session_id, "thesis")
+        etag = client.post("/finalize", json={"session_id": session_id}).headers["etag"]
+
+        response = client.post("/finalize", json={"session_id": session_id}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+        # Approving another section changes the newsletter
+        approve(client, session_id, "conclusion")
+        response = client.post("/finalize", json={"session_id": session_id}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_nothing_approved(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        assert client.post("/finalize", json={"session_id": session_id}).status_code == 409
+
+    def test_unknown_session(self, client):
+        assert client.post("/finalize", json={"session_id": "missing"}).status_code == 404
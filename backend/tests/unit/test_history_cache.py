@@ -0,0 +1,160 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app.events import EventHub, InProcessEventBackend, RedisEventBackend
+from app.main import get_history_cache
+from services.history_cache import CachedHistory, HistoryCache
+
+def history(*contents, summary=None):
+    return CachedHistory(summary, [("user", content, False) for content in contents])
+
+class TestHistoryCache:
+    def test_hit_and_miss_counters(self):
+        cache = HistoryCache()
+        assert cache.get("a") is None
+        cache.set("a", history("hi"), cache.load_token())
+        assert cache.get("a").messages == [("user", "hi", False)]
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["messages"] == 1
+        assert stats["bytes"] > 0
+
+    def test_entries_are_compact(self):
+        entry = history("hi")
+        assert not hasattr(entry, "__dict__")
+        assert isinstance(entry.messages[0], tuple)
+
+    def test_lru_eviction_by_count(self):
+        cache = HistoryCache(max_sessions=2)
+        for session_id in ("a", "b"):
+            cache.set(session_id, history("hi"), cache.load_token())
+        cache.get("a")
+        cache.set("c", history("hi"), cache.load_token())
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.evictions == 1
+
+    def test_eviction_by_bytes(self):
+        entry_size = history("x" * 1000).size
+        cache = HistoryCache(max_bytes=entry_size * 2)
+        for session_id in ("a", "b", "c"):
+            cache.set(session_id, history("x" * 1000), cache.load_token())
+        assert len(cache) == 2
+        assert cache.bytes <= entry_size * 2
+
+    async def test_append_is_write_through(self):
+        cache = HistoryCache()
+        cache.set("a", history("hi"), cache.load_token())
+        before = cache.bytes
+        await cache.append("a", [("assistant", "hello", False)])
+        assert cache.get("a").messages[-1] == ("assistant", "hello", False)
+        assert cache.bytes > before
+
+    async def test_invalidate(self):
+        cache = HistoryCache()
+        cache.set("a", history("hi"), cache.load_token())
+        await cache.invalidate("a")
+        assert cache.get("a") is None
+        assert cache.bytes == 0
+        assert cache.invalidations == 1
+
+    async def test_stale_load_is_discarded(self):
+        cache = HistoryCache()
+        token = cache.load_token()
+        # A message is committed while the history was being read
+        await cache.append("a", [("user", "new", False)])
+        cache.set("a", history("old"), token)
+        assert cache.get("a") is None
+
+    async def test_writes_to_other_sessions_keep_the_load(self):
+        cache = HistoryCache()
+        token = cache.load_token()
+        await cache.append("a", [("user", "new", False)])
+        await cache.invalidate("a")
+        cache.set("b", history("hi"), token)
+        assert cache.get("b") is not None
+
+    async def test_forgotten_writes_still_discard_older_loads(self):
+        cache = HistoryCache(max_sessions=2)
+        token = cache.load_token()
+        for session_id in ("a", "b", "c"):
+            await cache.invalidate(session_id)
+        # "a" is no longer tracked, but its write happened after the load began
+        cache.set("a", history("old"), token)
+        assert cache.get("a") is None
+        cache.set("a", history("new"), cache.load_token())
+        assert cache.get("a") is not None
+
+    async def test_own_broadcasts_are_ignored(self):
+        hub = EventHub(InProcessEventBackend())
+        cache = HistoryCache(hub=hub)
+        cache.set("a", history("hi"), cache.load_token())
+        await cache.append("a", [("assistant", "hello", False)])
+        assert len(cache.get("a").messages) == 2
+
+    async def test_invalidation_across_workers(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        hubs = [EventHub(RedisEventBackend(client=fakeredis.FakeAsyncRedis(server=server))) for _ in range(2)]
+        writer, reader = HistoryCache(hub=hubs[0]), HistoryCache(hub=hubs[1])
+        try:
+            for hub in hubs:
+                await hub.start()
+            for cache in (writer, reader):
+                cache.set("a", history("hi"), cache.load_token())
+
+            await writer.append("a", [("assistant", "hello", False)])
+            for _ in range(100):
+                if reader.get("a") is None:
+                    break
+                await asyncio.sleep(0.01)
+            assert reader.get("a") is None
+            assert len(writer.get("a").messages) == 2
+        finally:
+            for hub in hubs:
+                await hub.stop()
+
+def send(client, session_id, content):
+    return client.post("/message", json={
+        "session_id": session_id,
+        "speaker": "user",
+        "content": content,
+        "timestamp": datetime.now().isoformat()
+    })
+
+class TestHistoryCacheInApp:
+    def test_turns_are_written_through(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        send(client, session_id, "First")
+        send(client, session_id, "Second")
+
+        cached = get_history_cache().get(session_id)
+        assert [content for _, content, _ in cached.messages] == [
+            "First", "This is a mock response from the AI assistant.",
+            "Second", "This is a mock response from the AI assistant."
+        ]
+
+    def test_pin_invalidates(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        reply = send(client, session_id, "First").json()
+        client.patch(f"/message/{reply['id']}", json={"pinned": True})
+        assert get_history_cache().get(session_id) is None
+
+    def test_delete_and_update_invalidate(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        send(client, session_id, "First")
+        client.patch(f"/session/{session_id}", json={"title": "Rates"})
+        assert get_history_cache().get(session_id) is None
+
+        send(client, session_id, "Second")
+        client.delete(f"/session/{session_id}")
+        assert get_history_cache().get(session_id) is None
+        assert send(client, session_id, "Third").status_code == 404
+
+    def test_second_turn_is_a_hit(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        send(client, session_id, "First")
+        cache = get_history_cache()
+        hits, misses = cache.hits, cache.misses
+        send(client, session_id, "Second")
+        assert (cache.hits, cache.misses) == (hits + 1, misses)
@@ -0,0 +1,95 @@
+import io
+import json
+import logging
+import queue
+import sys
+import pytest
+from app import logging_config
+from app.logging_config import (
+    JSONFormatter, LoggingSettings, NonBlockingQueueHandler, PayloadSampler,
+    configure_logging, payload_preview, stop_logging
+)
+
+class Tracked:
+    """Counts how often it is rendered"""
+    renders = 0
+
+    def __repr__(self):
+        Tracked.renders += 1
+        return "tracked"
+
+def make_record(msg="hello %s", args=("world",), level=logging.DEBUG, **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+class TestPayloadPreview:
+    def test_truncates(self):
+        text = str(payload_preview("x" * 50, max_chars=10))
+        assert text == "x" * 10 + "... (40 more chars)"
+
+    def test_renders_json(self):
+        assert str(payload_preview([{"role": "user", "content": "Hi"}])) == '[{"role": "user", "content": "Hi"}]'
+
+    def test_not_rendered_when_level_disabled(self):
+        logger = logging.getLogger("test.lazy")
+        logger.setLevel(logging.INFO)
+        Tracked.renders = 0
+        logger.debug("payload %s", payload_preview(Tracked()))
+        assert Tracked.renders == 0
+
+class TestPayloadSampler:
+    def test_samples_only_debug_payloads(self):
+        sampler = PayloadSampler(rate=0.0)
+        assert not sampler.filter(make_record(args=(payload_preview("big"),)))
+        assert sampler.filter(make_record())
+        assert sampler.filter(make_record(args=(payload_preview("big"),), level=logging.INFO))
+
+    def test_rate(self):
+        draws = iter([0.05, 0.5])
+        sampler = PayloadSampler(rate=0.1, rand=lambda: next(draws))
+        record = make_record(args=(payload_preview("big"),))
+        assert sampler.filter(record)
+        assert not sampler.filter(record)
+
+class TestJSONFormatter:
+    def test_fields(self):
+        entry = json.loads(JSONFormatter().format(make_record(level=logging.INFO, session_id="s-1")))
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "test"
+        assert entry["message"] == "hello world"
+        assert entry["session_id"] == "s-1"
+
+    def test_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+        entry = json.loads(JSONFormatter().format(record))
+        assert "ValueError: boom" in entry["exception"]
+
+class TestNonBlockingQueueHandler:
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(make_record())
+        handler.handle(make_record())
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().getMessage() == "hello world"
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    configure_logging(LoggingSettings(level="DEBUG", debug_sample_rate=1.0, payload_max_chars=20), stream=stream)
+    yield stream
+    stop_logging()
+    configure_logging()
+
+def test_records_are_written_as_json_by_the_listener(log_stream):
+    logger = logging.getLogger("test.configured")
+    logger.debug("Sending %s", payload_preview("y" * 100), extra={"session_id": "s-1"})
+    stop_logging()
+
+    entry = json.loads(log_stream.getvalue().splitlines()[-1])
+    assert entry["message"] == "Sending " + "y" * 20 + "... (80 more chars)"
+    assert entry["session_id"] == "s-1"
+    assert logging_config.logging_stats() == {"queued": 0, "dropped": 0}
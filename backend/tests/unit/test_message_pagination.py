@@ -0,0 +1,107 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.pagination import encode_cursor
+
+@pytest.fixture
+def seeded_messages():
+    """One session with 10 messages; messages 4 and 5 share a timestamp to exercise the id tie-break"""
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    db = sessionmaker(bind=sync_engine)()
+    base = datetime(2025, 1, 1)
+    db.add(models.DBSession(id="session-1", created_at=base))
+    for i in range(10):
+        db.add(models.DBMessage(
+            id=f"m-{i}",
+            session_id="session-1",
+            speaker="user",
+            content=f"message {i}",
+            timestamp=base + timedelta(minutes=4 if i == 5 else i)
+        ))
+    db.commit()
+    db.close()
+    sync_engine.dispose()
+    return [f"m-{i}" for i in range(10)]
+
+def ids(body):
+    return [m["id"] for m in body["messages"]]
+
+class TestGetSessionPaging:
+    def test_without_parameters_returns_everything_in_order(self, client, seeded_messages):
+        body = client.get("/session/session-1").json()
+        assert ids(body) == seeded_messages
+        assert body["has_more"] is False
+        assert body["next_cursor"] is not None
+
+    def test_limit_returns_newest_oldest_first(self, client, seeded_messages):
+        body = client.get("/session/session-1", params={"limit": 3}).json()
+        assert ids(body) == ["m-7", "m-8", "m-9"]
+        assert body["has_more"] is True
+
+    def test_paging_back_with_before(self, client, seeded_messages):
+        seen = []
+        params = {"limit": 3}
+        while True:
+            body = client.get("/session/session-1", params=params).json()
+            seen = ids(body) + seen
+            if not body["has_more"]:
+                break
+            params = {"limit": 3, "before": body["prev_cursor"]}
+        assert seen == seeded_messages
+
+    def test_since_returns_only_newer(self, client, seeded_messages):
+        cursor = client.get("/session/session-1", params={"limit": 6}).json()["prev_cursor"]
+        body = client.get("/session/session-1", params={"since": cursor, "limit": 3}).json()
+        # m-5 shares m-4's timestamp and is still included
+        assert ids(body) == ["m-5", "m-6", "m-7"]
+        assert body["has_more"] is True
+
+    def test_before_and_since_together(self, client, seeded_messages):
+        cursor = encode_cursor(datetime(2025, 1, 1), "m-0")
+        response = client.get("/session/session-1", params={"before": cursor, "since": cursor})
+        assert response.status_code == 400
+
+    def test_cursor_with_offset_is_read_as_utc(self, client, seeded_messages):
+        cursor = encode_cursor(datetime(2025, 1, 1, 2, 4, tzinfo=timezone(timedelta(hours=2))), "m-4")
+        response = client.get("/session/session-1", params={"before": cursor})
+        assert ids(response.json()) == ["m-0", "m-1", "m-2", "m-3"]
+
+    def test_invalid_cursor(self, client, seeded_messages):
+        assert client.get("/session/session-1", params={"before": "junk"}).status_code == 400
+
+class TestMessageDelta:
+    def test_only_new_messages_are_sent(self, client, seeded_messages):
+        cursor = client.get("/session/session-1").json()["next_cursor"]
+        body = client.get("/session/session-1/messages/delta", params={"since": cursor}).json()
+        assert body["messages"] == []
+        assert body["next_cursor"] == cursor
+
+        client.post("/message", json={
+            "session_id": "session-1",
+            "speaker": "user",
+            "content": "New",
+            "timestamp": datetime.now().isoformat()
+        })
+        body = client.get("/session/session-1/messages/delta", params={"since": cursor}).json()
+        assert [m["content"] for m in body["messages"]] == ["New", "This is a mock response from the AI assistant."]
+        assert body["has_more"] is False
+
+        follow_up = client.get("/session/session-1/messages/delta", params={"since": body["next_cursor"]}).json()
+        assert follow_up["messages"] == []
+
+    def test_large_delta_is_paged(self, client, seeded_messages):
+        cursor = encode_cursor(datetime(2024, 1, 1), "")
+        first = client.get("/session/session-1/messages/delta", params={"since": cursor, "limit": 6}).json()
+        assert first["has_more"] is True
+        second = client.get("/session/session-1/messages/delta", params={"since": first["next_cursor"]}).json()
+        assert ids(first) + ids(second) == seeded_messages
+
+    def test_unknown_session(self, client):
+        cursor = encode_cursor(datetime(2025, 1, 1), "m-0")
+        assert client.get("/session/missing/messages/delta", params={"since": cursor}).status_code == 404
+
+    def test_since_is_required(self, client, seeded_messages):
+        assert client.get("/session/session-1/messages/delta").status_code == 422
@@ -0,0 +1,179 @@
+import json
+import httpx
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, AsyncMock, patch
+from openai import APIConnectionError
+from app.events import MESSAGE_CREATED
+from app.main import app, event_hub
+from services.openai_service import OpenAIService, OpenAIServiceError
+from tests.mocks import FakeOpenAIServer
+from tests.unit.test_resilience import make_service
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def user_message(session_id):
+    return {
+        "session_id": session_id,
+        "speaker": "user",
+        "content": "Write the intro",
+        "timestamp": datetime.now().isoformat()
+    }
+
+class FailingStreamService:
+    """Streams one chunk, then fails like a dropped upstream connection"""
+    async def stream_response(self, messages: list, context: dict = None):
+        yield "Partial "
+        raise OpenAIServiceError("OpenAI API error: connection reset")
+
+class BrokenStreamService:
+    """Streams one chunk, then fails with an error that is not an OpenAI one"""
+    async def stream_response(self, messages: list, context: dict = None):
+        yield "Partial "
+        raise RuntimeError("tokenizer crashed")
+
+class TestMessageStreamEndpoint:
+    def test_stream_deltas_and_done(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        with client.stream("POST", "/message/stream", json=user_message(session_id)) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = parse_sse(response.read().decode())
+
+        deltas = [data["content"] for event, data in events if event == "delta"]
+        assert "".join(deltas) == "This is a mock streamed response."
+        event, done = events[-1]
+        assert event == "done"
+        assert done["content"] == "This is a mock streamed response."
+
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert [m["speaker"] for m in messages] == ["user", "assistant"]
+        assert messages[1]["content"] == "This is a mock streamed response."
+
+    def test_stream_failure_keeps_partial_output(self, client, monkeypatch):
+        monkeypatch.setattr("app.main.get_openai_service", lambda: FailingStreamService())
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/message/stream", json=user_message(session_id))
+        events = parse_sse(response.text)
+        assert events[-1][0] == "error"
+
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert len(messages) == 2
+        assert messages[1]["content"] == "Partial "
+        assert messages[1]["message_metadata"]["partial"] is True
+
+    def test_unexpected_failure_keeps_partial_output_once(self, client, monkeypatch):
+        monkeypatch.setattr("app.main.get_openai_service", lambda: BrokenStreamService())
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/message/stream", json=user_message(session_id))
+        assert parse_sse(response.text)[-1] == ("error", {"detail": "tokenizer crashed"})
+
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert [m["speaker"] for m in messages] == ["user", "assistant"]
+        assert messages[1]["message_metadata"]["partial"] is True
+
+    def test_failed_publish_after_saving_does_not_save_twice(self, client, monkeypatch):
+        publish = event_hub.publish
+
+        async def failing_publish(session_id, event_type, data):
+            if event_type == MESSAGE_CREATED and data["speaker"] == "assistant":
+                raise ConnectionError("event backend down")
+            await publish(session_id, event_type, data)
+
+        monkeypatch.setattr(event_hub, "publish", failing_publish)
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/message/stream", json=user_message(session_id))
+        assert parse_sse(response.text)[-1] == ("error", {"detail": "event backend down"})
+
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert [m["speaker"] for m in messages] == ["user", "assistant"]
+        assert messages[1]["content"] == "This is a mock streamed response."
+
+    async def test_client_leaving_closes_the_upstream_connection(self, client, monkeypatch):
+        server = FakeOpenAIServer()
+        monkeypatch.setattr("app.main.get_openai_service", lambda: make_service(server))
+        session_id = client.post("/session").json()["session_id"]
+        body = json.dumps(user_message(session_id)).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": "/message/stream", "raw_path": b"/message/stream",
+            "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+            "client": ("testclient", 1), "server": ("testserver", 80),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and b"event: delta" in message.get("body", b""):
+                raise OSError("connection reset")
+
+        with pytest.raises(Exception):
+            await app(scope, receive, send)
+        assert server.closed_streams == 1
+
+    def test_stream_unknown_session(self, client):
+        response = client.post("/message/stream", json=user_message("nonexistent"))
+        assert response.status_code == 404
+
+def make_chunk(content):
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = content
+    return chunk
+
+class FakeStream:
+    """Stands in for openai's AsyncStream"""
+    def __init__(self, contents):
+        self.contents = contents
+        self.closed = False
+
+    async def __aiter__(self):
+        for content in self.contents:
+            yield make_chunk(content)
+
+    async def close(self):
+        self.closed = True
+
+@pytest.fixture
+def service():
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+        service = OpenAIService()
+    service.client = MagicMock()
+    service.client.chat.completions.create = AsyncMock()
+    return service
+
+class TestStreamResponse:
+    async def test_yields_deltas(self, service):
+        stream = FakeStream(["Hel", None, "lo"])
+        service.client.chat.completions.create.return_value = stream
+        chunks = [c async for c in service.stream_response([{"role": "user", "content": "Hi"}])]
+        assert chunks == ["Hel", "lo"]
+        assert stream.closed
+        kwargs = service.client.chat.completions.create.call_args.kwargs
+        assert kwargs["stream"] is True
+        assert kwargs["messages"][0]["role"] == "system"
+
+    async def test_falls_back_before_first_token(self, service):
+        service.resilience.policy.max_attempts = 1
+        service.client.chat.completions.create.side_effect = [
+            APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")),
+            FakeStream(["fallback"])
+        ]
+        chunks = [c async for c in service.stream_response([])]
+        assert chunks == ["fallback"]
+        models = [c.kwargs["model"] for c in service.client.chat.completions.create.call_args_list]
+        assert models == ["gpt-4o-mini", "gpt-3.5-turbo"]
+
+    async def test_consumer_leaving_closes_the_upstream_connection(self):
+        server = FakeOpenAIServer()
+        deltas = make_service(server).stream_response([{"role": "user", "content": "Hi"}])
+        assert await anext(deltas) == "Reply from gpt-4o-mini"
+        assert server.closed_streams == 0
+        await deltas.aclose()
+        assert server.closed_streams == 1
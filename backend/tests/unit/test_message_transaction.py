@@ -0,0 +1,135 @@
+import pytest
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event, select
+from app import database, models
+from app.events import event_hub, MESSAGE_CREATED
+from app.main import get_history_cache
+
+class NoopSummarizer:
+    async def maybe_summarize(self, session_id, openai_service):
+        return False
+
+@contextmanager
+def count_round_trips():
+    """Record every SQL statement and commit sent through the app's engine"""
+    recorded = {"statements": [], "commits": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        recorded["statements"].append(statement.split()[0].upper())
+
+    def commit(conn):
+        recorded["commits"] += 1
+
+    sync_engine = database.engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "commit", commit)
+    try:
+        yield recorded
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(sync_engine, "commit", commit)
+
+def user_message(session_id, content="Hello"):
+    return {
+        "session_id": session_id,
+        "speaker": "user",
+        "content": content,
+        "timestamp": datetime.now().isoformat()
+    }
+
+class FailingService:
+    async def generate_response(self, messages: list, context: dict = None) -> str:
+        raise RuntimeError("upstream down")
+
+@pytest.fixture(autouse=True)
+def no_summarizer(monkeypatch):
+    # The summarizer runs as a background task and has its own queries
+    monkeypatch.setattr("app.main.get_session_summarizer", lambda: NoopSummarizer())
+
+class TestCreateMessageRoundTrips:
+    def test_one_turn(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/message", json=user_message(session_id))
+        get_history_cache().clear()
+
+        with count_round_trips() as recorded:
+            response = client.post("/message", json=user_message(session_id, "Second"))
+        assert response.status_code == 200
+        # Session check + summary, history and the user message in one transaction, then the reply
+        assert recorded["statements"] == ["SELECT", "SELECT", "INSERT", "INSERT"]
+        assert recorded["commits"] == 2
+
+    def test_one_turn_with_cached_history(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/message", json=user_message(session_id))
+
+        with count_round_trips() as recorded:
+            response = client.post("/message", json=user_message(session_id, "Second"))
+        assert response.status_code == 200
+        assert recorded["statements"] == ["INSERT", "INSERT"]
+        assert recorded["commits"] == 2
+
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert len(messages) == 4
+        assert "Second" in [m["content"] for m in messages]
+
+    def test_history_includes_the_new_message(self, client, mock_openai_service, monkeypatch):
+        seen = []
+
+        async def generate_response(messages, context=None):
+            seen.append(messages)
+            return "reply"
+
+        monkeypatch.setattr(mock_openai_service, "generate_response", generate_response)
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/message", json=user_message(session_id, "First"))
+        client.post("/message", json=user_message(session_id, "Second"))
+
+        assert [m["content"] for m in seen[1]] == ["First", "reply", "Second"]
+
+    def test_unknown_session_issues_one_query(self, client):
+        with count_round_trips() as recorded:
+            response = client.post("/message", json=user_message("missing"))
+        assert response.status_code == 404
+        assert recorded["statements"] == ["SELECT"]
+        assert recorded["commits"] == 0
+
+    def test_user_message_stored_before_the_reply(self, client, mock_openai_service, monkeypatch):
+        session_id = client.post("/session").json()["session_id"]
+        published, stored = [], []
+        publish = event_hub.publish
+
+        async def record_publish(session_id, event_type, data):
+            published.append((event_type, data))
+            await publish(session_id, event_type, data)
+
+        async def generate_response(messages, context=None):
+            async with database.AsyncSessionLocal() as db:
+                stored.extend((await db.scalars(select(models.DBMessage.id))).all())
+            return "reply"
+
+        monkeypatch.setattr(event_hub, "publish", record_publish)
+        monkeypatch.setattr(mock_openai_service, "generate_response", generate_response)
+        client.post("/message", json=user_message(session_id))
+
+        announced = [data["id"] for event_type, data in published if event_type == MESSAGE_CREATED]
+        assert stored == announced[:1]
+
+    def test_user_message_kept_when_reply_fails(self, client, monkeypatch):
+        session_id = client.post("/session").json()["session_id"]
+        monkeypatch.setattr("app.main.get_openai_service", lambda: FailingService())
+
+        response = client.post("/message", json=user_message(session_id))
+        assert response.status_code == 500
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert [m["speaker"] for m in messages] == ["user"]
+
+    def test_utc_timestamp_is_stored_naive(self, client):
+        # What the frontend sends: new Date().toISOString()
+        session_id = client.post("/session").json()["session_id"]
+        message = {**user_message(session_id), "timestamp": "2025-03-01T12:30:00.000Z"}
+        assert client.post("/message", json=message).status_code == 200
+
+        stored = client.get(f"/session/{session_id}").json()["messages"][0]
+        assert stored["timestamp"] == "2025-03-01T12:30:00"
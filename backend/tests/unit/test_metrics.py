@@ -0,0 +1,108 @@
+import re
+import pytest
+from app import metrics
+from app.database import statement_operation
+from tests.mocks import FakeOpenAIServer
+from tests.unit.test_resilience import MESSAGES, make_service
+
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+
+def parse_metrics(text):
+    """{(sample name, frozenset of label pairs): value} from the text exposition format"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"Malformed sample line: {line!r}"
+        labels = frozenset(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match["labels"] or ""))
+        samples[(match["name"], labels)] = float(match["value"])
+    return samples
+
+def sample(client, name, **labels):
+    return parse_metrics(client.get("/metrics").text).get((name, frozenset(labels.items())), 0.0)
+
+requires_client = pytest.mark.skipif(metrics.prometheus_client is None, reason="prometheus_client not installed")
+
+def test_noop_metrics_accept_the_same_calls():
+    metric = metrics._NoopMetric("jobs", "Jobs run", ["queue"])
+    child = metric.labels(queue="a")
+    child.inc()
+    child.observe(0.5)
+    with child.track_inprogress(), child.time():
+        pass
+
+def test_statement_operation():
+    assert statement_operation("\n  select id from sessions") == "SELECT"
+    assert statement_operation("INSERT INTO messages VALUES (?)") == "INSERT"
+    assert statement_operation("") == "UNKNOWN"
+
+@requires_client
+class TestMetricsEndpoint:
+    def test_content_type(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == metrics.CONTENT_TYPE
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+    def test_request_latency_by_route_template(self, client):
+        route = {"method": "GET", "route": "/session/{session_id}", "status": "200"}
+        before = sample(client, "http_request_duration_seconds_count", **route)
+        session_id = client.post("/session").json()["session_id"]
+        client.get(f"/session/{session_id}")
+        client.get(f"/session/{session_id}")
+        assert sample(client, "http_request_duration_seconds_count", **route) == before + 2
+
+        before = sample(client, "http_request_duration_seconds_count", method="GET", route="<unmatched>", status="404")
+        client.get("/no-such-route")
+        assert sample(client, "http_request_duration_seconds_count", method="GET", route="<unmatched>", status="404") == before + 1
+
+    def test_database_queries(self, client):
+        before = sample(client, "db_queries_total", operation="INSERT")
+        client.post("/session")
+        assert sample(client, "db_queries_total", operation="INSERT") == before + 1
+        assert sample(client, "db_query_duration_seconds_count", operation="INSERT") >= before + 1
+
+    def test_generations_in_progress(self, client, mock_openai_service):
+        session_id = client.post("/session").json()["session_id"]
+        observed = []
+
+        async def generate_section_content(section_type, context, use_cache=True):
+            observed.append(metrics.REGISTRY.get_sample_value("generations_in_progress", {"kind": "section"}))
+            return "Generated"
+
+        mock_openai_service.generate_section_content = generate_section_content
+        client.post("/generate/section", json={
+            "session_id": session_id,
+            "section_type": "introduction",
+            "context": {"topic": "Rates"}
+        })
+        assert observed == [1]
+        assert sample(client, "generations_in_progress", kind="section") == 0
+
+@requires_client
+class TestOpenAIMetrics:
+    async def test_fallbacks_errors_and_tokens(self, client):
+        server = FakeOpenAIServer(failing_models={"gpt-4o-mini": 500})
+        service = make_service(server, max_attempts=2)
+        fallbacks = sample(client, "openai_fallbacks_total", model="gpt-3.5-turbo")
+        errors = sample(client, "openai_errors_total", model="gpt-4o-mini", error="500")
+        failed = sample(client, "openai_request_duration_seconds_count", model="gpt-4o-mini", outcome="error")
+        succeeded = sample(client, "openai_request_duration_seconds_count", model="gpt-3.5-turbo", outcome="success")
+        prompt = sample(client, "openai_tokens_total", section_type="chat", kind="prompt")
+        completion = sample(client, "openai_tokens_total", section_type="chat", kind="completion")
+
+        assert await service.generate_response(MESSAGES) == "Reply from gpt-3.5-turbo"
+
+        assert sample(client, "openai_fallbacks_total", model="gpt-3.5-turbo") == fallbacks + 1
+        assert sample(client, "openai_errors_total", model="gpt-4o-mini", error="500") == errors + 2
+        assert sample(client, "openai_request_duration_seconds_count", model="gpt-4o-mini", outcome="error") == failed + 2
+        assert sample(client, "openai_request_duration_seconds_count", model="gpt-3.5-turbo", outcome="success") == succeeded + 1
+        assert sample(client, "openai_tokens_total", section_type="chat", kind="prompt") == prompt + 10
+        assert sample(client, "openai_tokens_total", section_type="chat", kind="completion") == completion + 5
+
+    async def test_tokens_by_section_type(self, client):
+        service = make_service(FakeOpenAIServer())
+        before = sample(client, "openai_tokens_total", section_type="introduction", kind="completion")
+        await service.generate_section_content("introduction", {"topic": "Rates", "additional_info": ""}, use_cache=False)
+        assert sample(client, "openai_tokens_total", section_type="introduction", kind="completion") == before + 5
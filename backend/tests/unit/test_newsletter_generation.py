@@ -0,0 +1,223 @@
+import asyncio
+import json
+import time
+import pytest
+from app.main import app
+from services.newsletter import NewsletterGenerator, SECTION_DEPENDENCIES
+from services.openai_service import OpenAIServiceError
+from services.session_state import InMemorySessionState
+from tests.unit.test_message_stream import parse_sse
+
+CONTEXT = {"topic": "Rates", "additional_info": ""}
+
+class ScriptedSectionService:
+    """Generates sections with a fixed latency; fails sections a set number of times"""
+    def __init__(self, latency: float = 0.0, failures=None, invalid=()):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.invalid = set(invalid)
+        self.calls = []
+        self.contexts = {}
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def generate_section_content(self, section_type: str, context: dict, use_cache: bool = True) -> str:
+        self.calls.append(section_type)
+        self.contexts[section_type] = context
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.inflight -= 1
+        if section_type in self.invalid:
+            raise ValueError(f"No template found for section type: {section_type}")
+        if self.failures.get(section_type, 0) > 0:
+            self.failures[section_type] -= 1
+            raise OpenAIServiceError("OpenAI API error: Injected 503")
+        return f"{section_type} content"
+
+class FailingSessionState(InMemorySessionState):
+    """An in-process store whose named operations fail as if the backend were down"""
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+
+    async def set_progress(self, session_id, progress):
+        if "set_progress" in self.failing:
+            raise ConnectionError("session state store down")
+        await super().set_progress(session_id, progress)
+
+    async def acquire_lock(self, name, ttl_seconds):
+        if "acquire_lock" in self.failing:
+            raise ConnectionError("session state store down")
+        return await super().acquire_lock(name, ttl_seconds)
+
+    async def release_lock(self, name, token):
+        if "release_lock" in self.failing:
+            raise ConnectionError("session state store down")
+        return await super().release_lock(name, token)
+
+async def collect(generator, service, context=CONTEXT):
+    return [result async for result in generator.generate(service, context)]
+
+class TestNewsletterGenerator:
+    async def test_thesis_first_then_rest(self):
+        service = ScriptedSectionService()
+        results = await collect(NewsletterGenerator(), service)
+
+        assert service.calls[0] == "thesis_overview"
+        assert sorted(service.calls) == sorted(SECTION_DEPENDENCIES)
+        assert all(r["status"] == "completed" for r in results)
+        assert "thesis_overview content" in service.contexts["conclusion"]["additional_info"]
+        assert service.contexts["thesis_overview"] == CONTEXT
+
+    async def test_wall_clock_follows_critical_path(self):
+        service = ScriptedSectionService(latency=0.1)
+        started = time.monotonic()
+        await collect(NewsletterGenerator(max_concurrency=4), service)
+        # Thesis, then the other four together: two latencies, not five
+        assert time.monotonic() - started < 0.35
+        assert service.max_inflight == 4
+
+    async def test_concurrency_is_bounded(self):
+        service = ScriptedSectionService(latency=0.02)
+        await collect(NewsletterGenerator(max_concurrency=2), service)
+        assert service.max_inflight == 2
+
+    async def test_only_failed_sections_are_retried(self):
+        service = ScriptedSectionService(failures={"actionable_trades": 1})
+        results = await collect(NewsletterGenerator(max_attempts=2), service)
+
+        assert service.calls.count("actionable_trades") == 2
+        assert service.calls.count("introduction") == 1
+        trades = next(r for r in results if r["section_type"] == "actionable_trades")
+        assert trades["status"] == "completed"
+        assert trades["attempts"] == 2
+
+    async def test_section_fails_after_max_attempts(self):
+        service = ScriptedSectionService(failures={"conclusion": 5})
+        results = await collect(NewsletterGenerator(max_attempts=2), service)
+
+        by_section = {r["section_type"]: r for r in results}
+        assert by_section["conclusion"]["status"] == "failed"
+        assert by_section["conclusion"]["attempts"] == 2
+        assert by_section["introduction"]["status"] == "completed"
+
+    async def test_failed_thesis_skips_dependents(self):
+        service = ScriptedSectionService(failures={"thesis_overview": 5})
+        results = await collect(NewsletterGenerator(max_attempts=1), service)
+
+        assert results[0]["status"] == "failed"
+        assert [r["status"] for r in results[1:]] == ["skipped"] * 4
+        assert service.calls == ["thesis_overview"]
+
+    async def test_validation_errors_are_not_retried(self):
+        service = ScriptedSectionService(invalid={"body_section"})
+        results = await collect(NewsletterGenerator(max_attempts=3), service)
+        assert service.calls.count("body_section") == 1
+        assert next(r for r in results if r["section_type"] == "body_section")["status"] == "failed"
+
+    async def test_closing_the_stream_cancels_outstanding_sections(self):
+        service = ScriptedSectionService(latency=0.05)
+        stream = NewsletterGenerator().generate(service, CONTEXT)
+        first = await stream.__anext__()
+        assert first["section_type"] == "thesis_overview"
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        assert service.inflight == 0
+
+class TestNewsletterEndpoint:
+    def test_streams_sections_then_done(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={
+            "session_id": session_id,
+            "context": {"topic": "Rates"}
+        })
+        assert response.status_code == 200
+        events = parse_sse(response.text)
+
+        sections = [data for event, data in events if event == "section"]
+        assert sections[0]["section_type"] == "thesis_overview"
+        assert {s["section_type"] for s in sections} == set(SECTION_DEPENDENCIES)
+        assert all(s["status"] == "completed" and s["generated_at"] for s in sections)
+        assert events[-1] == ("done", {"incomplete_sections": []})
+
+    def test_reports_incomplete_sections(self, client, monkeypatch):
+        monkeypatch.setattr(
+            "app.main.get_openai_service",
+            lambda: ScriptedSectionService(failures={"conclusion": 5})
+        )
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={
+            "session_id": session_id,
+            "context": {"topic": "Rates"}
+        })
+        assert parse_sse(response.text)[-1] == ("done", {"incomplete_sections": ["conclusion"]})
+
+    async def test_lock_released_when_client_leaves_before_the_body(self, client, session_state):
+        session_id = client.post("/session").json()["session_id"]
+        body = json.dumps({"session_id": session_id, "context": {"topic": "Rates"}}).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": "/generate/newsletter", "raw_path": b"/generate/newsletter",
+            "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+            "client": ("testclient", 1), "server": ("testserver", 80),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                raise OSError("connection reset")
+
+        with pytest.raises(Exception):
+            await app(scope, receive, send)
+        assert not await session_state.is_locked(f"newsletter:{session_id}")
+
+    def test_concurrent_generation_is_refused(self, client, session_state):
+        session_id = client.post("/session").json()["session_id"]
+        request = {"session_id": session_id, "context": {"topic": "Rates"}}
+        token = asyncio.run(session_state.acquire_lock(f"newsletter:{session_id}", 60))
+        assert client.post("/generate/newsletter", json=request).status_code == 409
+        asyncio.run(session_state.release_lock(f"newsletter:{session_id}", token))
+        assert client.post("/generate/newsletter", json=request).status_code == 200
+
+    def test_progress_store_failures_do_not_stop_generation(self, client, monkeypatch, caplog):
+        state = FailingSessionState(failing={"set_progress", "release_lock"})
+        monkeypatch.setattr("app.main.get_session_state", lambda: state)
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={
+            "session_id": session_id,
+            "context": {"topic": "Rates"}
+        })
+        assert response.status_code == 200
+        assert parse_sse(response.text)[-1] == ("done", {"incomplete_sections": []})
+        assert "Error storing generation progress" in caplog.text
+        assert "Error releasing lock" in caplog.text
+
+    def test_lock_store_failure_is_retryable(self, client, monkeypatch):
+        state = FailingSessionState(failing={"acquire_lock"})
+        monkeypatch.setattr("app.main.get_session_state", lambda: state)
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={
+            "session_id": session_id,
+            "context": {"topic": "Rates"}
+        })
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+        assert asyncio.run(state.get_progress(session_id)) is None
+
+    def test_unknown_session(self, client):
+        response = client.post("/generate/newsletter", json={
+            "session_id": "missing",
+            "context": {"topic": "Rates"}
+        })
+        assert response.status_code == 404
+
+    def test_missing_topic(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={"session_id": session_id, "context": {}})
+        assert response.status_code == 422
@@ -0,0 +1,67 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite
+from app import models
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.queries import (
+    context_messages_query, message_page_query, session_messages_query, session_version_query, sessions_page_query
+)
+
+@pytest.fixture
+def explain():
+    """Return SQLite's EXPLAIN QUERY PLAN details for a statement, one string per step"""
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    if sync_engine.dialect.name != "sqlite":
+        pytest.skip("Query plan checks run against SQLite")
+
+    def run(statement):
+        compiled = statement.compile(dialect=sqlite.dialect())
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        with sync_engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return [row[-1] for row in rows]
+
+    yield run
+    sync_engine.dispose()
+
+def assert_no_scan(plan, table):
+    scans = [step for step in plan if step.startswith(f"SCAN {table}") and "INDEX" not in step]
+    assert not scans, plan
+
+class TestHotQueriesUseIndexes:
+    def test_session_messages(self, explain):
+        plan = explain(session_messages_query("session-1"))
+        assert any("ix_messages_session_id_timestamp" in step for step in plan), plan
+        assert_no_scan(plan, "messages")
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+    @pytest.mark.parametrize("cursor", ["before", "since"])
+    def test_message_pages(self, explain, cursor):
+        plan = explain(message_page_query("session-1", 51, **{cursor: (datetime(2025, 1, 1), "m-1")}))
+        assert any("ix_messages_session_id_timestamp" in step for step in plan), plan
+        assert_no_scan(plan, "messages")
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+    def test_session_version_reads_only_the_index(self, explain):
+        plan = explain(session_version_query("session-1"))
+        assert any("COVERING INDEX ix_messages_session_id_updated_at" in step for step in plan), plan
+        assert_no_scan(plan, "messages")
+
+    def test_context_messages_after_summary(self, explain):
+        summary = models.DBSessionSummary(
+            session_id="session-1",
+            summarized_through_timestamp=datetime(2025, 1, 1),
+            summarized_through_id="m-1"
+        )
+        plan = explain(context_messages_query("session-1", summary))
+        assert any("ix_messages_session_id_timestamp" in step for step in plan), plan
+        assert_no_scan(plan, "messages")
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+    def test_sessions_page_with_message_counts(self, explain):
+        plan = explain(sessions_page_query(51, (datetime(2025, 1, 1), "session-9")))
+        assert any("ix_sessions_created_at" in step for step in plan), plan
+        assert any("ix_messages_session_id_timestamp" in step for step in plan), plan
+        assert_no_scan(plan, "sessions")
+        assert_no_scan(plan, "messages")
@@ -0,0 +1,188 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from services.openai_service import OpenAIService, OpenAIServiceError
+from services.resilience import CircuitBreaker, ResilientCaller, RetryPolicy
+from tests.mocks import FakeOpenAIServer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RecordingSleep:
+    def __init__(self):
+        self.delays = []
+
+    async def __call__(self, delay):
+        self.delays.append(delay)
+
+def make_service(server, max_attempts=3, fallback_models=("gpt-3.5-turbo",), max_inflight=16,
+                 breaker_factory=None, sleep=None):
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+        service = OpenAIService()
+    service.client = server.client()
+    service.resilience = ResilientCaller(
+        policy=RetryPolicy(max_attempts=max_attempts, base_delay=0.01, max_delay=1.0),
+        max_inflight=max_inflight,
+        fallback_models=list(fallback_models),
+        breaker_factory=breaker_factory,
+        sleep=sleep or RecordingSleep(),
+    )
+    return service
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+class TestRetryPolicy:
+    def test_backoff_is_bounded_and_jittered(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for attempt in range(6):
+            assert 0 <= policy.compute_delay(attempt) <= min(5.0, 2 ** attempt)
+
+    def test_retry_after_wins_but_is_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        assert policy.compute_delay(0, retry_after=3.0) == 3.0
+        assert policy.compute_delay(0, retry_after=60.0) == 5.0
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_half_opens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+        clock.now = 10
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Only one trial call while half-open
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.times_opened == 2
+
+    def test_abandoned_trial_frees_the_slot(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+        breaker.release_trial()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow()
+
+class TestResilienceAgainstFakeServer:
+    async def test_retries_429_honoring_retry_after(self):
+        server = FakeOpenAIServer(script=[(429, {"retry-after-ms": "250"}), (503, {"retry-after": "0.5"})])
+        sleep = RecordingSleep()
+        service = make_service(server, sleep=sleep)
+
+        assert await service.generate_response(MESSAGES) == "Reply from gpt-4o-mini"
+        assert server.requested_models == ["gpt-4o-mini"] * 3
+        assert sleep.delays == [0.25, 0.5]
+        assert service.resilience.retries == 2
+        assert service.resilience.fallbacks == 0
+
+    async def test_falls_back_after_retryable_errors(self):
+        server = FakeOpenAIServer(failing_models={"gpt-4o-mini": 500})
+        service = make_service(server, max_attempts=2)
+
+        assert await service.generate_response(MESSAGES) == "Reply from gpt-3.5-turbo"
+        assert server.requested_models == ["gpt-4o-mini", "gpt-4o-mini", "gpt-3.5-turbo"]
+        assert service.resilience.fallbacks == 1
+
+    async def test_no_fallback_on_client_errors(self):
+        server = FakeOpenAIServer(script=[(400, {})])
+        service = make_service(server)
+
+        with pytest.raises(HTTPException):
+            await service.generate_response(MESSAGES)
+        assert server.requested_models == ["gpt-4o-mini"]
+
+    async def test_open_breaker_skips_model(self):
+        server = FakeOpenAIServer(failing_models={"gpt-4o-mini": 503})
+        service = make_service(
+            server, max_attempts=1,
+            breaker_factory=lambda: CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        )
+        for _ in range(2):
+            await service.generate_response(MESSAGES)
+        assert service.resilience.breakers["gpt-4o-mini"].state == CircuitBreaker.OPEN
+
+        server.requested_models.clear()
+        assert await service.generate_response(MESSAGES) == "Reply from gpt-3.5-turbo"
+        assert server.requested_models == ["gpt-3.5-turbo"]
+
+    async def test_cancelled_trial_does_not_wedge_the_breaker(self):
+        clock = FakeClock()
+        caller = ResilientCaller(
+            policy=RetryPolicy(max_attempts=1),
+            breaker_factory=lambda: CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock),
+            sleep=RecordingSleep(),
+        )
+        caller.breaker("gpt-4o-mini").record_failure()
+        clock.now = 10
+        started = asyncio.Event()
+
+        async def hang(model):
+            started.set()
+            await asyncio.Event().wait()
+
+        trial = asyncio.create_task(caller.call("gpt-4o-mini", hang))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        async def answer(model):
+            return f"Reply from {model}"
+
+        assert await caller.call("gpt-4o-mini", answer) == "Reply from gpt-4o-mini"
+        assert caller.breaker("gpt-4o-mini").state == CircuitBreaker.CLOSED
+        assert caller.inflight == 0
+
+    async def test_all_circuits_open(self):
+        server = FakeOpenAIServer(failing_models={"gpt-4o-mini-2024-07-18": 503})
+        service = make_service(
+            server, max_attempts=1, fallback_models=(),
+            breaker_factory=lambda: CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        )
+        with pytest.raises(OpenAIServiceError):
+            await service.generate_section_content("introduction", {"topic": "Rates", "additional_info": ""})
+        with pytest.raises(OpenAIServiceError) as exc:
+            await service.generate_section_content("introduction", {"topic": "Rates", "additional_info": ""})
+        assert "Circuit open" in str(exc.value)
+
+    async def test_concurrency_is_capped(self):
+        server = FakeOpenAIServer(latency=0.05)
+        service = make_service(server, max_inflight=2)
+
+        # Distinct requests, so none of them are coalesced
+        await asyncio.gather(*[
+            service.generate_response([{"role": "user", "content": f"Hello {i}"}]) for i in range(6)
+        ])
+        assert server.max_inflight == 2
+        assert service.resilience.inflight == 0
+
+    async def test_fallback_sections_are_not_cached_under_primary_key(self):
+        server = FakeOpenAIServer(failing_models={"gpt-4o-mini-2024-07-18": 503})
+        service = make_service(server, max_attempts=1)
+        context = {"topic": "Rates", "additional_info": ""}
+
+        assert await service.generate_section_content("introduction", context) == "Reply from gpt-3.5-turbo"
+        del server.failing_models["gpt-4o-mini-2024-07-18"]
+        assert await service.generate_section_content("introduction", context) == "Reply from gpt-4o-mini-2024-07-18"
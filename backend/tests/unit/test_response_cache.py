@@ -0,0 +1,119 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy import select
+from app import database, models
+from services.cache import LRUTTLCache, SQLResponseCache, ResponseCache, make_cache_key
+from services.openai_service import OpenAIService
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestLRUTTLCache:
+    def test_hit_and_miss_counters(self):
+        cache = LRUTTLCache(max_entries=2)
+        assert cache.get("a") is None
+        cache.set("a", "1")
+        assert cache.get("a") == "1"
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "evictions": 0, "expirations": 0}
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUTTLCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.evictions == 1
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = LRUTTLCache(ttl_seconds=10, clock=clock)
+        cache.set("a", "1")
+        clock.now = 9
+        assert cache.get("a") == "1"
+        clock.now = 10
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+
+def test_cache_key_depends_on_parameters():
+    base = {"model": "m", "messages": [{"role": "user", "content": "p"}], "temperature": 0.7}
+    assert make_cache_key(**base) == make_cache_key(**dict(base))
+    assert make_cache_key(**base) != make_cache_key(**{**base, "temperature": 0.2})
+    assert make_cache_key(**base) != make_cache_key(**{**base, "model": "other"})
+
+class TestPersistentTier:
+    async def test_round_trip_and_promotion(self):
+        persistent = SQLResponseCache(ttl_seconds=60)
+        writer = ResponseCache(LRUTTLCache(), persistent)
+        await writer.set("key", "content")
+
+        # A fresh memory tier (another worker / after restart) still finds it
+        reader = ResponseCache(LRUTTLCache(), SQLResponseCache(ttl_seconds=60))
+        assert await reader.get("key") == "content"
+        assert reader.memory.get("key") == "content"
+        assert reader.persistent.hits == 1
+
+    async def test_expired_entries_are_misses(self):
+        persistent = SQLResponseCache(ttl_seconds=-1)
+        await persistent.set("key", "content")
+        assert await persistent.get("key") is None
+        assert persistent.misses == 1
+
+    async def test_expired_entries_are_swept_on_writes(self):
+        persistent = SQLResponseCache(ttl_seconds=-1, purge_every=3)
+        for i in range(2):
+            await persistent.set(f"key-{i}", "content")
+        async with database.AsyncSessionLocal() as db:
+            assert len((await db.scalars(select(models.DBResponseCache))).all()) == 2
+        await persistent.set("key-2", "content")
+        async with database.AsyncSessionLocal() as db:
+            assert (await db.scalars(select(models.DBResponseCache))).all() == []
+        assert persistent.stats()["purged"] == 3
+
+def completion(content):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+@pytest.fixture
+def service():
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+        service = OpenAIService()
+    service.client = MagicMock()
+    service.client.chat.completions.create = AsyncMock(return_value=completion("Section text"))
+    return service
+
+class TestSectionCaching:
+    context = {"topic": "Semiconductors", "additional_info": ""}
+
+    async def test_identical_requests_hit_cache(self, service):
+        first = await service.generate_section_content("introduction", self.context)
+        second = await service.generate_section_content("introduction", self.context)
+        assert first == second == "Section text"
+        assert service.client.chat.completions.create.call_count == 1
+        assert service.section_cache.stats()["memory"]["hits"] == 1
+
+    async def test_different_prompt_misses(self, service):
+        await service.generate_section_content("introduction", self.context)
+        await service.generate_section_content("conclusion", self.context)
+        assert service.client.chat.completions.create.call_count == 2
+
+    async def test_bypass_regenerates_and_refreshes(self, service):
+        await service.generate_section_content("introduction", self.context)
+        service.client.chat.completions.create.return_value = completion("Fresh text")
+        assert await service.generate_section_content("introduction", self.context, use_cache=False) == "Fresh text"
+        assert await service.generate_section_content("introduction", self.context) == "Fresh text"
+        assert service.client.chat.completions.create.call_count == 2
+
+    def test_stats_endpoint(self, client, service, monkeypatch):
+        monkeypatch.setattr("app.main.get_openai_service", lambda: service)
+        response = client.get("/health/cache")
+        assert response.status_code == 200
+        assert response.json()["section_cache"]["memory"]["entries"] == 0
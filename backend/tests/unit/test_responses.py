@@ -0,0 +1,53 @@
+import json
+from datetime import datetime
+from app import responses
+from app.main import app, message_rows
+from app.queries import MESSAGE_COLUMNS
+
+CONTENT = {
+    "created_at": datetime(2025, 1, 2, 3, 4, 5, 678901),
+    "whole_second": datetime(2025, 1, 2, 3, 4, 5),
+    "metadata": {"context": {"tokens_kept": 10}},
+    "content": "Yields fell 5bp — spreads tighter",
+}
+
+class TestDumps:
+    def test_datetimes_render_like_isoformat(self):
+        rendered = json.loads(responses.dumps(CONTENT))
+        assert rendered["created_at"] == CONTENT["created_at"].isoformat()
+        assert rendered["whole_second"] == CONTENT["whole_second"].isoformat()
+
+    def test_stdlib_fallback_matches(self, monkeypatch):
+        fast = responses.dumps(CONTENT)
+        monkeypatch.setattr(responses, "orjson", None)
+        assert responses.dumps(CONTENT) == fast
+
+def test_message_rows():
+    row = ("m-1", "session-1", "user", datetime(2025, 1, 1), "Hello", {}, False)
+    assert message_rows([row]) == [{
+        "id": "m-1",
+        "session_id": "session-1",
+        "speaker": "user",
+        "timestamp": datetime(2025, 1, 1),
+        "content": "Hello",
+        "message_metadata": {},
+        "pinned": False,
+    }]
+    assert len(MESSAGE_COLUMNS) == len(row)
+
+def test_session_response_shape(client):
+    session_id = client.post("/session").json()["session_id"]
+    client.post("/message", json={
+        "session_id": session_id,
+        "speaker": "user",
+        "content": "Hello",
+        "timestamp": "2025-01-01T09:30:00.250000"
+    })
+    body = client.get(f"/session/{session_id}").json()
+    assert body["messages"][0]["timestamp"] == "2025-01-01T09:30:00.250000"
+    assert datetime.fromisoformat(body["created_at"])
+    assert set(body["messages"][0]) == {"id", "session_id", "speaker", "timestamp", "content", "message_metadata", "pinned"}
+
+def test_response_models_are_documented():
+    schemas = app.openapi()["components"]["schemas"]
+    assert {"SessionDetail", "SessionList", "MessageOut", "SectionOut"} <= set(schemas)
@@ -0,0 +1,94 @@
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import SQLALCHEMY_DATABASE_URL
+
+def generate(client, session_id, section_type="introduction"):
+    return client.post("/generate/section", json={
+        "session_id": session_id,
+        "section_type": section_type,
+        "context": {"topic": "Rates", "additional_info": ""}
+    })
+
+def stored_sections():
+    """Read the table directly, the way another worker would see it"""
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    db = sessionmaker(bind=sync_engine)()
+    try:
+        return db.execute(
+            select(models.DBNewsletterSection.section_type, models.DBNewsletterSection.version)
+            .order_by(models.DBNewsletterSection.section_type, models.DBNewsletterSection.version)
+        ).all()
+    finally:
+        db.close()
+        sync_engine.dispose()
+
+class TestSectionPersistence:
+    def test_generated_section_is_stored(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        response = generate(client, session_id)
+        assert response.status_code == 200
+        section = response.json()
+        assert section["content"] == "Mock content for section type: introduction"
+        assert section["metadata"]["version"] == 1
+        assert section["metadata"]["state"] == "awaiting_approval"
+        assert stored_sections() == [("introduction", 1)]
+
+    def test_regeneration_adds_a_version(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        generate(client, session_id)
+        generate(client, session_id)
+        generate(client, session_id, "conclusion")
+
+        sections = client.get(f"/session/{session_id}/sections").json()["sections"]
+        assert [(s["section_type"], s["version"]) for s in sections] == [("introduction", 2), ("conclusion", 1)]
+        assert stored_sections() == [("conclusion", 1), ("introduction", 1), ("introduction", 2)]
+
+    def test_unknown_session(self, client):
+        assert generate(client, "missing").status_code == 404
+        assert client.get("/session/missing/sections").status_code == 404
+
+    def test_approve_latest_version(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        generate(client, session_id)
+        generate(client, session_id)
+
+        response = client.patch(f"/session/{session_id}/sections/introduction", json={"state": "approved"})
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+        assert response.json()["state"] == "approved"
+
+    def test_update_specific_version(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        generate(client, session_id)
+        generate(client, session_id)
+
+        response = client.patch(
+            f"/session/{session_id}/sections/introduction",
+            json={"state": "needs_revision", "version": 1}
+        )
+        assert response.json()["version"] == 1
+        assert response.json()["state"] == "needs_revision"
+        latest = client.get(f"/session/{session_id}/sections").json()["sections"][0]
+        assert latest["state"] == "awaiting_approval"
+
+    def test_update_rejects_unknown_state_and_section(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        generate(client, session_id)
+        url = f"/session/{session_id}/sections/introduction"
+        assert client.patch(url, json={"state": "published"}).status_code == 422
+        assert client.patch(f"/session/{session_id}/sections/conclusion", json={"state": "approved"}).status_code == 404
+
+    def test_newsletter_generation_stores_sections(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/generate/newsletter", json={"session_id": session_id, "context": {"topic": "Rates"}})
+
+        sections = client.get(f"/session/{session_id}/sections").json()["sections"]
+        assert len(sections) == 5
+        assert all(s["version"] == 1 for s in sections)
+
+    def test_deleting_session_deletes_sections(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        generate(client, session_id)
+        assert client.delete(f"/session/{session_id}").status_code == 200
+        assert stored_sections() == []
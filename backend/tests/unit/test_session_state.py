@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from datetime import datetime
+from services.session_state import (
+    InMemorySessionState, RedisSessionState, SessionStateBackend, create_session_state
+)
+from tests.unit.test_message_stream import parse_sse
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request):
+    if request.param == "memory":
+        yield InMemorySessionState(recent_messages=3)
+        return
+    fakeredis = pytest.importorskip("fakeredis")
+    state = RedisSessionState(client=fakeredis.FakeAsyncRedis(), recent_messages=3)
+    yield state
+    await state.close()
+
+class TestSessionStateBackends:
+    async def test_section_states(self, backend):
+        assert await backend.get_section_states("a") == {}
+        await backend.set_section_state("a", "introduction", 1, "awaiting_approval")
+        await backend.set_section_state("a", "introduction", 2, "approved")
+        await backend.set_section_state("a", "conclusion", 1, "draft")
+        assert await backend.get_section_states("a") == {
+            "introduction": {"version": 2, "state": "approved"},
+            "conclusion": {"version": 1, "state": "draft"},
+        }
+        assert await backend.get_section_states("b") == {}
+
+    async def test_recent_messages_are_bounded(self, backend):
+        await backend.push_messages("a", [{"content": "1"}, {"content": "2"}])
+        await backend.push_messages("a", [{"content": "3"}, {"content": "4"}])
+        await backend.push_messages("a", [])
+        assert [m["content"] for m in await backend.get_recent_messages("a")] == ["2", "3", "4"]
+
+    async def test_progress(self, backend):
+        assert await backend.get_progress("a") is None
+        await backend.set_progress("a", {"status": "running", "completed": ["thesis_overview"]})
+        assert await backend.get_progress("a") == {"status": "running", "completed": ["thesis_overview"]}
+
+    async def test_lock_is_exclusive_and_owned(self, backend):
+        token = await backend.acquire_lock("newsletter:a", 60)
+        assert token
+        assert await backend.is_locked("newsletter:a")
+        assert await backend.acquire_lock("newsletter:a", 60) is None
+        assert not await backend.release_lock("newsletter:a", "someone-else")
+        assert await backend.release_lock("newsletter:a", token)
+        assert not await backend.is_locked("newsletter:a")
+        assert await backend.acquire_lock("newsletter:a", 60)
+
+    async def test_lock_expires(self, backend):
+        assert await backend.acquire_lock("newsletter:a", 0.05)
+        await asyncio.sleep(0.1)
+        assert await backend.acquire_lock("newsletter:a", 60)
+
+    async def test_clear_session(self, backend):
+        await backend.set_section_state("a", "introduction", 1, "draft")
+        await backend.push_messages("a", [{"content": "1"}])
+        await backend.set_progress("a", {"status": "completed"})
+        await backend.clear_session("a")
+        assert await backend.get_section_states("a") == {}
+        assert await backend.get_recent_messages("a") == []
+        assert await backend.get_progress("a") is None
+
+class TestInMemoryExpiry:
+    async def test_state_expires_after_ttl(self):
+        now = [0.0]
+        state = InMemorySessionState(ttl_seconds=10, clock=lambda: now[0])
+        await state.set_progress("a", {"status": "running"})
+        now[0] = 11
+        assert await state.get_progress("a") is None
+
+class TestRedisSharing:
+    async def test_workers_share_state_and_locks(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        first, second = (RedisSessionState(client=fakeredis.FakeAsyncRedis(server=server)) for _ in range(2))
+        await first.set_section_state("a", "introduction", 1, "approved")
+        assert await second.get_section_states("a") == {"introduction": {"version": 1, "state": "approved"}}
+        assert await first.acquire_lock("newsletter:a", 60)
+        assert await second.acquire_lock("newsletter:a", 60) is None
+
+class TestSessionStateConfig:
+    def test_default_is_in_process(self):
+        assert isinstance(create_session_state(""), InMemorySessionState)
+
+    def test_redis_url(self):
+        pytest.importorskip("redis")
+        assert isinstance(create_session_state("redis://localhost:6379/1"), RedisSessionState)
+
+    def test_unknown_url(self):
+        with pytest.raises(ValueError):
+            create_session_state("memcached://localhost")
+
+    def test_backends_must_implement_the_interface(self):
+        class Partial(SessionStateBackend):
+            async def get_section_states(self, session_id):
+                return {}
+
+        with pytest.raises(TypeError):
+            Partial()
+
+class TestSessionStateInApp:
+    def test_messages_and_sections_are_mirrored(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/message", json={
+            "session_id": session_id,
+            "speaker": "user",
+            "content": "Hello",
+            "timestamp": datetime.now().isoformat()
+        })
+        client.post("/generate/section", json={
+            "session_id": session_id,
+            "section_type": "introduction",
+            "context": {"topic": "Rates"}
+        })
+        client.patch(f"/session/{session_id}/sections/introduction", json={"state": "approved"})
+
+        state = client.get(f"/session/{session_id}/state").json()
+        assert [m["speaker"] for m in state["recent_messages"]] == ["user", "assistant"]
+        assert state["sections"] == {"introduction": {"version": 1, "state": "approved"}}
+        assert state["generating"] is False
+
+    def test_newsletter_generation_records_progress_and_releases_lock(self, client):
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={"session_id": session_id, "context": {"topic": "Rates"}})
+        assert parse_sse(response.text)[-1] == ("done", {"incomplete_sections": []})
+
+        state = client.get(f"/session/{session_id}/state").json()
+        assert state["generation"]["status"] == "completed"
+        assert len(state["generation"]["completed"]) == 5
+        assert state["generating"] is False
+
+    async def test_one_generation_per_session(self, client, session_state):
+        session_id = client.post("/session").json()["session_id"]
+        await session_state.acquire_lock(f"newsletter:{session_id}", 60)
+        response = client.post("/generate/newsletter", json={"session_id": session_id, "context": {"topic": "Rates"}})
+        assert response.status_code == 409
+
+    def test_delete_clears_state(self, client, session_state):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/generate/section", json={
+            "session_id": session_id,
+            "section_type": "introduction",
+            "context": {"topic": "Rates"}
+        })
+        client.delete(f"/session/{session_id}")
+        assert session_state._values == {}
+        assert client.get(f"/session/{session_id}/state").status_code == 404
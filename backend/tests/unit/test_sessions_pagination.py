@@ -0,0 +1,80 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import SQLALCHEMY_DATABASE_URL, engine
+from app.pagination import encode_cursor, decode_cursor
+
+@pytest.fixture
+def seeded_sessions():
+    """Insert sessions with distinct creation times and a known number of messages"""
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    db = sessionmaker(bind=sync_engine)()
+    base = datetime(2025, 1, 1)
+    ids = []
+    for i in range(7):
+        session = models.DBSession(id=f"session-{i}", created_at=base + timedelta(hours=i))
+        db.add(session)
+        for j in range(i):
+            db.add(models.DBMessage(
+                session_id=session.id,
+                speaker="user",
+                content=f"message {j}",
+                timestamp=base + timedelta(hours=i, minutes=j)
+            ))
+        ids.append(session.id)
+    db.commit()
+    db.close()
+    sync_engine.dispose()
+    # Newest first
+    return list(reversed(ids))
+
+@pytest.fixture
+def statement_counter():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 4, 5, 13, 43, 48, 219762)
+    assert decode_cursor(encode_cursor(created_at, "abc|def")) == (created_at, "abc|def")
+
+def test_decode_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_sessions_paginate_with_cursor(client, seeded_sessions):
+    first = client.get("/sessions", params={"limit": 3}).json()
+    assert [s["id"] for s in first["sessions"]] == seeded_sessions[:3]
+    assert first["next_cursor"]
+
+    second = client.get("/sessions", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    assert [s["id"] for s in second["sessions"]] == seeded_sessions[3:6]
+
+    last = client.get("/sessions", params={"limit": 3, "cursor": second["next_cursor"]}).json()
+    assert [s["id"] for s in last["sessions"]] == seeded_sessions[6:]
+    assert last["next_cursor"] is None
+
+def test_sessions_include_message_counts(client, seeded_sessions):
+    sessions = client.get("/sessions").json()["sessions"]
+    counts = {s["id"]: s["message_count"] for s in sessions}
+    assert counts == {f"session-{i}": i for i in range(7)}
+
+def test_sessions_single_query(client, seeded_sessions, statement_counter):
+    response = client.get("/sessions")
+    assert response.status_code == 200
+    assert len([s for s in statement_counter if s.lstrip().upper().startswith("SELECT")]) == 1
+
+def test_sessions_invalid_cursor(client):
+    response = client.get("/sessions", params={"cursor": "bogus"})
+    assert response.status_code == 400
+
+def test_sessions_limit_bounds(client):
+    assert client.get("/sessions", params={"limit": 0}).status_code == 422
+    assert client.get("/sessions", params={"limit": 1000}).status_code == 422
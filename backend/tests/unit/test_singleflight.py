@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from services.openai_service import OpenAIService, OpenAIServiceError
+from services.singleflight import SingleFlight
+from tests.mocks import FakeOpenAIServer
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+        assert results == ["result"] * 5
+        assert calls == 1
+        assert flight.stats() == {"inflight": 0, "calls": 1, "coalesced": 4}
+
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.calls == 1
+
+    async def test_key_released_after_completion(self):
+        flight = SingleFlight()
+
+        async def work():
+            return "result"
+
+        await flight.do("key", work)
+        await flight.do("key", work)
+        assert flight.calls == 2
+        assert flight.coalesced == 0
+
+    async def test_cancelling_one_waiter_keeps_the_call(self):
+        flight = SingleFlight()
+        finished = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "result"
+
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "result"
+        assert finished.is_set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    async def test_upstream_cancelled_when_all_waiters_leave(self):
+        flight = SingleFlight()
+        upstream_cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(upstream_cancelled.wait(), timeout=1)
+        assert flight.stats()["inflight"] == 0
+
+def make_service(server):
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+        service = OpenAIService()
+    service.client = server.client()
+    return service
+
+class TestServiceCoalescing:
+    context = {"topic": "Rates", "additional_info": ""}
+
+    async def test_identical_section_requests_coalesce(self):
+        server = FakeOpenAIServer(latency=0.05)
+        service = make_service(server)
+
+        results = await asyncio.gather(*[
+            service.generate_section_content("introduction", self.context, use_cache=False)
+            for _ in range(4)
+        ])
+        assert len(set(results)) == 1
+        assert len(server.requested_models) == 1
+        assert service.singleflight.coalesced == 3
+
+    async def test_different_sections_do_not_coalesce(self):
+        server = FakeOpenAIServer(latency=0.05)
+        service = make_service(server)
+
+        await asyncio.gather(
+            service.generate_section_content("introduction", self.context),
+            service.generate_section_content("conclusion", self.context),
+        )
+        assert len(server.requested_models) == 2
+
+    async def test_coalesced_errors(self):
+        server = FakeOpenAIServer(script=[(400, {})], latency=0.05)
+        service = make_service(server)
+
+        results = await asyncio.gather(*[
+            service.generate_section_content("introduction", self.context) for _ in range(3)
+        ], return_exceptions=True)
+        assert all(isinstance(r, OpenAIServiceError) for r in results)
+        assert len(server.requested_models) == 1
+
+    async def test_identical_responses_coalesce(self):
+        server = FakeOpenAIServer(latency=0.05)
+        service = make_service(server)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        results = await asyncio.gather(*[service.generate_response(messages) for _ in range(3)])
+        assert results == ["Reply from gpt-4o-mini"] * 3
+        assert len(server.requested_models) == 1
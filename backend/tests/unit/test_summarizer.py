@@ -0,0 +1,183 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app import database, models
+from app.database import SQLALCHEMY_DATABASE_URL
+from services.session_state import InMemorySessionState
+from services.summarizer import SessionSummarizer, SUMMARY_PREFIX
+
+class RecordingService:
+    """Captures what is sent to the model"""
+    def __init__(self):
+        self.summarize_calls = []
+        self.response_calls = []
+
+    async def summarize_conversation(self, previous_summary: str, messages: list) -> str:
+        self.summarize_calls.append((previous_summary, messages))
+        return f"summary #{len(self.summarize_calls)}"
+
+    async def generate_response(self, messages: list, context: dict = None) -> str:
+        self.response_calls.append(messages)
+        return "reply"
+
+@pytest.fixture
+def sync_db():
+    sync_engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    db = sessionmaker(bind=sync_engine)()
+    yield db
+    db.close()
+    sync_engine.dispose()
+
+def add_messages(db, session_id, count, start=0):
+    base = datetime(2025, 1, 1)
+    for i in range(start, start + count):
+        db.add(models.DBMessage(
+            session_id=session_id,
+            speaker="user" if i % 2 == 0 else "assistant",
+            content=f"message {i}",
+            timestamp=base + timedelta(minutes=i)
+        ))
+    db.commit()
+
+@pytest.fixture
+def session_id(sync_db):
+    session = models.DBSession(id="summarized-session")
+    sync_db.add(session)
+    sync_db.commit()
+    return session.id
+
+class TestSessionSummarizer:
+    async def test_below_threshold_does_nothing(self, sync_db, session_id):
+        add_messages(sync_db, session_id, 5)
+        service = RecordingService()
+        summarizer = SessionSummarizer(trigger_messages=10, keep_recent=4)
+        assert await summarizer.maybe_summarize(session_id, service) is False
+        assert service.summarize_calls == []
+
+    async def test_folds_only_the_delta(self, sync_db, session_id):
+        add_messages(sync_db, session_id, 12)
+        service = RecordingService()
+        summarizer = SessionSummarizer(trigger_messages=10, keep_recent=4)
+
+        assert await summarizer.maybe_summarize(session_id, service) is True
+        previous, folded = service.summarize_calls[0]
+        assert previous == ""
+        assert [m["content"] for m in folded] == [f"message {i}" for i in range(8)]
+
+        # Not enough new messages since the summarized point
+        add_messages(sync_db, session_id, 4, start=12)
+        assert await summarizer.maybe_summarize(session_id, service) is False
+
+        add_messages(sync_db, session_id, 4, start=16)
+        assert await summarizer.maybe_summarize(session_id, service) is True
+        previous, folded = service.summarize_calls[1]
+        assert previous == "summary #1"
+        assert [m["content"] for m in folded] == [f"message {i}" for i in range(8, 16)]
+
+        sync_db.expire_all()
+        summary = sync_db.get(models.DBSessionSummary, session_id)
+        assert summary.summary == "summary #2"
+        assert summary.summarized_message_count == 16
+
+    async def test_errors_are_swallowed(self, sync_db, session_id):
+        add_messages(sync_db, session_id, 12)
+
+        class FailingService:
+            async def summarize_conversation(self, previous_summary, messages):
+                raise RuntimeError("upstream down")
+
+        summarizer = SessionSummarizer(trigger_messages=10, keep_recent=4)
+        assert await summarizer.maybe_summarize(session_id, FailingService()) is False
+        assert sync_db.get(models.DBSessionSummary, session_id) is None
+
+    async def test_connection_released_during_model_call(self, sync_db, session_id):
+        add_messages(sync_db, session_id, 12)
+        held = {"connections": 0}
+        pool = database.engine.sync_engine.pool
+
+        def checkout(*args):
+            held["connections"] += 1
+
+        def checkin(*args):
+            held["connections"] -= 1
+
+        class ObservingService(RecordingService):
+            async def summarize_conversation(self, previous_summary, messages):
+                self.held_during_call = held["connections"]
+                return await super().summarize_conversation(previous_summary, messages)
+
+        service = ObservingService()
+        event.listen(pool, "checkout", checkout)
+        event.listen(pool, "checkin", checkin)
+        try:
+            assert await SessionSummarizer(trigger_messages=10, keep_recent=4).maybe_summarize(session_id, service)
+        finally:
+            event.remove(pool, "checkout", checkout)
+            event.remove(pool, "checkin", checkin)
+        assert service.held_during_call == 0
+
+    async def test_concurrent_update_wins(self, sync_db, session_id):
+        add_messages(sync_db, session_id, 12)
+        sync_db.add(models.DBSessionSummary(
+            session_id=session_id,
+            summary="first",
+            summarized_through_timestamp=datetime(2025, 1, 1),
+            summarized_through_id="a",
+            summarized_message_count=1
+        ))
+        sync_db.commit()
+
+        class RacingService(RecordingService):
+            async def summarize_conversation(self, previous_summary, messages):
+                # Another worker stores its summary while this model call runs
+                stored = sync_db.get(models.DBSessionSummary, session_id)
+                stored.summary = "from another worker"
+                stored.summarized_through_id = "b"
+                sync_db.commit()
+                return await super().summarize_conversation(previous_summary, messages)
+
+        summarizer = SessionSummarizer(trigger_messages=5, keep_recent=4)
+        assert await summarizer.maybe_summarize(session_id, RacingService()) is False
+        sync_db.expire_all()
+        assert sync_db.get(models.DBSessionSummary, session_id).summary == "from another worker"
+
+    async def test_lock_shared_across_workers(self, sync_db, session_id):
+        add_messages(sync_db, session_id, 12)
+        state = InMemorySessionState()
+        service = RecordingService()
+        summarizer = SessionSummarizer(trigger_messages=10, keep_recent=4, session_state=state)
+
+        token = await state.acquire_lock(f"summary:{session_id}", 60)
+        assert await summarizer.maybe_summarize(session_id, service) is False
+        assert service.summarize_calls == []
+
+        await state.release_lock(f"summary:{session_id}", token)
+        assert await summarizer.maybe_summarize(session_id, service) is True
+        assert not await state.is_locked(f"summary:{session_id}")
+
+class TestSummaryInContext:
+    def test_reply_uses_summary_plus_recent_turns(self, client, sync_db, session_id, monkeypatch):
+        add_messages(sync_db, session_id, 12)
+        sync_db.add(models.DBSessionSummary(
+            session_id=session_id,
+            summary="The topic is semiconductors.",
+            summarized_through_timestamp=datetime(2025, 1, 1) + timedelta(minutes=7),
+            summarized_through_id="zzz",
+            summarized_message_count=8
+        ))
+        sync_db.commit()
+
+        service = RecordingService()
+        monkeypatch.setattr("app.main.get_openai_service", lambda: service)
+        response = client.post("/message", json={
+            "session_id": session_id,
+            "speaker": "user",
+            "content": "Next section please",
+            "timestamp": datetime.now().isoformat()
+        })
+        assert response.status_code == 200
+
+        sent = service.response_calls[0]
+        assert sent[0] == {"role": "system", "content": SUMMARY_PREFIX + "The topic is semiconductors."}
+        assert [m["content"] for m in sent[1:]] == [f"message {i}" for i in range(8, 12)] + ["Next section please"]
@@ -0,0 +1,235 @@
+import json
+import httpx
+import pytest
+from datetime import datetime
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, StatusCode
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app import database, tracing
+from app.logging_config import stop_logging
+from app.tracing import (
+    TracingMiddleware, TracingSettings, configure_tracing, current_span, format_id, set_span_processor, stop_tracing,
+    tracer
+)
+from tests.mocks import FakeOpenAIServer
+from tests.unit.test_logging_config import log_stream  # noqa: F401
+from tests.unit.test_resilience import make_service
+
+try:
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    SimpleSpanProcessor = None
+
+requires_sdk = pytest.mark.skipif(tracing.TracerProvider is None, reason="opentelemetry-sdk not installed")
+
+@pytest.fixture
+def spans():
+    if tracing.tracing_stats()["recording"] is False:
+        configure_tracing(TracingSettings())
+    exporter = InMemorySpanExporter()
+    previous = set_span_processor(SimpleSpanProcessor(exporter))
+    yield exporter
+    set_span_processor(previous)
+
+def span_id(span):
+    return span.context.span_id
+
+def children(spans, parent):
+    return [span for span in spans if span.parent is not None and span.parent.span_id == span_id(parent)]
+
+def is_within(spans, span, ancestor):
+    by_id = {span_id(s): s for s in spans}
+    while span.parent is not None:
+        if span.parent.span_id == span_id(ancestor):
+            return True
+        span = by_id.get(span.parent.span_id)
+        if span is None:
+            return False
+    return False
+
+def named(spans, name):
+    matches = [span for span in spans if span.name == name]
+    assert len(matches) == 1, f"expected one {name!r} span, got {[s.name for s in spans]}"
+    return matches[0]
+
+def user_message(session_id, content="Hello"):
+    return {"session_id": session_id, "speaker": "user", "content": content, "timestamp": datetime.now().isoformat()}
+
+@requires_sdk
+class TestTracer:
+    def test_nesting_and_export_layout(self, spans):
+        with tracer.start_as_current_span("outer", attributes={"a": 1}) as outer:
+            with tracer.start_as_current_span("inner") as inner:
+                assert current_span() is inner
+            assert current_span() is outer
+        assert current_span() is None
+
+        finished = spans.get_finished_spans()
+        assert [span.name for span in finished] == ["inner", "outer"]
+        inner, outer = finished
+        assert inner.context.trace_id == outer.context.trace_id and inner.parent.span_id == span_id(outer)
+        assert outer.parent is None
+
+        exported = json.loads(tracing.json_lines(outer))
+        assert exported["context"]["trace_id"] == "0x" + format_id(outer.context.trace_id, 32)
+        assert exported["kind"] == "SpanKind.INTERNAL"
+        assert exported["attributes"] == {"a": 1}
+        assert exported["resource"]["attributes"]["service.name"] == "newsletter-backend"
+
+    def test_exception_marks_span_as_error(self, spans):
+        with pytest.raises(RuntimeError):
+            with tracer.start_as_current_span("failing"):
+                raise RuntimeError("boom")
+        failing = spans.get_finished_spans()[0]
+        assert failing.status.status_code == StatusCode.ERROR
+        assert failing.events[0].attributes["exception.type"] == "RuntimeError"
+        assert failing.events[0].attributes["exception.message"] == "boom"
+
+    def test_configure_from_settings(self, spans, tmp_path):
+        path = tmp_path / "t.jsonl"
+        previous = set_span_processor(None)
+        try:
+            configure_tracing(TracingSettings(exporter="file", file=str(path)))
+            assert tracing.tracing_stats() == {"recording": True, "exporting": True}
+            for i in range(3):
+                with tracer.start_as_current_span(f"span-{i}"):
+                    pass
+            with pytest.raises(ValueError):
+                configure_tracing(TracingSettings(exporter="zipkin"))
+            configure_tracing(TracingSettings(exporter="none"))
+            assert tracing.tracing_stats()["exporting"] is False
+        finally:
+            stop_tracing()
+            set_span_processor(previous)
+        assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["span-0", "span-1", "span-2"]
+
+@requires_sdk
+class TestRequestTracing:
+    def test_message_turn_is_broken_down(self, client, spans, monkeypatch):
+        service = make_service(FakeOpenAIServer(failing_models={"gpt-4o-mini": 500}), max_attempts=1)
+        monkeypatch.setattr("app.main.get_openai_service", lambda: service)
+        session_id = client.post("/session").json()["session_id"]
+        spans.clear()
+
+        response = client.post("/message", json=user_message(session_id))
+        assert response.json()["content"] == "Reply from gpt-3.5-turbo"
+
+        finished = spans.get_finished_spans()
+        server = named(finished, "POST /message")
+        assert server.kind == SpanKind.SERVER
+        assert server.attributes["http.route"] == "/message"
+        assert server.attributes["http.response.status_code"] == 200
+        handler = named(finished, "create_message")
+        assert is_within(finished, handler, server)
+        assert [span.name for span in children(finished, handler)] == [
+            "session.lookup", "history.query", "prompt.assembly", "message.commit", "openai.generate_response",
+            "message.commit"
+        ]
+        assert [span.name for span in children(finished, named(finished, "session.lookup"))] == ["SELECT"]
+        commits = [span for span in children(finished, handler) if span.name == "message.commit"]
+        assert all("INSERT" in {span.name for span in children(finished, commit)} for commit in commits)
+
+        attempts = children(finished, named(finished, "openai.generate_response"))
+        assert [
+            (a.attributes["gen_ai.request.model"], a.attributes["openai.fallback"], a.status.status_code) for a in attempts
+        ] == [
+            ("gpt-4o-mini", False, StatusCode.ERROR),
+            ("gpt-3.5-turbo", True, StatusCode.UNSET),
+        ]
+        assert named(finished, "openai.generate_response").attributes["gen_ai.usage.output_tokens"] == 5
+        assert {span.context.trace_id for span in finished} == {server.context.trace_id}
+
+    def test_generate_section(self, client, spans):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/generate/section", json={
+            "session_id": session_id,
+            "section_type": "introduction",
+            "context": {"topic": "Rates"}
+        })
+        finished = spans.get_finished_spans()
+        handler = named(finished, "generate_section")
+        assert handler.attributes["newsletter.section_type"] == "introduction"
+        assert is_within(finished, handler, named(finished, "POST /generate/section"))
+
+    async def test_statements_are_traced_only_inside_a_trace(self, spans):
+        async with database.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            assert spans.get_finished_spans() == ()
+            with tracer.start_as_current_span("job") as job:
+                await connection.execute(text("SELECT 1"))
+        query = named(spans.get_finished_spans(), "SELECT")
+        assert query.parent.span_id == job.get_span_context().span_id
+        assert query.kind == SpanKind.CLIENT
+        assert dict(query.attributes) == {"db.system": "sqlite", "db.statement": "SELECT 1"}
+
+    async def test_stream_span_is_not_current_between_chunks(self, spans):
+        service = make_service(FakeOpenAIServer())
+        with tracer.start_as_current_span("consumer") as consumer:
+            async for _ in service.stream_response([{"role": "user", "content": "Hello"}]):
+                assert trace.get_current_span() is consumer
+            assert trace.get_current_span() is consumer
+
+        finished = spans.get_finished_spans()
+        stream = named(finished, "openai.stream_response")
+        assert stream.parent.span_id == consumer.get_span_context().span_id
+        assert stream.attributes["gen_ai.usage.output_tokens"] == 5
+        assert [span.name for span in children(finished, stream)] == ["openai.chat.completions"]
+
+class TestRequestIds:
+    def test_generated_and_echoed(self, client):
+        response = client.get("/health")
+        assert len(response.headers["x-request-id"]) == 32
+
+        response = client.get("/health", headers={"X-Request-ID": "req-123"})
+        assert response.headers["x-request-id"] == "req-123"
+
+    def test_unsafe_request_id_is_replaced(self, client):
+        response = client.get("/health", headers={"X-Request-ID": "bad id\twith spaces"})
+        assert response.headers["x-request-id"] != "bad id\twith spaces"
+
+    @requires_sdk
+    def test_incoming_trace_is_continued(self, client, spans):
+        traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        response = client.get("/health", headers={"traceparent": traceparent})
+        server = named(spans.get_finished_spans(), "GET /health")
+        assert server.attributes["request.id"] == response.headers["x-request-id"]
+        assert format_id(server.context.trace_id, 32) == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert format_id(server.parent.span_id, 16) == "00f067aa0ba902b7"
+        assert response.headers["traceparent"] == (
+            f"00-4bf92f3577b34da6a3ce929d0e0e4736-{format_id(server.context.span_id, 16)}-01"
+        )
+
+    @requires_sdk
+    async def test_middleware_opens_the_server_span_itself(self, spans):
+        async def endpoint(request):
+            return PlainTextResponse("ok")
+
+        app = TracingMiddleware(Starlette(routes=[Route("/items/{item_id}", endpoint)]))
+        traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/items/1", headers={"traceparent": traceparent, "X-Request-ID": "req-789"})
+
+        server = named(spans.get_finished_spans(), "GET /items/{item_id}")
+        assert server.kind == SpanKind.SERVER
+        assert server.attributes["request.id"] == "req-789"
+        assert server.attributes["http.route"] == "/items/{item_id}"
+        assert format_id(server.parent.span_id, 16) == "00f067aa0ba902b7"
+        assert response.headers["traceparent"] == (
+            f"00-4bf92f3577b34da6a3ce929d0e0e4736-{format_id(server.context.span_id, 16)}-01"
+        )
+
+    @requires_sdk
+    def test_logs_carry_request_and_trace_ids(self, client, log_stream):
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/message", json=user_message(session_id), headers={"X-Request-ID": "req-456"})
+        stop_logging()
+
+        trace_id = response.headers["traceparent"].split("-")[1]
+        entries = [json.loads(line) for line in log_stream.getvalue().splitlines()]
+        context_log = next(e for e in entries if e["message"].startswith("Context for session"))
+        assert context_log["request_id"] == "req-456"
+        assert context_log["trace_id"] == trace_id
@@ -0,0 +1,199 @@
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+from app import database, models
+from services.usage import BudgetExceededError, TokenBudget, UsageRecorder, capture_usage, report_usage
+from tests.mocks import FakeOpenAIServer
+from tests.unit.test_resilience import make_service
+
+def user_message(session_id, content="Hello"):
+    return {"session_id": session_id, "speaker": "user", "content": content, "timestamp": datetime.now().isoformat()}
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeOpenAIServer()
+    service = make_service(server)
+    monkeypatch.setattr("app.main.get_openai_service", lambda: service)
+    return server
+
+@pytest.fixture
+def budget(monkeypatch):
+    budget = TokenBudget()
+    monkeypatch.setattr("app.main.get_token_budget", lambda: budget)
+    return budget
+
+class TestTokenBudget:
+    def test_unlimited(self):
+        budget = TokenBudget()
+        assert not budget.enabled
+        assert budget.remaining(10**9, 10**9) is None
+        assert budget.plan(None, 50000, 2000).overrides(2000) == {}
+
+    def test_remaining_is_the_tighter_limit(self):
+        assert TokenBudget(session_limit=1000, daily_limit=5000).remaining(200, 4500) == 500
+        assert TokenBudget(daily_limit=5000).remaining(10**6, 4500) == 500
+
+    def test_turn_that_fits_runs_as_usual(self):
+        plan = TokenBudget(session_limit=10000).plan(5000, 2500, 2000)
+        assert not plan.trimmed and not plan.downgraded
+
+    def test_context_is_trimmed_first(self):
+        plan = TokenBudget(session_limit=10000).plan(4000, 3000, 2000)
+        assert plan.context_budget == 2000
+        assert not plan.downgraded and plan.overrides(2000) == {}
+
+    def test_then_the_model_is_downgraded(self):
+        plan = TokenBudget(session_limit=10000, downgrade_model="small").plan(2500, 3000, 2000)
+        assert plan.context_budget == 1000
+        assert plan.overrides(2000) == {"model": "small", "max_tokens": 1500}
+
+    def test_untrimmable_prompt_only_shortens_the_reply(self):
+        plan = TokenBudget(session_limit=10000).plan(1500, 1200, 500, trimmable=False)
+        assert not plan.trimmed
+        assert plan.overrides(500) == {"model": "gpt-3.5-turbo", "max_tokens": 300}
+
+    def test_exhausted(self):
+        with pytest.raises(BudgetExceededError):
+            TokenBudget(session_limit=10000).plan(1100, 3000, 2000)
+        with pytest.raises(BudgetExceededError):
+            TokenBudget(session_limit=10000).plan(-50, 10, 2000)
+
+class TestCaptureUsage:
+    def test_reports_go_to_the_innermost_recorder(self):
+        report_usage("chat", "m", 1, 1)
+        with capture_usage() as outer:
+            report_usage("chat", "m", 10, 5)
+            with capture_usage() as inner:
+                report_usage("summary", "n", 3, 2)
+        assert [e.purpose for e in outer.entries] == ["chat"]
+        assert [e.purpose for e in inner.entries] == ["summary"]
+
+    def test_summarize(self):
+        recorder = UsageRecorder()
+        recorder.add("intro", "a", 10, 5)
+        recorder.add("intro", "b", 7, 3)
+        recorder.add("thesis", "a", 1, 1)
+        assert UsageRecorder.summarize(recorder.for_purpose("intro")) == {
+            "model": "b", "prompt_tokens": 17, "completion_tokens": 8
+        }
+        assert UsageRecorder.summarize([]) == {"model": None, "prompt_tokens": 0, "completion_tokens": 0}
+
+    async def test_service_reports_completions(self):
+        service = make_service(FakeOpenAIServer())
+        with capture_usage() as usage:
+            await service.generate_response([{"role": "user", "content": "Hello"}])
+            await service.generate_section_content("introduction", {"topic": "Rates", "additional_info": ""}, use_cache=False)
+        assert [(e.purpose, e.model, e.prompt_tokens, e.completion_tokens) for e in usage.entries] == [
+            ("chat", "gpt-4o-mini", 10, 5),
+            ("introduction", "gpt-4o-mini-2024-07-18", 10, 5),
+        ]
+
+class TestUsageRecording:
+    async def test_message_records_usage(self, client, server):
+        session_id = client.post("/session").json()["session_id"]
+        reply = client.post("/message", json=user_message(session_id)).json()
+        assert reply["metadata"]["usage"] == {"model": "gpt-4o-mini", "prompt_tokens": 10, "completion_tokens": 5}
+        assert "budget" not in reply["metadata"]
+
+        async with database.AsyncSessionLocal() as db:
+            rows = (await db.scalars(select(models.DBTokenUsage))).all()
+        assert [(r.session_id, r.message_id, r.purpose, r.prompt_tokens, r.completion_tokens) for r in rows] == [
+            (session_id, reply["id"], "chat", 10, 5)
+        ]
+
+    def test_streamed_message_records_usage(self, client, server):
+        session_id = client.post("/session").json()["session_id"]
+        with client.stream("POST", "/message/stream", json=user_message(session_id)) as response:
+            body = response.read().decode()
+        assert "event: done" in body
+        messages = client.get(f"/session/{session_id}").json()["messages"]
+        assert messages[-1]["message_metadata"]["usage"]["model"] == "gpt-4o-mini"
+        assert client.get("/usage").json()["rows"][0]["generations"] == 1
+
+    async def test_section_records_usage(self, client, server):
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/section", json={
+            "session_id": session_id,
+            "section_type": "introduction",
+            "context": {"topic": "Rates", "additional_info": ""}
+        })
+        assert response.json()["metadata"]["usage"]["completion_tokens"] == 5
+
+        async with database.AsyncSessionLocal() as db:
+            row = await db.scalar(select(models.DBTokenUsage))
+        assert (row.section_id, row.purpose) == (response.json()["metadata"]["id"], "introduction")
+
+    def test_newsletter_sections_record_usage(self, client, server):
+        session_id = client.post("/session").json()["session_id"]
+        with client.stream("POST", "/generate/newsletter", json={"session_id": session_id, "context": {"topic": "Rates"}}) as response:
+            events = [json.loads(line[len("data: "):]) for line in response.iter_lines() if line.startswith("data: ")]
+        sections = [event for event in events if "section_type" in event]
+        assert sections and all(event["status"] == "completed" for event in sections)
+
+        listed = client.get(f"/session/{session_id}/sections").json()["sections"]
+        assert {s["metadata"]["usage"]["completion_tokens"] for s in listed} == {5}
+        assert client.get("/usage").json()["rows"][0]["generations"] == len(sections)
+
+class TestUsageReport:
+    def test_by_day_and_session(self, client, server):
+        first = client.post("/session").json()["session_id"]
+        second = client.post("/session").json()["session_id"]
+        for session_id in (first, first, second):
+            client.post("/message", json=user_message(session_id))
+
+        by_day = client.get("/usage").json()
+        assert by_day["group_by"] == "day"
+        assert by_day["rows"] == [{
+            "key": datetime.utcnow().date().isoformat(),
+            "prompt_tokens": 30, "completion_tokens": 15, "total_tokens": 45, "generations": 3
+        }]
+        assert by_day["budget"] == {"session_limit": 0, "daily_limit": 0, "daily_used": 45, "daily_remaining": None}
+
+        by_session = client.get("/usage", params={"group_by": "session"}).json()
+        assert [(row["key"], row["total_tokens"]) for row in by_session["rows"]] == [(first, 30), (second, 15)]
+
+        only = client.get("/usage", params={"group_by": "session", "session_id": second}).json()
+        assert [row["key"] for row in only["rows"]] == [second]
+
+    def test_rejects_unknown_grouping(self, client):
+        assert client.get("/usage", params={"group_by": "model"}).status_code == 422
+
+    def test_reports_daily_budget(self, client, server, budget):
+        session_id = client.post("/session").json()["session_id"]
+        client.post("/message", json=user_message(session_id))
+        budget.daily_limit = 100
+        assert client.get("/usage").json()["budget"]["daily_remaining"] == 85
+
+class TestBudgetEnforcement:
+    def test_exhausted_budget_refuses_turn(self, client, server, budget):
+        budget.session_limit = 100
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/message", json=user_message(session_id))
+        assert response.status_code == 429
+        assert server.requested_models == []
+
+    def test_tight_budget_downgrades_model(self, client, server, budget):
+        budget.session_limit = 1500
+        session_id = client.post("/session").json()["session_id"]
+        reply = client.post("/message", json=user_message(session_id)).json()
+        assert server.requested_models == ["gpt-3.5-turbo"]
+        assert reply["metadata"]["budget"]["downgraded"] is True
+        assert reply["metadata"]["budget"]["max_tokens"] < 2000
+        assert reply["metadata"]["usage"]["model"] == "gpt-3.5-turbo"
+
+    def test_daily_budget_is_shared_across_sessions(self, client, server, budget):
+        first = client.post("/session").json()["session_id"]
+        second = client.post("/session").json()["session_id"]
+        client.post("/message", json=user_message(first))
+        budget.daily_limit = 115
+        assert client.post("/message", json=user_message(second)).status_code == 429
+        budget.session_limit, budget.daily_limit = 5000, 0
+        assert client.post("/message", json=user_message(second)).status_code == 200
+
+    def test_newsletter_checks_budget_before_generating(self, client, server, budget):
+        budget.session_limit = 100
+        session_id = client.post("/session").json()["session_id"]
+        response = client.post("/generate/newsletter", json={"session_id": session_id, "context": {"topic": "Rates"}})
+        assert response.status_code == 429
+        assert server.requested_models == []
@@ -4,6 +4,7 @@ import { format } from 'date-fns';
 import '../styles/Sidebar.css';
 
 const API_BASE_URL = 'http://localhost:8000';
+const SESSIONS_PAGE_SIZE = 30;
 
 const Sidebar = ({ isOpen, onClose, onSessionSelect, currentSessionId, checkApiStatus }) => {
   const [sessions, setSessions] = useState([]);
@@ -12,6 +13,8 @@ const Sidebar = ({ isOpen, onClose, onSessionSelect, currentSessionId, checkApiS
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [menuOpen, setMenuOpen] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     // Only fetch sessions when the sidebar is open
@@ -24,10 +27,13 @@ const Sidebar = ({ isOpen, onClose, onSessionSelect, currentSessionId, checkApiS
     setLoading(true);
     setError(null);
     try {
-      const response = await axios.get(`${API_BASE_URL}/sessions`);
+      const response = await axios.get(`${API_BASE_URL}/sessions`, {
+        params: { limit: SESSIONS_PAGE_SIZE }
+      });
       
       if (response.data && Array.isArray(response.data.sessions)) {
         setSessions(response.data.sessions);
+        setNextCursor(response.data.next_cursor || null);
       } else {
         console.error('Invalid response format:', response.data);
         setError('Unable to load chat history. Please try again.');
@@ -43,6 +49,36 @@ const Sidebar = ({ isOpen, onClose, onSessionSelect, currentSessionId, checkApiS
     }
   };
 
+  // Fetch the next page of sessions using the cursor from the previous page
+  const loadMoreSessions = async () => {
+    if (!nextCursor || loadingMore) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API_BASE_URL}/sessions`, {
+        params: { limit: SESSIONS_PAGE_SIZE, cursor: nextCursor }
+      });
+      if (response.data && Array.isArray(response.data.sessions)) {
+        setSessions(prev => [...prev, ...response.data.sessions]);
+        setNextCursor(response.data.next_cursor || null);
+      }
+    } catch (err) {
+      console.error('Error loading more sessions:', err);
+      setError('Unable to load more chats. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Load the next page when the list is scrolled close to the bottom
+  const handleSessionsScroll = (e) => {
+    const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+    if (scrollHeight - scrollTop - clientHeight < 100) {
+      loadMoreSessions();
+    }
+  };
+
   const handleDelete = async (sessionId, e) => {
     e.stopPropagation(); // Prevent triggering session selection
     if (window.confirm('Are you sure you want to delete this chat?')) {
@@ -180,8 +216,9 @@ const Sidebar = ({ isOpen, onClose, onSessionSelect, currentSessionId, checkApiS
         <button className="close-button" onClick={onClose}>×</button>
       </div>
       {error && <div className="error-message">{error}</div>}
-      <div className="sessions-list">
+      <div className="sessions-list" onScroll={handleSessionsScroll}>
         {renderSessions()}
+        {loadingMore && <p className="loading-more">Loading more...</p>}
       </div>
       
       <div className="sidebar-footer">